@@ -27,11 +27,25 @@ a = Analysis(
         'bleak',
         'bleak.backends',
         'bleak.backends.winrt',
-        'pythonosc',
-        'pythonosc.udp_client',
-        'websocket',
-        'websocket._app',
+        'websockets',
+        'websockets.asyncio.client',
+        'engine',
+        'pipeline',
+        'osc_policy',
+        'output_scheduler',
+        'session_log',
+        'hr_stats',
+        'hr_chart',
+        'stale_watchdog',
+        'config_watcher',
+        'ble_source',
+        'device_cache',
+        'reconnect',
         'pulsoid_worker',
+        'simulated_source',
+        'capture',
+        'latency',
+        'metrics_server',
         'asyncio',
         'configparser',
     ],
@@ -1,153 +1,83 @@
-import asyncio
-import time
+import os
 import sys
-from bleak import BleakScanner, BleakClient
-from pythonosc.udp_client import SimpleUDPClient
+import time
 import configparser
+import locale
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
-                             QWidget, QLabel, QPushButton, QTextEdit, QGroupBox,
+                             QWidget, QLabel, QPushButton, QPlainTextEdit, QGroupBox,
                              QProgressBar, QSpinBox, QDoubleSpinBox, QLineEdit,
                              QCheckBox, QComboBox, QTabWidget, QFormLayout)
-from PyQt5.QtCore import QTimer, Qt, pyqtSignal, QThread
-from PyQt5.QtGui import QFont, QPalette, QColor
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal, QThread, QObject, QEvent
+from PyQt5.QtGui import QFont, QPalette, QColor, QTextCursor
 
-# Pulsoid 数据源支持
-from pulsoid_worker import PulsoidWorker
+# 引擎、asyncio 和各数据源的依赖（bleak / requests / websockets）在开始监测时才导入，
+# 只加载所选 data_source 需要的模块，加快启动
+from latest_value import LatestValueSlot
+from status_log import StatusLog
 
 class HeartRateWorker(QThread):
-    """工作线程，用于运行异步的心率监测代码"""
+    """工作线程：在独立的事件循环中运行心率引擎，并把引擎事件转换为 Qt 信号"""
     
     # 定义信号
     status_update = pyqtSignal(str)
-    heart_rate_update = pyqtSignal(int, float)
     connection_status = pyqtSignal(bool)
     device_found = pyqtSignal(str)
+    stale_status = pyqtSignal(bool)
     
     def __init__(self, config):
         super().__init__()
-        self.config = config
-        self.running = False
-        self.client = None
-        
-        # 从配置中读取参数
-        self.osc_ip = config.get('DATABASE', 'osc_ip')
-        self.osc_port = config.getint('DATABASE', 'osc_port')
-        self.osc_int = config.get('DATABASE', 'osc_int')
-        self.osc_float = config.get('DATABASE', 'osc_float')
-        self.hr_min = config.getint('DATABASE', 'hr_min')
-        self.hr_max = config.getint('DATABASE', 'hr_max')
-        self.osc_bool = config.get('DATABASE', 'osc_bool')
-        self.dev_name = config.get('DATABASE', 'device_name')
-        self.obs_mode = config.getint('DATABASE', 'obs_mode')
-        
-        self.target_device_names = [self.dev_name]
-        self.xiaomi_heartrate_char_uuid = "00002a37-0000-1000-8000-00805f9b34fb"
-        
-        # 初始化OSC客户端
-        self.osc_client = SimpleUDPClient(self.osc_ip, self.osc_port)
-    
-    def stop(self):
-        """停止工作线程"""
-        self.running = False
-        if self.client:
-            # 这里需要处理异步关闭，简化处理
-            pass
-    
-    def send_osc(self, heart_rate):
-        """发送OSC数据"""
-        percent = heart_rate
-        percent_f = min(heart_rate / self.hr_max, self.hr_min)
-        self.osc_client.send_message(self.osc_bool, True)
-        self.osc_client.send_message(self.osc_int, percent)
-        self.osc_client.send_message(self.osc_float, percent_f)
-        return f"心率整数值: {heart_rate}; 心率浮点值: {percent_f:.2f}"
-    
-    def notification_handler(self, sender, data):
-        """处理心率通知"""
-        if len(data) >= 2:
-            heart_rate = data[1]
-            vrc_status = self.send_osc(heart_rate)
-            
-            # 发送信号更新UI
-            self.heart_rate_update.emit(heart_rate, min(heart_rate / self.hr_max, self.hr_min))
-            
-            status_text = f"实时心率 -> {vrc_status}"
-            if self.obs_mode == 1:
-                status_text += ",正在输出txt."
-                with open("rate.txt", "w", encoding="utf-8") as frate:
-                    frate.write(f"{heart_rate}")
-            
-            self.status_update.emit(status_text)
-    
-    async def find_target_device_async(self):
-        """异步查找设备"""
-        scan = 1
-        self.status_update.emit("开始扫描蓝牙心率设备，共5次。")
+        from engine import EngineConfig, HeartRateEngine
         
-        while scan <= 5 and self.running:
-            self.status_update.emit(f"正在扫描蓝牙设备...第{scan}次")
-            devices = await BleakScanner.discover()
-            
-            for device in devices:
-                if device.name and self.running:
-                    for target_name in self.target_device_names:
-                        if target_name in device.name:
-                            self.device_found.emit(f"成功找到目标设备: {device.name} ({device.address})")
-                            return device
-            
-            self.status_update.emit(f"第{scan}次扫描结束，未找到指定设备，开始下一次扫描。")
-            await asyncio.sleep(1)
-            scan += 1
+        self.config = EngineConfig.from_parser(config)
+        self.engine = HeartRateEngine(self.config, listener=self)
+        # 运行中直接修改 config.ini 时自动应用
+        self.engine.watch_config('config.ini')
         
-        return None
+        # 最新样本，由 GUI 定时读取
+        self.latest = LatestValueSlot()
     
-    async def main_loop_async(self):
-        """异步主循环"""
-        device = await self.find_target_device_async()
-        
-        if not device:
-            self.status_update.emit(f"错误：扫描结束，未找到名称包含 {self.target_device_names} 的设备。")
-            self.connection_status.emit(False)
-            return
-        
-        self.connection_status.emit(True)
-        
-        while self.running:
-            try:
-                async with BleakClient(device.address) as client:
-                    self.client = client
-                    if client.is_connected:
-                        self.status_update.emit("设备连接成功！正在监听心率...")
-                        self.status_update.emit(f"正在向 OSC 地址 {self.osc_ip}:{self.osc_port} 发送当前心率。")
-                        
-                        await client.start_notify(self.xiaomi_heartrate_char_uuid, self.notification_handler)
-                        
-                        while client.is_connected and self.running:
-                            await asyncio.sleep(1)
-            except Exception as e:
-                self.status_update.emit(f"连接断开或发生错误: {e}")
-                self.connection_status.emit(False)
-                if self.running:
-                    self.status_update.emit("将在5秒后尝试重新连接...")
-                    await asyncio.sleep(5)
+    # ---- EngineListener 接口（在引擎线程中调用） ----
+    
+    def on_status(self, message):
+        self.status_update.emit(message)
+    
+    def on_connection(self, connected):
+        self.connection_status.emit(connected)
+    
+    def on_device(self, info):
+        self.device_found.emit(info)
+    
+    def on_sample(self, sample):
+        # 发布到最新值槽，不经过 Qt 事件队列
+        self.latest.publish(sample)
+    
+    def on_stale(self, stale):
+        self.stale_status.emit(stale)
+    
+    def format_status(self, sample):
+        """生成实时心率状态文本"""
+        from engine import format_sample_status
+        return format_sample_status(sample, self.engine.config.obs_mode)
+    
+    def reload(self, config):
+        """应用修改后的配置，不断开数据源连接（数据源配置变化时除外）"""
+        from engine import EngineConfig
+        # 配置已由界面写入 config.ini，文件监视不必再应用一次
+        self.engine.reload(EngineConfig.from_parser(config), saved=True)
+    
+    def stop(self):
+        """停止工作线程"""
+        self.engine.stop()
     
     def run(self):
         """线程运行函数"""
-        self.running = True
-        
-        # 创建新的事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        import asyncio
         
         try:
-            loop.run_until_complete(self.main_loop_async())
+            asyncio.run(self.engine.run())
         except Exception as e:
             self.status_update.emit(f"线程运行异常: {e}")
-        finally:
-            loop.close()
-            self.osc_client.send_message(self.osc_bool, False)
-            self.status_update.emit("心率监测已停止")
 
 
 class HeartRateMonitorGUI(QMainWindow):
@@ -158,10 +88,16 @@ class HeartRateMonitorGUI(QMainWindow):
         
         # 读取配置文件
         self.config = configparser.ConfigParser()
-        self.config.read('config.ini')
+        self.read_config()
         
         # 初始化工作线程
         self.worker = None
+        self.hr_chart = None
+        self.last_sample_seq = 0
+        self.ui_ticks = 0
+        
+        # 状态日志模型（由 update_ui 定时批量刷新到控件）
+        self.status_log = StatusLog(max_lines=500)
         
         # 初始化UI
         self.init_ui()
@@ -237,21 +173,32 @@ class HeartRateMonitorGUI(QMainWindow):
         
         data_layout.addLayout(heart_rate_layout)
         
-        # 心率进度条
+        # 心率进度条（范围为配置的最低 / 最高心率）
         self.heart_rate_progress = QProgressBar()
-        self.heart_rate_progress.setRange(0, 200)
-        self.heart_rate_progress.setValue(0)
-        self.heart_rate_progress.setFormat("心率: %v BPM")
+        self.heart_rate_progress.setFormat("心率: -- BPM")
         data_layout.addWidget(self.heart_rate_progress)
         
+        # 心率曲线在第一次开始监测时创建（需要 numpy，避免拖慢启动）
+        self.chart_layout = QVBoxLayout()
+        data_layout.addLayout(self.chart_layout)
+        
         layout.addWidget(data_group)
         
+        # 延迟统计组（开启延迟追踪时显示）
+        self.latency_group = QGroupBox("延迟统计（从收到数据开始计时）")
+        latency_layout = QVBoxLayout(self.latency_group)
+        self.latency_label = QLabel("暂无数据")
+        latency_layout.addWidget(self.latency_label)
+        self.latency_group.setVisible(False)
+        layout.addWidget(self.latency_group)
+        
         # 状态日志组
         log_group = QGroupBox("状态日志")
         log_layout = QVBoxLayout(log_group)
         
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(self.status_log.max_lines)
         self.log_text.setMaximumHeight(200)
         log_layout.addWidget(self.log_text)
         
@@ -289,8 +236,9 @@ class HeartRateMonitorGUI(QMainWindow):
         self.data_source_combo = QComboBox()
         self.data_source_combo.addItem("蓝牙 BLE", "ble")
         self.data_source_combo.addItem("Pulsoid", "pulsoid")
+        self.data_source_combo.addItem("模拟数据（测试用）", "simulate")
         current_source = self.config.get('DATABASE', 'data_source', fallback='ble')
-        self.data_source_combo.setCurrentIndex(0 if current_source == 'ble' else 1)
+        self.data_source_combo.setCurrentIndex(max(self.data_source_combo.findData(current_source), 0))
         self.data_source_combo.currentIndexChanged.connect(self.on_data_source_changed)
         general_layout.addRow("数据源:", self.data_source_combo)
         
@@ -304,12 +252,20 @@ class HeartRateMonitorGUI(QMainWindow):
         self.hr_max_spin.setValue(self.config.getint('DATABASE', 'hr_max'))
         general_layout.addRow("最高心率:", self.hr_max_spin)
         
+        self.hr_min_spin.valueChanged.connect(self.update_progress_range)
+        self.hr_max_spin.valueChanged.connect(self.update_progress_range)
+        self.update_progress_range()
+        
         self.obs_mode_combo = QComboBox()
         self.obs_mode_combo.addItem("普通模式", 0)
         self.obs_mode_combo.addItem("OBS模式", 1)
         self.obs_mode_combo.setCurrentIndex(self.config.getint('DATABASE', 'obs_mode'))
         general_layout.addRow("工作模式:", self.obs_mode_combo)
         
+        self.latency_tracing_check = QCheckBox("在状态页显示各阶段延迟")
+        self.latency_tracing_check.setChecked(self.config.getint('DATABASE', 'latency_tracing', fallback=0) == 1)
+        general_layout.addRow("延迟追踪:", self.latency_tracing_check)
+        
         layout.addWidget(general_group)
         
         # 蓝牙 BLE 配置组
@@ -317,7 +273,7 @@ class HeartRateMonitorGUI(QMainWindow):
         ble_layout = QFormLayout(ble_group)
         
         self.device_name_edit = QLineEdit(self.config.get('DATABASE', 'device_name'))
-        self.device_name_edit.setPlaceholderText("输入蓝牙设备名称（支持模糊匹配）")
+        self.device_name_edit.setPlaceholderText("输入蓝牙设备名称（支持模糊匹配，多个设备用逗号分隔）")
         ble_layout.addRow("设备名称:", self.device_name_edit)
         
         layout.addWidget(ble_group)
@@ -357,17 +313,23 @@ class HeartRateMonitorGUI(QMainWindow):
         self.stop_button.setStyleSheet("QPushButton { background-color: #e74c3c; color: white; font-size: 14px; }")
         self.stop_button.setEnabled(False)
         
+        self.apply_button = QPushButton("应用配置")
+        self.apply_button.clicked.connect(self.apply_config)
+        self.apply_button.setStyleSheet("QPushButton { background-color: #2980b9; color: white; font-size: 14px; }")
+        self.apply_button.setEnabled(False)
+        
         button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.apply_button)
         button_layout.addWidget(self.stop_button)
         
         layout.addLayout(button_layout)
     
     def on_data_source_changed(self, index):
         """数据源切换时更新 UI 状态"""
-        is_pulsoid = self.data_source_combo.currentData() == 'pulsoid'
+        data_source = self.data_source_combo.currentData()
         # 切换配置组的可见性
-        self.ble_group.setVisible(not is_pulsoid)
-        self.pulsoid_group.setVisible(is_pulsoid)
+        self.ble_group.setVisible(data_source == 'ble')
+        self.pulsoid_group.setVisible(data_source == 'pulsoid')
     
     def start_monitoring(self):
         """开始心率监测"""
@@ -375,29 +337,37 @@ class HeartRateMonitorGUI(QMainWindow):
         self.save_config()
         
         # 重新读取配置
-        self.config.read('config.ini')
+        self.read_config()
         
-        # 根据数据源选择创建对应的 Worker
+        # 工作线程根据 data_source 创建对应的数据源
         data_source = self.config.get('DATABASE', 'data_source', fallback='ble')
         
         if data_source == 'pulsoid':
-            self.worker = PulsoidWorker(self.config)
-            self.log_text.append("使用 Pulsoid 数据源开始心率监测...")
+            self.update_status("使用 Pulsoid 数据源开始心率监测...")
+        elif data_source == 'simulate':
+            self.update_status("使用模拟数据源开始心率监测...")
         else:
-            self.worker = HeartRateWorker(self.config)
-            self.log_text.append("使用蓝牙 BLE 数据源开始心率监测...")
+            self.update_status("使用蓝牙 BLE 数据源开始心率监测...")
+        self.worker = HeartRateWorker(self.config)
         
         # 连接信号
         self.worker.status_update.connect(self.update_status)
-        self.worker.heart_rate_update.connect(self.update_heart_rate_display)
         self.worker.connection_status.connect(self.update_connection_status)
         self.worker.device_found.connect(self.update_device_info)
+        self.worker.stale_status.connect(self.update_stale_status)
+        
+        self.latency_group.setVisible(self.worker.engine.tracer is not None)
+        self.latency_label.setText("暂无数据")
+        
+        self.init_chart()
         
         # 启动线程
+        self.last_sample_seq = 0
         self.worker.start()
         
         # 更新按钮状态
         self.start_button.setEnabled(False)
+        self.apply_button.setEnabled(True)
         self.stop_button.setEnabled(True)
     
     def stop_monitoring(self):
@@ -408,26 +378,77 @@ class HeartRateMonitorGUI(QMainWindow):
         
         # 更新按钮状态
         self.start_button.setEnabled(True)
+        self.apply_button.setEnabled(False)
         self.stop_button.setEnabled(False)
         
         self.connection_status_label.setText("未连接")
         self.connection_status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: red;")
+        self.heart_rate_label.setStyleSheet("font-size: 48px; font-weight: bold; color: #e74c3c;")
+        if self.hr_chart:
+            self.hr_chart.set_color("#e74c3c")
         
-        self.log_text.append("已终止并断开设备连接")
+        self.update_status("已终止并断开设备连接")
+    
+    def apply_config(self):
+        """在监测过程中应用修改后的配置"""
+        if not (self.worker and self.worker.isRunning()):
+            return
+        # 先读取磁盘上的配置，保留在界面之外修改的配置项
+        self.read_config()
+        self.save_config()
+        self.worker.reload(self.config)
     
     def update_status(self, message):
         """更新状态消息"""
-        self.log_text.append(message)
+        self.status_log.append(message)
+    
+    def update_sample_status(self, message):
+        """更新实时心率状态（与上一条实时心率合并为一行）"""
+        self.status_log.append(message, key="sample")
+    
+    def flush_log(self):
+        """将状态日志的变化批量刷新到控件"""
+        replace_last, new_lines = self.status_log.take_changes()
+        if replace_last is None and not new_lines:
+            return
+        
+        if replace_last is not None:
+            cursor = QTextCursor(self.log_text.document().lastBlock())
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertText(replace_last)
+        if new_lines:
+            self.log_text.appendPlainText("\n".join(new_lines))
+        
         # 自动滚动到底部
         self.log_text.verticalScrollBar().setValue(
             self.log_text.verticalScrollBar().maximum()
         )
     
+    def init_chart(self):
+        """创建心率曲线（第一次开始监测时），每次开始监测时清空"""
+        if self.hr_chart is None:
+            try:
+                from hr_chart import HeartRateChart
+                self.hr_chart = HeartRateChart()
+            except (ImportError, RuntimeError) as e:
+                self.update_status(f"不显示心率曲线: {e}")
+                return
+            self.chart_layout.addWidget(self.hr_chart)
+        self.hr_chart.clear()
+    
+    def update_progress_range(self):
+        """进度条范围跟随配置的最低 / 最高心率"""
+        hr_min = self.hr_min_spin.value()
+        self.heart_rate_progress.setRange(hr_min, max(self.hr_max_spin.value(), hr_min + 1))
+    
     def update_heart_rate_display(self, heart_rate, heart_rate_float):
         """更新心率显示"""
         self.heart_rate_label.setText(f"{heart_rate}")
         self.heart_rate_float_label.setText(f"{heart_rate_float:.2f}")
-        self.heart_rate_progress.setValue(heart_rate)
+        # 超出范围的值 QProgressBar 会直接忽略，先限制在范围内，文字显示实际心率
+        progress = self.heart_rate_progress
+        progress.setValue(min(max(heart_rate, progress.minimum()), progress.maximum()))
+        progress.setFormat(f"心率: {heart_rate} BPM")
     
     def update_connection_status(self, connected):
         """更新连接状态"""
@@ -438,14 +459,54 @@ class HeartRateMonitorGUI(QMainWindow):
             self.connection_status_label.setText("连接断开")
             self.connection_status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: orange;")
     
+    def update_stale_status(self, stale):
+        """更新心率数据中断状态（连接仍在但没有心率数据）"""
+        if stale:
+            timeout = self.worker.engine.config.stale_timeout if self.worker else 0
+            self.connection_status_label.setText(f"心率数据中断（超过 {timeout:g} 秒无数据）")
+            self.connection_status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: orange;")
+            self.heart_rate_label.setStyleSheet("font-size: 48px; font-weight: bold; color: #95a5a6;")
+            if self.hr_chart:
+                self.hr_chart.set_color("#95a5a6")
+        else:
+            self.connection_status_label.setText("已连接")
+            self.connection_status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: green;")
+            self.heart_rate_label.setStyleSheet("font-size: 48px; font-weight: bold; color: #e74c3c;")
+            if self.hr_chart:
+                self.hr_chart.set_color("#e74c3c")
+    
     def update_device_info(self, device_info):
         """更新设备信息"""
         self.device_info_label.setText(f"设备: {device_info}")
     
     def update_ui(self):
         """定期更新UI"""
-        # 这里可以添加需要定期更新的UI元素
-        pass
+        # 读取工作线程发布的最新样本，每个周期最多重绘一次
+        if self.worker is not None:
+            tracer = self.worker.engine.tracer
+            sample = self.worker.latest.read()
+            if sample is not None and sample.seq != self.last_sample_seq:
+                self.last_sample_seq = sample.seq
+                sample = sample.value
+                self.update_heart_rate_display(sample.heart_rate, sample.percent)
+                self.update_sample_status(self.worker.format_status(sample))
+                if self.hr_chart:
+                    self.hr_chart.add(sample.timestamp, sample.heart_rate)
+                if tracer and sample.received:
+                    tracer.record('ui', sample.received)
+            
+            # 延迟统计每秒刷新一次
+            self.ui_ticks += 1
+            if tracer and self.ui_ticks % 10 == 0:
+                lines = tracer.summary_lines()
+                if lines:
+                    self.latency_label.setText("\n".join(lines))
+        
+        # 曲线只在有新数据时重绘，与其他控件在同一个刷新周期内
+        if self.hr_chart:
+            self.hr_chart.refresh()
+        
+        self.flush_log()
     
     def save_config(self):
         """保存配置到文件"""
@@ -460,11 +521,26 @@ class HeartRateMonitorGUI(QMainWindow):
         self.config.set('DATABASE', 'obs_mode', str(self.obs_mode_combo.currentData()))
         self.config.set('DATABASE', 'data_source', self.data_source_combo.currentData())
         self.config.set('DATABASE', 'pulsoid_widget_id', self.widget_id_edit.text())
+        self.config.set('DATABASE', 'latency_tracing', '1' if self.latency_tracing_check.isChecked() else '0')
         
-        with open('config.ini', 'w') as configfile:
+        # 与 engine.load_config 一致使用 UTF-8，设备名等含中文时热重载也能正确读取
+        with open('config.ini', 'w', encoding='utf-8') as configfile:
             self.config.write(configfile)
         
-        self.log_text.append("配置已保存")
+        self.update_status("配置已保存")
+    
+    def read_config(self):
+        """
+        读取 config.ini（UTF-8）
+
+        旧版本按系统编码（中文 Windows 上为 GBK）保存配置，按 UTF-8 读取失败时改用系统编码读取，
+        下次保存配置时改写为 UTF-8。
+        """
+        try:
+            self.config.read('config.ini', encoding='utf-8')
+        except UnicodeDecodeError:
+            with open('config.ini', encoding=locale.getpreferredencoding(False), errors='replace') as f:
+                self.config.read_file(f)
     
     def closeEvent(self, event):
         """处理窗口关闭事件"""
@@ -475,6 +551,36 @@ class HeartRateMonitorGUI(QMainWindow):
         event.accept()
 
 
+class StartupProbe(QObject):
+    """
+    冷启动探针，设置环境变量 HR_TOOL_STARTUP_PROBE=<文件路径> 时启用
+    
+    首次绘制完成后把 time.perf_counter() 和已加载的数据源模块写入该文件，
+    然后自动开始监测，供 benchmarks/bench_startup.py 测量启动耗时（也适用于打包后的 exe）。
+    """
+    
+    def __init__(self, window, path):
+        super().__init__(window)
+        self.window = window
+        self.path = path
+        self.painted = False
+        window.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.painted:
+            self.painted = True
+            QTimer.singleShot(0, self.on_first_paint)
+        return False
+    
+    def on_first_paint(self):
+        now = time.perf_counter()
+        loaded = [name for name in ('asyncio', 'bleak', 'requests', 'websockets') if name in sys.modules]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(f"first_paint {now}\n")
+            f.write(f"modules {','.join(loaded)}\n")
+        self.window.start_monitoring()
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     
@@ -482,6 +588,9 @@ if __name__ == "__main__":
     app.setStyle('Fusion')
     
     window = HeartRateMonitorGUI()
+    probe_path = os.environ.get('HR_TOOL_STARTUP_PROBE')
+    if probe_path:
+        probe = StartupProbe(window, probe_path)
     window.show()
     
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+BLE 扫描到连接耗时基准（使用 fake_ble 模拟的扫描器，不需要蓝牙适配器）
+
+用法:
+    python benchmarks/bench_ble_scan.py [次数] [广播间隔秒数]
+
+对比两种查找方式从开始扫描到设备连接成功的时间：
+    - 旧方式：BleakScanner.discover()，每次都要等满 5 秒超时才检查结果
+    - 流式扫描：BleSource 的广播回调，收到匹配的广播后立即停止扫描并连接
+
+并输出 BleSource 从开始查找到收到首个心率样本的时间，分别是设备缓存未命中（扫描）和命中（按地址直连）。
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ble_source import BleSource
+from device_cache import DeviceCache
+from engine import EngineConfig, HeartRateEngine
+from fake_ble import FakeBleBackend
+
+DISCOVER_TIMEOUT = 5.0
+
+
+async def legacy_connect(backend, target_name):
+    """旧的查找方式：整轮 discover 后再匹配名称，然后按地址连接"""
+    while True:
+        devices = await backend.scanner.discover(timeout=DISCOVER_TIMEOUT)
+        for device in devices:
+            if device.name and target_name in device.name:
+                client = backend.client(device.address)
+                await client.connect()
+                await client.disconnect()
+                return
+        await asyncio.sleep(1.0)
+
+
+async def streaming_connect(backend, target_name):
+    """流式扫描：运行 BleSource，直到设备连接成功"""
+    config = EngineConfig(device_name=target_name)
+    source = BleSource(config.device_names, scanner=backend.scanner, client_factory=backend.client)
+    engine = HeartRateEngine(config, source=source)
+    task = asyncio.create_task(engine.run())
+    while not source.connected:
+        await asyncio.sleep(0.001)
+    engine.stop()
+    await task
+
+
+async def first_sample(backend, target_name, cache):
+    """运行 BleSource 直到收到首个样本，返回 (查找方式, 秒数)"""
+    config = EngineConfig(device_name=target_name)
+    source = BleSource(config.device_names, scanner=backend.scanner, client_factory=backend.client,
+                       device_cache=cache)
+    engine = HeartRateEngine(config, source=source)
+    task = asyncio.create_task(engine.run())
+    while target_name not in source.first_sample_times:
+        await asyncio.sleep(0.001)
+    engine.stop()
+    await task
+    return source.first_sample_times[target_name]
+
+
+async def measure(connect, trials, adv_interval):
+    times = []
+    for seed in range(trials):
+        backend = FakeBleBackend(count=8, interval=1.0, adv_interval=adv_interval, seed=seed)
+        target_name = backend.device_names[seed % len(backend.device_names)]
+        start = time.perf_counter()
+        await connect(backend, target_name)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(label, times):
+    print(f"{label}: 平均 {statistics.mean(times) * 1000:.0f} ms, "
+          f"最短 {min(times) * 1000:.0f} ms, 最长 {max(times) * 1000:.0f} ms")
+
+
+async def main(trials, adv_interval):
+    print(f"广播间隔 {adv_interval * 1000:.0f} ms, 每种方式 {trials} 次")
+    report("discover()（旧）", await measure(legacy_connect, trials, adv_interval))
+    report("广播回调（流式）", await measure(streaming_connect, trials, adv_interval))
+
+    print("首个心率样本耗时（通知间隔 100 ms）:")
+    results = {'scan': [], 'cache': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for seed in range(trials):
+            backend = FakeBleBackend(count=8, interval=0.1, adv_interval=adv_interval, seed=seed)
+            target_name = backend.device_names[seed % len(backend.device_names)]
+            cache = DeviceCache(os.path.join(tmp, f"devices_{seed}.json"))
+            # 第一次缓存为空需要扫描，第二次使用第一次记录的地址
+            for expected in ('scan', 'cache'):
+                path, elapsed = await first_sample(backend, target_name, cache)
+                assert path == expected, f"预期 {expected}，实际 {path}"
+                results[path].append(elapsed)
+    report("  缓存未命中（扫描）", results['scan'])
+    report("  缓存命中（地址直连）", results['cache'])
+
+
+if __name__ == "__main__":
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    adv_interval = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    asyncio.run(main(trials, adv_interval))
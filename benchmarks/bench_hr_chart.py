@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+心率曲线绘制基准
+
+用法:
+    python benchmarks/bench_hr_chart.py [--width 460] [--height 160] [--frames 50]
+
+在离屏 QImage 上绘制 HeartRateChart，数据为 1 Hz 的合成心率，分别为 1 分钟、1 / 6 / 12 小时，
+以及超过缓冲区容量（环形缓冲区已覆盖）的情况。每帧先加入一个新样本（与实际运行一样，
+每帧都要重新降采样），输出:
+    - 每帧耗时（降采样 + 换算坐标 + 绘制）和其中增量 LTTB 的耗时
+    - 实际绘制的折线点数，以及绘制这些帧时重新计算的桶数
+    - 对比每帧对整个缓冲区从头做 LTTB 的耗时，以及不降采样、直接绘制全部点的每帧耗时
+可加 -platform offscreen 或设置 QT_QPA_PLATFORM=offscreen 在无显示器的环境中运行。
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PyQt5.QtGui import QImage, QPainter, QPen, QColor
+from PyQt5.QtWidgets import QApplication
+
+from hr_chart import DEFAULT_CAPACITY, HeartRateChart, IncrementalLttb, _polyline
+
+
+def synthetic(n):
+    """缓慢起伏的心率加上逐秒的小波动"""
+    t = np.arange(n, dtype=np.float64)
+    hr = 90 + 30 * np.sin(t / 900) + 8 * np.sin(t / 37) + np.random.default_rng(0).normal(0, 3, n)
+    return t, np.round(hr)
+
+
+def fill(chart, n):
+    t, hr = synthetic(n)
+    for i in range(n):
+        chart.add(t[i], hr[i])
+    return n
+
+
+def bench_chart(chart, image, start, frames):
+    """每帧加入一个样本并完整重绘，返回 (每帧秒数, 每帧降采样秒数, 折线点数, 重新计算的桶数)"""
+    downsampler = chart.downsampler
+    points = downsampler.points
+    downsample_time = [0.0]
+
+    def timed(target):
+        t0 = time.perf_counter()
+        result = points(target)
+        downsample_time[0] += time.perf_counter() - t0
+        return result
+
+    downsampler.points = timed
+    computed = downsampler.computed
+    begin = time.perf_counter()
+    for i in range(frames):
+        chart.add(start + i, 90 + 20 * math.sin(i / 10))
+        chart.render(image)
+    elapsed = time.perf_counter() - begin
+    del downsampler.points
+    return (elapsed / frames, downsample_time[0] / frames, chart._cache[0].size(),
+            downsampler.computed - computed)
+
+
+def bench_scratch(chart, width, frames):
+    """每帧新建降采样器、对整个缓冲区从头计算"""
+    begin = time.perf_counter()
+    for _ in range(frames):
+        IncrementalLttb(chart.history).points(width)
+    return (time.perf_counter() - begin) / frames
+
+
+def bench_full(chart, image, frames):
+    """不降采样，用同样的画笔直接绘制缓冲区中的全部点"""
+    t, hr = chart.history.arrays()
+    plot = chart._plot_rect()
+    begin = time.perf_counter()
+    for _ in range(frames):
+        span = max(t[-1] - t[0], 1e-9)
+        x = plot.left() + (t - t[0]) * (plot.width() / span)
+        y = plot.bottom() - (hr - hr.min()) * (plot.height() / max(hr.max() - hr.min(), 1))
+        painter = QPainter(image)
+        painter.fillRect(image.rect(), QColor("#ffffff"))
+        painter.setPen(QPen(QColor("#e74c3c"), 0))
+        painter.drawPolyline(_polyline(x, y))
+        painter.end()
+    return (time.perf_counter() - begin) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=460, help="曲线控件宽度")
+    parser.add_argument("--height", type=int, default=160, help="曲线控件高度")
+    parser.add_argument("--frames", type=int, default=50, help="每种数据量绘制的帧数")
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    cases = [("1 分钟", 60), ("1 小时", 3600), ("6 小时", 6 * 3600), ("12 小时", 12 * 3600),
+             (f"24 小时（超过容量 {DEFAULT_CAPACITY}，环形覆盖）", 24 * 3600)]
+    for label, seconds in cases:
+        chart = HeartRateChart()
+        chart.resize(args.width, args.height)
+        image = QImage(args.width, args.height, QImage.Format_ARGB32_Premultiplied)
+        start = fill(chart, seconds)
+        chart.render(image)     # 预热
+        frame, downsample, points, computed = bench_chart(chart, image, start, args.frames)
+        scratch = bench_scratch(chart, int(chart._plot_rect().width()), max(3, args.frames // 5))
+        full = bench_full(chart, image, max(3, args.frames // 5))
+        print(f"{label}: 缓冲区 {len(chart.history)} 个点, 每帧 {frame * 1000:.2f} ms"
+              f"（降采样 {downsample * 1000:.2f} ms, {args.frames} 帧共重算 {computed} 个桶）, 绘制 {points} 个点; "
+              f"对比每帧从头降采样 {scratch * 1000:.2f} ms, 直接绘制全部点 {full * 1000:.2f} ms")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+0x2A37 解码基准：逐包解码 vs NumPy 向量化批量解码
+
+用法:
+    python benchmarks/bench_hr_decoder.py [数据包数量]
+
+随机生成覆盖所有 Flags 组合的数据包，先用逐包解码结果校验批量解码，
+再分别统计两种方式的吞吐量。
+"""
+
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hr_decoder import decode_batch, decode_heart_rate_measurement, pack_packets
+
+
+def make_packet(rng):
+    """生成一个随机 Flags 组合的心率数据包"""
+    flags = rng.randrange(32)
+    hr = rng.randrange(40, 220)
+    data = bytearray([flags])
+    data += struct.pack("<H", hr) if flags & 0x01 else bytes([hr])
+    if flags & 0x08:
+        data += struct.pack("<H", rng.randrange(65536))
+    if flags & 0x10:
+        for _ in range(rng.randrange(0, 5)):
+            data += struct.pack("<H", rng.randrange(300, 1500))
+    return bytes(data)
+
+
+def verify(packets, batch):
+    for i, packet in enumerate(packets):
+        m = decode_heart_rate_measurement(packet)
+        assert batch.heart_rate[i] == m.heart_rate
+        contact = -1 if m.sensor_contact is None else int(m.sensor_contact)
+        assert batch.sensor_contact[i] == contact
+        energy = -1 if m.energy_expended is None else m.energy_expended
+        assert batch.energy_expended[i] == energy
+        rr = batch.rr_values[batch.rr_offsets[i]:batch.rr_offsets[i + 1]]
+        assert tuple(int(v) for v in rr) == m.rr_intervals
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(42)
+    # 先生成一组不同的数据包再循环复用，加快大规模数据的生成
+    pool = [make_packet(rng) for _ in range(4096)]
+    packets = [pool[i % len(pool)] for i in range(count)]
+
+    buffer, offsets, lengths = pack_packets(packets)
+    verify(packets[:len(pool)], decode_batch(buffer, offsets[:len(pool)], lengths[:len(pool)]))
+
+    scalar_count = min(count, 200000)
+    start = time.perf_counter()
+    for packet in packets[:scalar_count]:
+        decode_heart_rate_measurement(packet)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = decode_batch(buffer, offsets, lengths)
+    vectorized = time.perf_counter() - start
+
+    print(f"逐包解码: {scalar_count / scalar / 1e6:.2f} M 包/秒 ({scalar_count} 包)")
+    print(f"批量解码: {count / vectorized / 1e6:.2f} M 包/秒 ({count} 包, "
+          f"{len(batch.rr_values)} 个 RR 间期, {len(buffer) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+滑动窗口统计基准
+
+用法:
+    python benchmarks/bench_hr_stats.py [--window 60] [--updates 200000]
+
+1. HrStatistics.update() 单次耗时：样本间隔分别为 1 秒（1 Hz，窗口内约 60 个值）
+   和 1/1000、1/5000 秒（回放速度，窗口内 6 万、30 万个值），耗时应基本不随窗口内的值数变化；
+   同时对比每次对整个窗口重新计算 min/max/mean 的做法
+2. 不限速回放合成 BLE 数据（带 RR 间期），对比配置附加统计地址前后每条数据的 CPU 时间
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import socket
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import CaptureRecord, ReplaySource
+from engine import EngineConfig, HeartRateEngine
+from fake_ble import FakePeripheral
+from hr_stats import HrStatistics
+
+
+def bench_update(rate, window, updates):
+    statistics = HrStatistics(window, window)
+    step = 1.0 / rate
+    start = time.perf_counter()
+    for n in range(updates):
+        hr = 90 + round(40 * math.sin(n / 50))
+        statistics.update(hr, (round(61440 / hr),), n * step)
+        statistics.values()
+    elapsed = time.perf_counter() - start
+    return elapsed / updates, len(statistics.heart_rate)
+
+
+def bench_naive(rate, window, updates):
+    """每次更新都遍历整个窗口"""
+    items = deque()
+    step = 1.0 / rate
+    start = time.perf_counter()
+    for n in range(updates):
+        now = n * step
+        items.append((now, 90 + round(40 * math.sin(n / 50))))
+        while items[0][0] <= now - window:
+            items.popleft()
+        values = [v for _, v in items]
+        min(values), max(values), sum(values) / len(values)
+    return (time.perf_counter() - start) / updates, len(items)
+
+
+async def replay(records, receiver, with_stats):
+    addresses = {}
+    if with_stats:
+        addresses = dict(osc_hr_min="/avatar/parameters/HRMin", osc_hr_max="/avatar/parameters/HRMax",
+                         osc_hr_avg="/avatar/parameters/HRAvg", osc_hrv="/avatar/parameters/HRV")
+    config = EngineConfig(osc_port=receiver.getsockname()[1], data_source='replay', **addresses)
+    source = ReplaySource("synthetic", 0, records)
+    engine = HeartRateEngine(config, source=source)
+    cpu_start = time.process_time()
+    await engine.run()
+    return (time.process_time() - cpu_start) / source.replayed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--window", type=float, default=60.0, help="窗口长度（秒）")
+    parser.add_argument("--updates", type=int, default=400000, help="每档的更新次数")
+    args = parser.parse_args()
+
+    for rate in (1, 1000, 5000):
+        per_update, size = bench_update(rate, args.window, args.updates)
+        naive, naive_size = bench_naive(rate, args.window, min(args.updates, 20000))
+        print(f"{rate} Hz（窗口内 {size} 个值）: update {per_update * 1e6:.2f} us/次; "
+              f"对比每次遍历窗口（{naive_size} 个值）: {naive * 1e6:.1f} us/次")
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    device = FakePeripheral("Band A", "00:00:00:00:00:01", 80)
+    # 每秒 1000 条，模拟高倍速回放
+    records = [CaptureRecord(n / 1000, 'ble', device.packet(n), device.name) for n in range(args.updates)]
+    asyncio.run(replay(records[:1000], receiver, True))    # 预热
+    without = asyncio.run(replay(records, receiver, False))
+    with_stats = asyncio.run(replay(records, receiver, True))
+    print(f"不限速回放 {len(records)} 条: 无统计 {without * 1e6:.2f} us/条, "
+          f"附加统计地址 {with_stats * 1e6:.2f} us/条（+{(with_stats - without) * 1e6:.2f}）")
+    receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+多设备 BLE 汇聚基准：在模拟的 bleak 后端上同时监测几十个设备
+
+用法:
+    python benchmarks/bench_multi_device.py [设备数] [运行秒数] [primary_stale_after]
+
+检查所有设备都能连上并持续送达样本，并在运行中途断开主设备，确认 priority 策略直接切换到下一个设备、
+主设备恢复后切回。主设备断开的时长为 2 倍 primary_stale_after（默认与 EngineConfig 相同），
+之后等到它按退避重连成功并重新成为主数据源，所以实际运行时间可能超过给定的秒数。
+输出每秒处理的通知数和主数据源切换情况。
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ble_source import BleSource
+from engine import EngineConfig, EngineListener, HeartRateEngine
+from fake_ble import FakeBleBackend
+
+
+class CountingListener(EngineListener):
+    def __init__(self):
+        self.primary_samples = 0
+        self.primary_devices = []
+
+    def on_sample(self, sample):
+        self.primary_samples += 1
+        if not self.primary_devices or self.primary_devices[-1] != sample.device:
+            self.primary_devices.append(sample.device)
+
+
+async def main(count, duration, stale_after):
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+
+    backend = FakeBleBackend(count=count, interval=0.05)
+    config = EngineConfig(osc_port=receiver.getsockname()[1], device_name=",".join(backend.device_names),
+                          primary_stale_after=stale_after)
+    source = BleSource(config.device_names, primary_stale_after=config.primary_stale_after,
+                       scanner=backend.scanner, client_factory=backend.client)
+    listener = CountingListener()
+    engine = HeartRateEngine(config, listener, source=source)
+
+    task = asyncio.create_task(engine.run())
+    start = time.perf_counter()
+    await asyncio.sleep(duration / 3)
+    connected_before_drop = len(source.connected)
+    # 设备按广播先后连接，启动阶段主数据源会逐步切到优先级更高的设备，只检查断开之后的切换
+    switches_before_drop = len(listener.primary_devices)
+    # 断开时长超过 stale_after：接替必须来自断开回调，等待超时的话会先中断 stale_after 秒
+    down_for = 2 * config.primary_stale_after
+    backend.drop(backend.device_names[0], down_for=down_for)
+    await asyncio.sleep(down_for)
+    # 重连按指数退避，恢复时间不确定，等到主设备切回（最多再等 4 倍断开时长）
+    deadline = time.perf_counter() + 4 * down_for
+    while listener.primary_devices[-1] != backend.device_names[0] and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(max(0.0, start + duration - time.perf_counter()))
+    engine.stop()
+    await task
+    elapsed = time.perf_counter() - start
+    receiver.close()
+
+    print(f"设备数: {count}, 已连接: {connected_before_drop}, 扫描次数: {backend.scans_started}")
+    print(f"通知总数: {backend.notifications} ({backend.notifications / elapsed:.0f} 条/秒)")
+    print(f"主数据源样本: {listener.primary_samples}, 切换顺序: {' -> '.join(listener.primary_devices)}")
+    print(f"{backend.device_names[0]} 断开统计: {source.sessions[backend.device_names[0]].summary()}")
+    assert connected_before_drop == count, "存在未连接的设备"
+    # 主设备断开后直接由优先级次之的设备接替，主设备恢复后切回
+    failover = listener.primary_devices[switches_before_drop:]
+    assert failover == [backend.device_names[1], backend.device_names[0]], "主数据源切换不符合 priority 策略"
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 24.0
+    stale_after = float(sys.argv[3]) if len(sys.argv) > 3 else EngineConfig.primary_stale_after
+    asyncio.run(main(count, duration, stale_after))
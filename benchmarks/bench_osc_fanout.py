@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+OSC 多目标发送基准
+
+用法:
+    python benchmarks/bench_osc_fanout.py [样本数]
+
+对比只有一个可达目标时，和额外加入地址相同的目标、地址不同的目标、不可达目标时的单样本耗时，
+确认不可达目标不会拖慢其他目标，并输出每个目标的发送统计。
+"""
+
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from osc_output import OscFanout, OscTarget
+
+ADDRESSES = ("/avatar/parameters/HR", "/avatar/parameters/HRF", "/avatar/parameters/isHRActive")
+OVERLAY_ADDRESSES = ("/overlay/hr", "/overlay/hr_percent", "")
+
+
+def make_receiver():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    receiver.setblocking(False)
+    return receiver
+
+
+def drain(receivers):
+    for receiver in receivers:
+        try:
+            while True:
+                receiver.recv(65536)
+        except BlockingIOError:
+            pass
+
+
+def closed_port():
+    """获取一个当前没有进程监听的本地端口"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(targets, receivers, samples):
+    fanout = OscFanout(targets)
+    start = time.perf_counter()
+    for i in range(samples):
+        hr = 60 + i % 120
+        fanout.send(hr, min(hr / 250, 1.0))
+        if i % 128 == 0:
+            drain(receivers)
+    elapsed = time.perf_counter() - start
+    fanout.close()
+    return elapsed / samples, fanout.stats
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    receivers = [make_receiver() for _ in range(3)]
+    ports = [r.getsockname()[1] for r in receivers]
+
+    vrchat = OscTarget("vrchat", "127.0.0.1", ports[0], *ADDRESSES)
+    second_pc = OscTarget("second_pc", "127.0.0.1", ports[1], *ADDRESSES)
+    overlay = OscTarget("overlay", "127.0.0.1", ports[2], *OVERLAY_ADDRESSES)
+    refused = OscTarget("closed_port", "127.0.0.1", closed_port(), *ADDRESSES)
+    # 192.0.2.0/24 为文档保留地址 (RFC 5737)，不会有任何主机响应
+    unroutable = OscTarget("unreachable", "192.0.2.1", 9000, *ADDRESSES)
+
+    baseline, _ = run([vrchat], receivers, samples)
+    print(f"1 个目标: {baseline * 1e6:.2f} us/样本")
+
+    reachable, _ = run([vrchat, second_pc, overlay], receivers, samples)
+    print(f"3 个可达目标（2 组地址）: {reachable * 1e6:.2f} us/样本")
+
+    mixed, stats = run([vrchat, second_pc, overlay, refused, unroutable], receivers, samples)
+    print(f"3 个可达 + 2 个不可达目标: {mixed * 1e6:.2f} us/样本")
+    for name, target_stats in stats.items():
+        print(f"  {name}: 发送 {target_stats.sent}, 失败 {target_stats.errors}"
+              + (f" ({target_stats.last_error})" if target_stats.last_error else ""))
+
+    for receiver in receivers:
+        receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+OSC 发送微基准：python-osc 三条消息 vs 预编码单 bundle
+
+用法:
+    python benchmarks/bench_osc_output.py [样本数]
+
+向本机一个接收套接字发送心率样本，统计每个样本的耗时和 sendto 调用次数，
+并用 python-osc 解析一次 bundle 以确认编码正确。
+"""
+
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.udp_client import SimpleUDPClient
+
+from osc_output import OscBundleSender
+
+OSC_INT = "/avatar/parameters/HR"
+OSC_FLOAT = "/avatar/parameters/HRF"
+OSC_BOOL = "/avatar/parameters/isHRActive"
+
+
+class CountingSocket:
+    """包装套接字，统计 sendto 调用次数"""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.sendto_calls = 0
+
+    def sendto(self, data, addr):
+        self.sendto_calls += 1
+        return self._sock.sendto(data, addr)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def drain(receiver):
+    """清空接收缓冲区，避免缓冲区满导致丢包影响计时"""
+    try:
+        while True:
+            receiver.recv(65536)
+    except BlockingIOError:
+        pass
+
+
+def bench_three_messages(port, samples, receiver):
+    client = SimpleUDPClient("127.0.0.1", port)
+    counter = CountingSocket(client._sock)
+    client._sock = counter
+    start = time.perf_counter()
+    for i in range(samples):
+        hr = 60 + i % 120
+        client.send_message(OSC_BOOL, True)
+        client.send_message(OSC_INT, hr)
+        client.send_message(OSC_FLOAT, min(hr / 250, 1.0))
+        if i % 256 == 0:
+            drain(receiver)
+    elapsed = time.perf_counter() - start
+    return elapsed, counter.sendto_calls
+
+
+def bench_bundle(port, samples, receiver):
+    sender = OscBundleSender("127.0.0.1", port, OSC_INT, OSC_FLOAT, OSC_BOOL)
+    (template, routes), = sender._groups
+    sock, addr, stats = routes[0]
+    counter = CountingSocket(sock)
+    routes[0] = (counter, addr, stats)
+    start = time.perf_counter()
+    for i in range(samples):
+        hr = 60 + i % 120
+        sender.send(hr, min(hr / 250, 1.0))
+        if i % 256 == 0:
+            drain(receiver)
+    elapsed = time.perf_counter() - start
+    sender.close()
+    return elapsed, counter.sendto_calls
+
+
+def verify_bundle(port, receiver):
+    drain(receiver)
+    sender = OscBundleSender("127.0.0.1", port, OSC_INT, OSC_FLOAT, OSC_BOOL)
+    sender.send(123, 0.492)
+    sender.close()
+    receiver.setblocking(True)
+    data = receiver.recv(65536)
+    receiver.setblocking(False)
+    bundle = OscBundle(data)
+    decoded = [(msg.address, msg.params) for msg in bundle]
+    assert decoded[0] == (OSC_BOOL, [True]), decoded
+    assert decoded[1] == (OSC_INT, [123]), decoded
+    assert decoded[2][0] == OSC_FLOAT and abs(decoded[2][1][0] - 0.492) < 1e-6, decoded
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    receiver.setblocking(False)
+    port = receiver.getsockname()[1]
+
+    verify_bundle(port, receiver)
+
+    for name, func in (("python-osc 三条消息", bench_three_messages),
+                       ("预编码单 bundle", bench_bundle)):
+        elapsed, calls = func(port, samples, receiver)
+        print(f"{name}: {elapsed / samples * 1e6:.2f} us/样本, "
+              f"{calls / samples:.1f} 次 sendto/样本 ({samples} 个样本)")
+
+    receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+插值输出调度器基准
+
+用法:
+    python benchmarks/bench_output_scheduler.py [--seconds 每档秒数] [--rates 30,60,120] [--max-rate 0]
+
+用模拟数据源（每秒一个持续变化的心率样本）运行引擎，先不开启插值输出作为基线，
+再依次以各个频率开启（osc_max_rate 默认为 0 即不限，设为非 0 时插值频率不会超过它），输出:
+    - 每秒 CPU 时间（及相对基线增加的部分）
+    - 实际收到的 float 消息频率、定时回调最大延迟和跳过的时间点
+    - 接收端相邻 float 值的最大跳变（越小越平滑）
+另外输出同频率下什么都不做的 call_at 定时器的 CPU 时间，作为事件循环唤醒本身的开销参考；
+最后对比每条消息 asyncio.sleep(period) 一次的简单循环，展示其实际频率因累积误差低于目标。
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import EngineConfig, HeartRateEngine
+from simulated_source import SimulatedSource
+
+OSC_FLOAT = "/avatar/parameters/HRF"
+
+
+class FloatReceiver(asyncio.DatagramProtocol):
+    """接收并解析 float 参数（单条消息或 bundle 中的元素）"""
+
+    def __init__(self):
+        self.values = []
+        self._key = OSC_FLOAT.encode() + b"\x00"
+
+    def datagram_received(self, data, addr):
+        index = data.find(self._key)
+        if index < 0:
+            return
+        # 地址和 ",f" 类型标签各补齐到 4 字节后紧跟 float 值
+        offset = index + len(self._key) + (-len(self._key) % 4) + 4
+        self.values.append(struct.unpack_from(">f", data, offset)[0])
+
+
+async def run_engine(rate, seconds, max_rate=0.0):
+    loop = asyncio.get_running_loop()
+    transport, receiver = await loop.create_datagram_endpoint(FloatReceiver, local_addr=("127.0.0.1", 0))
+    config = EngineConfig(osc_port=transport.get_extra_info("sockname")[1], data_source='simulate',
+                          osc_output_rate=rate, osc_max_rate=max_rate)
+    # 振幅较大，让每个样本的心率都有变化
+    engine = HeartRateEngine(config, source=SimulatedSource(amplitude=40))
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0)
+    scheduler = engine.scheduler
+
+    cpu_start = time.process_time()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu_start
+    engine.stop()
+    await task
+    transport.close()
+
+    values = receiver.values
+    max_step = max((abs(b - a) for a, b in zip(values, values[1:])), default=0.0)
+    return cpu, len(values), max_step, scheduler
+
+
+async def bare_timer(rate, seconds):
+    """只重新安排自己的 call_at 定时器，返回 CPU 时间"""
+    loop = asyncio.get_running_loop()
+    period = 1.0 / rate
+    state = {'next': loop.time()}
+
+    def tick():
+        state['next'] += period
+        state['handle'] = loop.call_at(state['next'], tick)
+
+    tick()
+    cpu_start = time.process_time()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu_start
+    state['handle'].cancel()
+    return cpu
+
+
+async def naive_loop(rate, seconds):
+    """每条消息 sleep 一个周期的简单实现"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    period = 1.0 / rate
+    sent = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        sock.sendto(b"x", ("127.0.0.1", 9))
+        sent += 1
+        await asyncio.sleep(period)
+    sock.close()
+    return sent / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0, help="每个频率运行的秒数")
+    parser.add_argument("--rates", default="30,60,120", help="以逗号分隔的输出频率（Hz）")
+    parser.add_argument("--max-rate", type=float, default=0.0, help="osc_max_rate，0 为不限")
+    args = parser.parse_args()
+    rates = [float(r) for r in args.rates.split(",")]
+
+    base_cpu, base_msgs, base_step, _ = asyncio.run(run_engine(0, args.seconds, args.max_rate))
+    print(f"关闭插值: CPU {base_cpu / args.seconds * 1000:.2f} ms/秒, "
+          f"float 消息 {base_msgs / args.seconds:.1f} 条/秒, 最大跳变 {base_step:.4f}")
+
+    for rate in rates:
+        cpu, msgs, max_step, scheduler = asyncio.run(run_engine(rate, args.seconds, args.max_rate))
+        print(f"{rate:g} Hz: CPU {cpu / args.seconds * 1000:.2f} ms/秒"
+              f"（+{(cpu - base_cpu) / args.seconds * 1000:.2f}）, "
+              f"float 消息 {msgs / args.seconds:.1f} 条/秒, 最大跳变 {max_step:.4f}, "
+              f"回调最大延迟 {scheduler.max_late * 1000:.2f} ms, 跳过 {scheduler.skipped} 个时间点, "
+              f"限速未发送 {scheduler.rate_limited} 条")
+
+    for rate in rates:
+        cpu = asyncio.run(bare_timer(rate, min(args.seconds, 3.0)))
+        print(f"参考 - 空定时器: {rate:g} Hz, CPU {cpu / min(args.seconds, 3.0) * 1000:.2f} ms/秒")
+
+    for rate in rates:
+        achieved = asyncio.run(naive_loop(rate, min(args.seconds, 3.0)))
+        print(f"对比 - 每条消息 sleep 一次: 目标 {rate:g} Hz, 实际 {achieved:.1f} Hz")
+
+
+if __name__ == "__main__":
+    main()
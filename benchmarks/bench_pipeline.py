@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+样本管道基准：慢输出端是否拖慢数据源
+
+用法:
+    python benchmarks/bench_pipeline.py [--samples 2000] [--delay 0.005] [--repeat 3]
+
+不限速回放合成 BLE 数据（每条都发送 OSC），另外挂一个每个样本要花 delay 秒的慢输出端
+（模拟被杀毒软件或网络盘卡住的文件写入），对比:
+    1. 慢输出端在事件循环中直接调用（改造前 rate.txt / 会话记录的做法）
+    2. 慢输出端放在管道的有界队列中，依次使用 DROP_OLDEST / DROP_NEWEST / KEEP_LATEST
+输出分发全部样本的耗时和每秒样本数、停止时处理队列剩余样本的耗时，
+以及队列的最大长度、已处理数和丢弃数。
+正式计时前先完整回放一次预热（导入模块、首次分配等），除慢输出端在事件循环中的情况
+（耗时由 sleep 决定）外，每种情况运行 repeat 次取分发最快的一次，避免首次运行的开销影响对比。
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import CaptureRecord, ReplaySource
+from engine import EngineConfig, EngineListener, HeartRateEngine
+from fake_ble import FakePeripheral
+from pipeline import DROP_NEWEST, DROP_OLDEST, KEEP_LATEST, SinkQueue, format_sink_stats
+
+
+class SlowSink(SinkQueue):
+    """每个样本 sleep delay 秒的输出端"""
+
+    def __init__(self, delay, overflow):
+        super().__init__(f"slow-{overflow}", maxsize=64, overflow=overflow)
+        self.delay = delay
+
+    def handle(self, sample):
+        time.sleep(self.delay)
+
+
+class TimingListener(EngineListener):
+    """记录最后一个样本分发完的时间；delay 不为 0 时在事件循环中直接执行慢操作"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.last = 0.0
+
+    def on_sample(self, sample):
+        if self.delay:
+            time.sleep(self.delay)
+        self.last = time.perf_counter()
+
+
+async def replay(records, port, delay=0.0, sink=None):
+    """返回 (分发全部样本的秒数, 停止时等待队列处理完的秒数, 样本数)"""
+    config = EngineConfig(osc_port=port, data_source='replay', osc_keepalive=0, osc_max_rate=0)
+    listener = TimingListener(delay)
+    engine = HeartRateEngine(config, listener, source=ReplaySource("synthetic", 0, records))
+    if sink is not None:
+        engine.pipeline.add(sink)
+    start = time.perf_counter()
+    await engine.run()
+    end = time.perf_counter()
+    return listener.last - start, end - listener.last, engine.samples_sent
+
+
+def best_of(repeat, run):
+    """运行 repeat 次 run()，返回分发耗时最短的一次结果"""
+    return min((run() for _ in range(repeat)), key=lambda result: result[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=2000, help="回放的样本数")
+    parser.add_argument("--delay", type=float, default=0.005, help="慢输出端处理每个样本的秒数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种情况的运行次数，取最快的一次")
+    args = parser.parse_args()
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    port = receiver.getsockname()[1]
+    device = FakePeripheral("Band A", "00:00:00:00:00:01", 80)
+    records = [CaptureRecord(n / 1000, 'ble', device.packet(n), device.name) for n in range(args.samples)]
+
+    # 预热，不计入结果
+    asyncio.run(replay(records, port))
+
+    elapsed, _, sent = best_of(args.repeat, lambda: asyncio.run(replay(records, port)))
+    print(f"无慢输出端: 分发 {elapsed * 1000:.0f} ms, {sent / elapsed:.0f} 样本/秒")
+
+    elapsed, _, sent = asyncio.run(replay(records, port, delay=args.delay))
+    print(f"慢输出端在事件循环中（每个 {args.delay * 1000:g} ms）: 分发 {elapsed * 1000:.0f} ms, "
+          f"{sent / elapsed:.0f} 样本/秒")
+
+    for overflow in (DROP_OLDEST, DROP_NEWEST, KEEP_LATEST):
+        def run():
+            sink = SlowSink(args.delay, overflow)
+            return asyncio.run(replay(records, port, sink=sink)) + (sink,)
+
+        elapsed, drain, sent, sink = best_of(args.repeat, run)
+        print(f"慢输出端在队列中（{overflow}）: 分发 {elapsed * 1000:.0f} ms, {sent / elapsed:.0f} 样本/秒, "
+              f"停止时处理剩余样本 {drain * 1000:.0f} ms; {format_sink_stats(sink.stats())}")
+    receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+回放吞吐基准：把录制的原始数据以不限速回放，经过完整的解码 -> 主数据源选择 -> OSC 发送流程
+
+用法:
+    python benchmarks/bench_replay.py [录制文件] [--records N] [--speed 倍速]
+
+不指定录制文件时生成一段合成数据（2 个 BLE 设备 + Pulsoid 消息，各 1 Hz）。
+输出:
+    - 每秒处理的数据条数
+    - 每条数据的 CPU 时间
+    - 每条数据的内存分配：tracemalloc 统计的分配峰值，以及回放前后存活内存块数的变化（应接近 0，
+      否则说明热路径上有对象被持续保留）
+另外用 --speed（默认 100）回放前 10 秒数据，检查定时回放的误差；
+并在开启延迟追踪（latency_tracing = 1）后再回放一次，对比 CPU 开销并输出各阶段延迟。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import CaptureRecord, ReplaySource, read_capture, write_capture
+from engine import EngineConfig, EngineListener, HeartRateEngine
+from fake_ble import FakePeripheral
+
+
+class DrainingListener(EngineListener):
+    """统计样本数，并定期清空 OSC 接收端，避免接收缓冲区满"""
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+        self.samples = 0
+
+    def on_sample(self, sample):
+        self.samples += 1
+        if self.samples % 128 == 0:
+            try:
+                while True:
+                    self.receiver.recv(65536)
+            except BlockingIOError:
+                pass
+
+
+def synthetic_records(count):
+    """生成 count 条合成数据：两个 BLE 设备和 Pulsoid 消息交替，每种每秒一条"""
+    devices = [FakePeripheral("Band A", "00:00:00:00:00:01", 70),
+               FakePeripheral("Strap B", "00:00:00:00:00:02", 90)]
+    records = []
+    for i in range(count):
+        n, kind = divmod(i, 3)
+        t = n + kind / 3
+        if kind < 2:
+            device = devices[kind]
+            records.append(CaptureRecord(t, 'ble', device.packet(n), device.name))
+        else:
+            records.append(CaptureRecord(t, 'ws', json.dumps({'data': {'heartRate': 80 + n % 20}})))
+    return records
+
+
+async def replay(source, receiver, tracing):
+    config = EngineConfig(osc_port=receiver.getsockname()[1], data_source='replay',
+                          latency_tracing=int(tracing))
+    listener = DrainingListener(receiver)
+    engine = HeartRateEngine(config, listener, source=source)
+    await engine.run()
+    listener.tracer = engine.tracer
+    return listener
+
+
+def run(path, records, speed, receiver, tracing=False):
+    """回放已读取的记录（不计入读取文件的时间）"""
+    source = ReplaySource(path, speed, records)
+    listener = asyncio.run(replay(source, receiver, tracing))
+    return source, listener
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capture", nargs="?", help="录制文件，不指定时生成合成数据")
+    parser.add_argument("--records", type=int, default=150000, help="合成数据条数")
+    parser.add_argument("--speed", type=float, default=100.0, help="定时回放检查使用的倍速")
+    args = parser.parse_args()
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    receiver.setblocking(False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.capture
+        if path is None:
+            path = os.path.join(tmp, "synthetic.jsonl")
+            write_capture(path, synthetic_records(args.records))
+
+        records = list(read_capture(path))
+        limit = 10.0
+        head = [r for r in records if r.t < limit]
+
+        # 预热一次，排除导入和首次编码的开销
+        run(path, head, 0, receiver)
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        source, listener = run(path, records, 0, receiver)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        count = source.replayed
+        print(f"数据条数: {count}（主数据源样本 {listener.samples}）")
+        print(f"不限速: {count / wall:,.0f} 条/秒, CPU {cpu / count * 1e6:.2f} us/条")
+
+        tracemalloc.start()
+        blocks_before = sys.getallocatedblocks()
+        source, _ = run(path, records, 0, receiver)
+        blocks_after = sys.getallocatedblocks()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"内存: 分配峰值 {peak / count:.1f} 字节/条, "
+              f"存活内存块变化 {(blocks_after - blocks_before) / count:+.4f} 个/条")
+
+        start = time.perf_counter()
+        run(path, head, args.speed, receiver)
+        elapsed = time.perf_counter() - start
+        expected = max(r.t for r in head) / args.speed
+        print(f"{args.speed:g} 倍速回放前 {limit:g} 秒: 用时 {elapsed * 1000:.0f} ms, "
+              f"预期 {expected * 1000:.0f} ms")
+
+        cpu_start = time.process_time()
+        _, listener = run(path, records, 0, receiver, tracing=True)
+        traced_cpu = time.process_time() - cpu_start
+        print(f"开启延迟追踪: CPU {traced_cpu / count * 1e6:.2f} us/条"
+              f"（关闭时 {cpu / count * 1e6:.2f} us/条）")
+        for line in listener.tracer.summary_lines():
+            print(f"  {line}")
+
+    receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+会话记录基准
+
+用法:
+    python benchmarks/bench_session_log.py [--hours 12] [--devices 2]
+
+生成一段每个设备 1 Hz、带 RR 间期的多设备会话（写入线程正常运行），输出:
+    - record() 每次调用的耗时（在引擎事件循环中执行的部分）
+    - 文件大小
+    - 打开（内存映射）、最低 / 最高 / 平均、心率区间时间的耗时
+    - CSV 导出耗时
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_log import DEFAULT_ZONES, SessionLog, SessionRecorder
+
+
+class FakeClock:
+    """按样本推进的时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def generate(path, hours, devices):
+    clock = FakeClock()
+    recorder = SessionRecorder(path, clock=clock)
+    recorder.start()
+    names = [f"Band {i}" for i in range(devices)]
+    seconds = int(hours * 3600)
+    elapsed = 0.0
+    for n in range(seconds):
+        clock.now = float(n)
+        for i, name in enumerate(names):
+            hr = 90 + round(40 * math.sin(n / 600 + i))
+            rr = round(60 / hr * 1024)
+            start = time.perf_counter()
+            recorder.record(hr, (rr, rr + 3), name, primary=(i == 0))
+            elapsed += time.perf_counter() - start
+    recorder.close()
+    return recorder.records, elapsed
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=12.0, help="会话时长（小时）")
+    parser.add_argument("--devices", type=int, default=2, help="设备数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.hrs")
+        records, elapsed = generate(path, args.hours, args.devices)
+        print(f"{args.hours:g} 小时 x {args.devices} 个设备: {records} 条记录, "
+              f"文件 {os.path.getsize(path) / 1024:.0f} KB, record() {elapsed / records * 1e6:.2f} us/次")
+
+        log, open_ms = timed(SessionLog, path)
+        stats, stats_ms = timed(log.stats)
+        bounds = [round(190 * p) for p in DEFAULT_ZONES]
+        zones, zone_ms = timed(log.zone_time, bounds)
+        device_stats, device_ms = timed(log.stats, log.sources[-1])
+        print(f"打开: {open_ms:.2f} ms")
+        print(f"主数据源统计: {stats_ms:.2f} ms（{stats.samples} 个样本, 最低 {stats.minimum}, "
+              f"最高 {stats.maximum}, 平均 {stats.mean:.1f}）")
+        print(f"心率区间时间: {zone_ms:.2f} ms（合计 {zones.sum() / 3600:.2f} 小时）")
+        print(f"单设备统计（{log.sources[-1]}）: {device_ms:.2f} ms")
+
+        _, csv_ms = timed(log.export_csv, os.path.join(tmp, "session.csv"))
+        print(f"CSV 导出: {csv_ms:.0f} ms")
+        del log
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+数据中断看门狗基准
+
+用法:
+    python benchmarks/bench_stale_watchdog.py [--devices 16] [--timeout 1.0] [--interval 0.1]
+
+在模拟的 bleak 后端上连接多个设备（每个设备配置单独的 isHRActive 地址），稳定运行一段时间后
+让所有设备保持连接但停止通知，输出:
+    - 稳定运行期间的样本数和看门狗定时器唤醒次数（唤醒次数只与 timeout 有关，与样本频率无关）
+    - 从停止通知到接收端收到 isHRActive=False 的时间（应在 timeout - interval 到 timeout 之间，
+      加上少量调度延迟）
+    - 恢复通知后主输出重新发送 isHRActive=True 的时间
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ble_source import BleSource
+from engine import DeviceConfig, EngineConfig, HeartRateEngine
+from fake_ble import FakeBleBackend
+from osc_output import encode_message
+
+MAIN_BOOL = "/avatar/parameters/isHRActive"
+
+
+class BoolReceiver(asyncio.DatagramProtocol):
+    """记录每个 bool 地址收到 True / False 的时间"""
+
+    def __init__(self, addresses):
+        self.loop = asyncio.get_running_loop()
+        self.patterns = {(address, value): encode_message(address, "T" if value else "F")
+                         for address in addresses for value in (True, False)}
+        self.events = []    # (时间, 地址, 值)
+
+    def datagram_received(self, data, addr):
+        now = self.loop.time()
+        for (address, value), pattern in self.patterns.items():
+            if pattern in data:
+                self.events.append((now, address, value))
+
+    def first(self, value, since, addresses):
+        """since 之后每个地址第一次收到 value 的时间"""
+        result = {}
+        for t, address, v in self.events:
+            if v == value and t >= since and address in addresses and address not in result:
+                result[address] = t
+        return result
+
+
+async def run(devices, timeout, interval):
+    loop = asyncio.get_running_loop()
+    backend = FakeBleBackend(count=devices, interval=interval, adv_interval=0.02)
+    names = backend.device_names
+    device_bools = [f"/avatar/parameters/isHR{i}Active" for i in range(devices)]
+    transport, receiver = await loop.create_datagram_endpoint(
+        lambda: BoolReceiver([MAIN_BOOL] + device_bools), local_addr=("127.0.0.1", 0))
+    config = EngineConfig(device_name=",".join(names), osc_port=transport.get_extra_info("sockname")[1],
+                          stale_timeout=timeout,
+                          devices=[DeviceConfig(name, osc_bool=address) for name, address in zip(names, device_bools)])
+    source = BleSource(names, scanner=backend.scanner, client_factory=backend.client)
+    engine = HeartRateEngine(config, source=source)
+    task = asyncio.create_task(engine.run())
+
+    while len(source.connected) < devices:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(interval * 2)
+
+    steady = timeout * 5
+    samples, wakeups = engine.samples_received, engine.watchdog.wakeups
+    await asyncio.sleep(steady)
+    samples, wakeups = engine.samples_received - samples, engine.watchdog.wakeups - wakeups
+    print(f"{devices} 个设备稳定运行 {steady:g} 秒: {samples} 个样本, 看门狗唤醒 {wakeups} 次")
+
+    frozen_for = timeout * 3
+    frozen_at = loop.time()
+    for name in names:
+        backend.freeze(name, frozen_for)
+    await asyncio.sleep(frozen_for + interval * 3)
+
+    falses = receiver.first(False, frozen_at, [MAIN_BOOL] + device_bools)
+    delays = sorted(t - frozen_at for t in falses.values())
+    print(f"停止通知后收到 isHRActive=False: {len(falses)}/{devices + 1} 个地址, "
+          f"用时 {delays[0]:.3f} - {delays[-1]:.3f} 秒（timeout {timeout:g} 秒, 通知间隔 {interval:g} 秒）"
+          if delays else "没有收到 isHRActive=False")
+
+    recovered = receiver.first(True, frozen_at + frozen_for, [MAIN_BOOL])
+    if MAIN_BOOL in recovered:
+        print(f"恢复通知后主输出重新发送 isHRActive=True: "
+              f"{recovered[MAIN_BOOL] - frozen_at - frozen_for:.3f} 秒")
+    else:
+        print("恢复通知后主输出没有重新发送 isHRActive=True")
+
+    engine.stop()
+    await task
+    transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=16, help="设备数")
+    parser.add_argument("--timeout", type=float, default=1.0, help="stale_timeout（秒）")
+    parser.add_argument("--interval", type=float, default=0.1, help="模拟设备的通知间隔（秒）")
+    args = parser.parse_args()
+    asyncio.run(run(args.devices, args.timeout, args.interval))
+
+
+if __name__ == "__main__":
+    main()
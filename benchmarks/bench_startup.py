@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+冷启动基准：进程启动 -> 首次绘制 -> 第一个 OSC 数据包
+
+用法:
+    python benchmarks/bench_startup.py                 # 源码版 GUI
+    python benchmarks/bench_startup.py --exe dist/HeartRate_to_VRC.exe   # 打包后的 exe
+    python benchmarks/bench_startup.py --cli           # 命令行版（只测第一个 OSC 数据包）
+
+每次运行都在临时目录中生成 config.ini（data_source = simulate，OSC 指向本脚本的接收端口），
+GUI 通过 HR_TOOL_STARTUP_PROBE 环境变量报告首次绘制时间并自动开始监测。
+时间均使用 time.perf_counter()（Windows 的 QPC 与 Linux 的 CLOCK_MONOTONIC 都是系统级时钟，可跨进程比较）。
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG_TEMPLATE = """[DATABASE]
+osc_ip = 127.0.0.1
+osc_port = {port}
+osc_int = /avatar/parameters/HR
+osc_float = /avatar/parameters/HRF
+osc_bool = /avatar/parameters/isHRActive
+hr_min = 1
+hr_max = 250
+device_name =
+obs_mode = 0
+data_source = simulate
+pulsoid_widget_id =
+"""
+
+
+def run_once(command, receiver, port, timeout, gui):
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "config.ini"), "w", encoding="utf-8") as f:
+            f.write(CONFIG_TEMPLATE.format(port=port))
+        probe_path = os.path.join(workdir, "probe.txt")
+
+        env = dict(os.environ)
+        if gui:
+            env["HR_TOOL_STARTUP_PROBE"] = probe_path
+            if sys.platform.startswith("linux") and not env.get("DISPLAY"):
+                env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            receiver.settimeout(timeout)
+            receiver.recv(65536)
+            first_osc = time.perf_counter() - start
+
+            first_paint = None
+            modules = ""
+            if gui:
+                with open(probe_path, encoding="utf-8") as f:
+                    for line in f:
+                        key, _, value = line.strip().partition(" ")
+                        if key == "first_paint":
+                            first_paint = float(value) - start
+                        elif key == "modules":
+                            modules = value
+            return first_paint, first_osc, modules
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准")
+    parser.add_argument("--exe", help="打包后的可执行文件路径")
+    parser.add_argument("--cli", action="store_true", help="测试命令行版")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.exe:
+        command = [os.path.abspath(args.exe)]
+    elif args.cli:
+        command = [sys.executable, os.path.join(ROOT, "VRC_HR_Tool_SinkStar012.py")]
+    else:
+        command = [sys.executable, os.path.join(ROOT, "VRC_HR_Tool_SinkStar101_pyqt_single.py")]
+    gui = not args.cli
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    port = receiver.getsockname()[1]
+
+    paints, oscs = [], []
+    for i in range(args.runs):
+        first_paint, first_osc, modules = run_once(command, receiver, port, args.timeout, gui)
+        oscs.append(first_osc)
+        line = f"第{i + 1}次: 首个 OSC 数据包 {first_osc * 1000:.0f} ms"
+        if gui:
+            paints.append(first_paint)
+            line = (f"第{i + 1}次: 首次绘制 {first_paint * 1000:.0f} ms, "
+                    f"首个 OSC 数据包 {first_osc * 1000:.0f} ms, "
+                    f"首次绘制时已加载: {modules or '无'}")
+        print(line)
+
+    if paints:
+        print(f"首次绘制中位数: {statistics.median(paints) * 1000:.0f} ms")
+    print(f"首个 OSC 数据包中位数: {statistics.median(oscs) * 1000:.0f} ms")
+    receiver.close()
+
+
+if __name__ == "__main__":
+    main()
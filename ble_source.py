@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+BLE 数据源 - 通过 bleak 连接标准心率广播设备（如小米手环）
+
+支持同时监测多个设备（例如手环 + 胸带做冗余，或两位表演者各戴一个）：
+    - 每个设备是事件循环中的一个独立任务，各自连接、监听和重连
+    - 蓝牙适配器同一时间只能进行一次扫描，所以由一个共享的扫描任务统一查找所有待连接设备；
+      扫描使用广播回调，收到匹配的广播后立即交给设备任务去连接，不必等待整轮扫描结束
+    - 通过 bleak 的 disconnected_callback 得知断开并立即重连，之后的失败按带抖动的指数退避重试
+    - 连接成功的设备地址记录在 DeviceCache 中，下次启动先按缓存地址直连，失败后才扫描
+    - 主数据源（发送到 [DATABASE] 中的 OSC 地址、写 rate.txt、显示在界面上）由 PrimarySelector 选择，
+      每个设备还可以通过 [DEVICE:<设备名>] 段把自己的心率发送到单独的地址
+
+运行在引擎的 asyncio 事件循环中，不依赖 PyQt5。
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from hr_decoder import decode_heart_rate_measurement
+from reconnect import Backoff, SessionMetrics, format_outage
+
+HEART_RATE_MEASUREMENT_UUID = "00002a37-0000-1000-8000-00805f9b34fb"
+
+# 扫描超时（秒）：超过该时间仍未收到匹配的广播则放弃
+SCAN_TIMEOUT = 30.0
+
+# 按缓存地址直连的超时（秒），超时后改为扫描
+DIRECT_CONNECT_TIMEOUT = 5.0
+
+
+class PrimarySelector:
+    """
+    多设备时的主数据源选择策略
+
+    - priority: 按 device_name 中的顺序，排在最前且仍在发送数据的设备为主数据源；
+                高优先级设备恢复后立即切回
+    - sticky:   当前主数据源一直保持，直到它断开或超过 stale_after 秒没有数据，再由下一个发送数据的设备接替
+
+    主数据源断开（disconnected()）时立即让出，不必等待 stale_after 秒。
+    """
+
+    POLICIES = ('priority', 'sticky')
+
+    def __init__(self, device_names: List[str], policy: str = 'priority', stale_after: float = 5.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的主数据源策略: {policy}，可选: {', '.join(self.POLICIES)}")
+        self.rank = {name: i for i, name in enumerate(device_names)}
+        self.policy = policy
+        self.stale_after = stale_after
+        self.last_seen: Dict[str, float] = {}
+        self.current: Optional[str] = None
+
+    def _fresh(self, device: str, now: float) -> bool:
+        seen = self.last_seen.get(device)
+        return seen is not None and now - seen <= self.stale_after
+
+    def is_primary(self, device: str, now: float) -> bool:
+        """记录设备 device 在 now 时刻的样本，并判断它是否为主数据源"""
+        self.last_seen[device] = now
+        current = self.current
+        if current == device:
+            return True
+
+        if current is not None and self._fresh(current, now):
+            take_over = self.policy == 'priority' and self.rank[device] < self.rank[current]
+        elif self.policy == 'priority':
+            # 主数据源已断开或超时：直接由仍在发送数据的设备中优先级最高的接替，
+            # 不让先到的低优先级设备接替后再逐个切换
+            rank = self.rank[device]
+            take_over = not any(self.rank[other] < rank and self._fresh(other, now) for other in self.last_seen)
+        else:
+            take_over = True
+
+        if take_over:
+            self.current = device
+        return take_over
+
+    def disconnected(self, device: str):
+        """设备断开：不再视为发送数据中，是主数据源时立即让出"""
+        self.last_seen.pop(device, None)
+        if self.current == device:
+            self.current = None
+
+
+class BleSource:
+    """蓝牙心率数据源（支持多个设备）"""
+
+    name = 'ble'
+
+    def __init__(self, device_names, primary_policy: str = 'priority', primary_stale_after: float = 5.0,
+                 scanner=None, client_factory=None, device_cache=None):
+        """
+        Args:
+            device_names: 设备名称列表（模糊匹配，按优先级排列），也可以是单个名称
+            primary_policy: 主数据源策略，见 PrimarySelector
+            primary_stale_after: 主数据源超过这么多秒没有数据时由其他设备接替
+            scanner: 与 BleakScanner 构造方式相同、提供 start()/stop() 的扫描器工厂，
+                     默认 bleak.BleakScanner（测试时可替换为 fake_ble）
+            client_factory: 与 BleakClient 构造参数相同的工厂，默认 bleak.BleakClient
+            device_cache: 已知设备缓存（DeviceCache），为 None 时每次都扫描
+        """
+        if isinstance(device_names, str):
+            device_names = [device_names]
+        self.target_device_names = list(device_names)
+        self.primary = PrimarySelector(self.target_device_names, primary_policy, primary_stale_after)
+
+        # 未指定时在 run() 中才导入 bleak（回放录制数据时不需要蓝牙）
+        self.scanner = scanner
+        self.client_factory = client_factory
+        self.device_cache = device_cache
+
+        self.engine = None
+        self.connected = set()      # 已连接的设备名称
+        self._claimed = set()       # 已分配给某个设备名称的蓝牙地址
+        self._scan_waiters: Dict[str, asyncio.Future] = {}
+        self._scan_done = None
+        self._scan_task = None
+        # 设备名称 -> (开始查找的时间, 查找方式)，收到首个样本后移除
+        self._pending_first_sample: Dict[str, tuple] = {}
+        # 设备名称 -> (查找方式, 从开始查找到首个样本的秒数)
+        self.first_sample_times: Dict[str, tuple] = {}
+        # 设备名称 -> 断开统计
+        self.sessions: Dict[str, SessionMetrics] = {}
+
+    def _make_handler(self, target_name: str, session: SessionMetrics = None, backoff: Backoff = None):
+        """为设备创建通知回调"""
+        multi = len(self.target_device_names) > 1
+        if session is None:
+            session = self.sessions.setdefault(target_name, SessionMetrics())
+        backoff = backoff or Backoff()
+
+        def notification_handler(sender, data):
+            received = time.perf_counter() if self.engine.tracer else 0.0
+            if self.engine.capture:
+                self.engine.capture.record_ble(target_name, data)
+            if self._pending_first_sample:
+                self._report_first_sample(target_name)
+            try:
+                measurement = decode_heart_rate_measurement(data)
+            except ValueError as e:
+                self.engine.status(f"心率数据包解析失败 ({target_name}): {e}")
+                return
+
+            now = time.monotonic()
+            outage = session.sample(now)
+            if outage:
+                self.engine.status(format_outage(f"设备 {target_name}", outage))
+            backoff.reset()
+
+            primary = self.primary.is_primary(target_name, now) if multi else True
+            self.engine.submit(measurement.heart_rate, measurement.rr_intervals,
+                               device=target_name, primary=primary, received=received)
+
+        return notification_handler
+
+    def _report_first_sample(self, target_name: str):
+        pending = self._pending_first_sample.pop(target_name, None)
+        if pending is None:
+            return
+        started, path = pending
+        elapsed = time.monotonic() - started
+        self.first_sample_times[target_name] = (path, elapsed)
+        label = "缓存地址直连" if path == 'cache' else "扫描"
+        self.engine.status(f"设备 {target_name} 首个心率样本用时 {elapsed:.2f} 秒（{label}）")
+
+    # ---- 扫描 ----
+
+    async def find_target_device(self, target_name: str):
+        """请求共享扫描任务查找名称包含 target_name 的设备，找不到时返回 None"""
+        future = asyncio.get_running_loop().create_future()
+        self._scan_waiters[target_name] = future
+        if self._scan_task is None or self._scan_task.done():
+            self._scan_task = asyncio.create_task(self._scan_loop())
+        return await future
+
+    def _match(self, device, advertisement_data):
+        """广播回调：把匹配的设备交给等待中的设备任务"""
+        name = device.name or getattr(advertisement_data, 'local_name', None)
+        if not name or device.address in self._claimed:
+            return
+        for target_name, future in list(self._scan_waiters.items()):
+            if target_name in name and not future.done():
+                self._claimed.add(device.address)
+                del self._scan_waiters[target_name]
+                self.engine.device_found(f"成功找到目标设备: {name} ({device.address})")
+                future.set_result(device)
+                break
+        if not self._scan_waiters:
+            self._scan_done.set()
+
+    async def _scan_loop(self):
+        """持续扫描，直到所有等待中的设备都找到或超时"""
+        engine = self.engine
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SCAN_TIMEOUT
+        engine.status("开始扫描蓝牙心率设备...")
+
+        try:
+            # 扫描期间可能有新的设备加入等待，所以在超时前循环检查
+            while engine.running and self._scan_waiters and loop.time() < deadline:
+                self._scan_done = asyncio.Event()
+                scanner = self.scanner(detection_callback=self._match)
+                await scanner.start()
+                try:
+                    await asyncio.wait_for(self._scan_done.wait(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    engine.status(f"扫描 {SCAN_TIMEOUT:.0f} 秒仍未找到全部设备，停止扫描。")
+                finally:
+                    await scanner.stop()
+        finally:
+            # 超时仍未找到的设备
+            for future in self._scan_waiters.values():
+                if not future.done():
+                    future.set_result(None)
+            self._scan_waiters.clear()
+
+    # ---- 连接 ----
+
+    def _set_device_connected(self, target_name: str, connected: bool):
+        was_connected = bool(self.connected)
+        if connected:
+            self.connected.add(target_name)
+        else:
+            self.connected.discard(target_name)
+            self.primary.disconnected(target_name)
+        if bool(self.connected) != was_connected:
+            self.engine.set_connected(bool(self.connected))
+
+    async def _locate(self, target_name: str):
+        """扫描查找设备，找不到时报告错误并返回 None"""
+        device = await self.find_target_device(target_name)
+        if not device:
+            self.engine.status(f"错误：扫描结束，未找到名称包含 {target_name} 的设备。")
+            if not self.connected:
+                self.engine.set_connected(False)
+        return device
+
+    async def _run_device(self, target_name: str):
+        """单个设备：优先按缓存地址直连，否则扫描；连接后在断开时自动重连"""
+        engine = self.engine
+        started = time.monotonic()
+
+        cached = self.device_cache.get(target_name) if self.device_cache else None
+        if cached and cached.address not in self._claimed:
+            self._claimed.add(cached.address)
+            engine.status(f"使用缓存的设备地址直接连接 {target_name}: {cached.name} ({cached.address})")
+            device, path, name = cached.address, 'cache', cached.name
+        else:
+            device = await self._locate(target_name)
+            if not device:
+                return
+            path, name = 'scan', device.name
+        self._pending_first_sample[target_name] = (started, path)
+
+        session = self.sessions[target_name] = SessionMetrics()
+        backoff = Backoff()
+        handler = self._make_handler(target_name, session, backoff)
+        config = engine.config
+        connected_once = False
+
+        def on_disconnected(event: asyncio.Event):
+            def callback(_client):
+                # 立即让出主数据源，其他设备的下一个样本即可接替，不必等到 stale_after 超时
+                self.primary.disconnected(target_name)
+                event.set()
+            return callback
+
+        while engine.running:
+            disconnected = asyncio.Event()
+            session.attempt()
+            try:
+                kwargs = {'disconnected_callback': on_disconnected(disconnected)}
+                if path == 'cache' and not connected_once:
+                    kwargs['timeout'] = DIRECT_CONNECT_TIMEOUT
+                # 扫描得到的是设备对象，直接传入，bleak 不必再按地址扫描一次
+                async with self.client_factory(device, **kwargs) as client:
+                    if client.is_connected:
+                        connected_once = True
+                        session.connected(time.monotonic())
+                        self._set_device_connected(target_name, True)
+                        if self.device_cache:
+                            self.device_cache.remember(target_name, getattr(device, 'address', device), name)
+                        engine.status(f"设备 {target_name} 连接成功！正在监听心率...")
+                        engine.status(f"正在向 OSC 地址 {config.osc_ip}:{config.osc_port} 发送当前心率。")
+
+                        await client.start_notify(HEART_RATE_MEASUREMENT_UUID, handler)
+
+                        # 等待 bleak 的断开回调，不再轮询 is_connected
+                        await disconnected.wait()
+                self._set_device_connected(target_name, False)
+                session.disconnected(time.monotonic())
+                engine.status(f"设备 {target_name} 连接断开")
+            except Exception as e:
+                self._set_device_connected(target_name, False)
+                if path == 'cache' and not connected_once:
+                    # 缓存的地址不可用（设备换了、被其他电脑连接等），删除记录并改为扫描
+                    engine.status(f"缓存地址直连 {target_name} 失败: {e}，改为扫描...")
+                    self._claimed.discard(device)
+                    self.device_cache.forget(target_name)
+                    device = await self._locate(target_name)
+                    if not device:
+                        return
+                    path, name = 'scan', device.name
+                    self._pending_first_sample[target_name] = (started, path)
+                    continue
+                session.disconnected(time.monotonic())
+                engine.status(f"设备 {target_name} 连接断开或发生错误: {e}")
+
+            delay = backoff.next_delay()
+            if engine.running:
+                if delay:
+                    engine.status(f"将在{delay:.1f}秒后尝试重新连接...")
+                else:
+                    engine.status("正在重新连接...")
+                await asyncio.sleep(delay)
+
+    async def run(self, engine):
+        """为每个设备启动一个任务，全部结束后返回"""
+        self.engine = engine
+        if not self.target_device_names:
+            engine.status("错误：未配置蓝牙设备名称")
+            engine.set_connected(False)
+            return
+
+        if self.scanner is None or self.client_factory is None:
+            from bleak import BleakClient, BleakScanner
+            self.scanner = self.scanner or BleakScanner
+            self.client_factory = self.client_factory or BleakClient
+
+        tasks = [asyncio.create_task(self._run_device(name)) for name in self.target_device_names]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self._scan_task:
+                self._scan_task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for target_name, session in self.sessions.items():
+                summary = session.summary()
+                if summary:
+                    engine.status(f"设备 {target_name} 本次会话：{summary}")
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+原始数据录制与回放 - 不需要手环或 Pulsoid 账号即可重现一段真实数据
+
+录制格式为 JSONL，第一行是文件头，之后每行一条原始数据:
+    {"format": "hr-capture", "version": 1, "created": "2024-01-01T20:00:00"}
+    {"t": 0.0, "kind": "ble", "device": "Xiaomi Smart Band 10", "data": "1048a003"}
+    {"t": 1.02, "kind": "ws", "data": "{\"data\": {\"heartRate\": 72}}"}
+
+    - t: 相对录制开始的秒数（单调时钟）
+    - kind: ble 为 0x2A37 通知的原始字节（十六进制），ws 为 Pulsoid WebSocket 的原始文本帧
+    - device: BLE 设备名称（device_name 中配置的名称）
+
+ReplaySource 把录制的数据交给 BleSource 的通知回调和 PulsoidSource 的消息处理函数，
+与实时数据走完全相同的解码和发送流程，可以按 1 倍、100 倍或不限速回放。
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Union
+
+CAPTURE_FORMAT = "hr-capture"
+CAPTURE_VERSION = 1
+
+# 不限速回放时每处理这么多条数据让出一次事件循环，保证停止请求能及时处理
+_YIELD_EVERY = 256
+
+
+class CaptureRecord(NamedTuple):
+    """一条录制的数据"""
+    t: float
+    kind: str                   # 'ble' / 'ws'
+    data: Union[bytes, str]     # ble 为原始字节，ws 为文本帧
+    device: str = ''
+
+
+class CaptureWriter:
+    """录制原始数据（在引擎事件循环中调用）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0
+        self._start = time.monotonic()
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({'format': CAPTURE_FORMAT, 'version': CAPTURE_VERSION,
+                     'created': datetime.now().isoformat(timespec='seconds')})
+
+    def _write(self, obj: dict):
+        self._file.write(json.dumps(obj, ensure_ascii=False))
+        self._file.write("\n")
+
+    def record_ble(self, device: str, data: bytes):
+        """录制一个 BLE 通知"""
+        self._write({'t': round(time.monotonic() - self._start, 6), 'kind': 'ble',
+                     'device': device, 'data': bytes(data).hex()})
+        self.records += 1
+
+    def record_ws(self, message: str):
+        """录制一个 WebSocket 文本帧"""
+        self._write({'t': round(time.monotonic() - self._start, 6), 'kind': 'ws', 'data': message})
+        self.records += 1
+
+    def close(self):
+        """写入并关闭文件"""
+        if not self._file.closed:
+            self._file.close()
+
+
+def write_capture(path: str, records: List[CaptureRecord]):
+    """把记录写成录制文件（用于生成测试数据）"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({'format': CAPTURE_FORMAT, 'version': CAPTURE_VERSION,
+                            'created': datetime.now().isoformat(timespec='seconds')}) + "\n")
+        for record in records:
+            obj = {'t': record.t, 'kind': record.kind,
+                   'data': record.data.hex() if record.kind == 'ble' else record.data}
+            if record.device:
+                obj['device'] = record.device
+            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """
+    读取录制文件
+
+    Raises:
+        ValueError: 文件格式不正确
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get('format') != CAPTURE_FORMAT:
+            raise ValueError(f"{path} 不是心率录制文件")
+        if header.get('version', 0) > CAPTURE_VERSION:
+            raise ValueError(f"不支持的录制文件版本: {header.get('version')}")
+
+        for line_no, line in enumerate(f, start=2):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+                kind = obj['kind']
+                data = bytes.fromhex(obj['data']) if kind == 'ble' else obj['data']
+                yield CaptureRecord(float(obj['t']), kind, data, obj.get('device', ''))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path} 第 {line_no} 行格式错误: {e}") from None
+
+
+class ReplaySource:
+    """回放录制文件的数据源"""
+
+    name = 'replay'
+
+    def __init__(self, path: str, speed: float = 1.0, records: List[CaptureRecord] = None):
+        """
+        Args:
+            path: 录制文件路径
+            speed: 回放倍速，1 为原速，100 为 100 倍速，0 表示不限速
+            records: 已读取的记录，传入时不再读取文件；否则在 run() 中读取
+        """
+        self.path = path
+        self.speed = speed
+        self.records = records
+        self.replayed = 0
+
+    async def run(self, engine):
+        """按录制时的时间间隔（除以倍速）回放全部数据后返回"""
+        from ble_source import BleSource
+        from pulsoid_worker import PulsoidSource
+
+        loop = asyncio.get_running_loop()
+        if self.records is None:
+            # 文件不存在或格式错误时与其他数据源的连接错误一样在状态中报告
+            try:
+                self.records = await loop.run_in_executor(None, lambda: list(read_capture(self.path)))
+            except (OSError, ValueError) as e:
+                engine.status(f"无法读取回放文件 {self.path}: {e}")
+                return
+
+        # 设备优先级按在录制中首次出现的顺序
+        device_names = list(dict.fromkeys(r.device for r in self.records if r.kind == 'ble'))
+        ble = BleSource(device_names)
+        ble.engine = engine
+        handlers = {name: ble._make_handler(name) for name in device_names}
+        pulsoid = PulsoidSource('replay')
+        pulsoid.engine = engine
+
+        engine.device_found(f"回放: {self.path}")
+        engine.set_connected(True)
+        engine.status(f"开始回放 {len(self.records)} 条数据"
+                      + (f"（{self.speed:g} 倍速）" if self.speed > 0 else "（不限速）"))
+
+        start = loop.time()
+        for i, record in enumerate(self.records):
+            if not engine.running:
+                break
+            if self.speed > 0:
+                delay = start + record.t / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % _YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+            if record.kind == 'ble':
+                handlers[record.device](None, record.data)
+            else:
+                pulsoid.handle_message(record.data)
+            self.replayed += 1
+
+        engine.status(f"回放结束，共 {self.replayed} 条数据")
+        engine.set_connected(False)
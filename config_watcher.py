@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+配置文件监视 - 检测 config.ini 在磁盘上的修改，供引擎在运行中应用新配置
+
+按 interval 秒轮询文件的修改时间和大小（os.stat，不读取文件内容），
+不依赖平台的文件系统通知，编辑器先删除再写入、或保存到一半时也能正确处理:
+    - 修改时间或大小变化后，等待下一次轮询两者不再变化（文件写完）才回调
+    - 文件暂时不存在时不回调，重新出现后按修改处理
+    - 调用方保存并直接应用配置后调用 acknowledge()，这次保存不会再触发一次回调
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+class ConfigWatcher:
+    """轮询监视一个配置文件"""
+
+    def __init__(self, path: str, interval: float = 1.0):
+        """
+        Args:
+            path: 配置文件路径
+            interval: 轮询间隔（秒）
+        """
+        self.path = path
+        self.interval = interval
+        self.changes = 0
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """(修改时间, 大小)，文件不存在时为 None"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def acknowledge(self):
+        """把文件当前的状态视为已应用（调用方自己保存并应用了配置时，不再触发回调）"""
+        self._signature = self._stat()
+
+    async def watch(self, on_change: Callable[[], Awaitable[None]]):
+        """持续监视，文件修改并写完后调用 on_change()（直到任务被取消）"""
+        pending = None
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                pending = None
+                continue
+            if signature != pending:
+                # 刚发现变化，下一次轮询确认文件已写完
+                pending = signature
+                continue
+            self._signature = signature
+            pending = None
+            self.changes += 1
+            await on_change()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+已知设备缓存 - 记住上次匹配到的蓝牙设备，下次启动时直接按地址连接，不必重新扫描
+
+缓存以 JSON 保存在程序目录下（默认 devices.json），每条记录对应 device_name 中的一个名称:
+    {"Xiaomi Smart Band 10": {"address": "...", "name": "...", "last_seen": 1700000000.0}}
+
+淘汰规则:
+    - 超过 max_age 秒未再连接成功的记录在加载时丢弃
+    - 记录数超过 max_entries 时丢弃最久未见的记录
+    - 按缓存地址直连失败时由调用方 forget()，之后重新扫描
+"""
+
+import json
+import os
+import time
+from typing import Dict, NamedTuple, Optional
+
+DEVICE_CACHE_FILE = "devices.json"
+
+
+class CachedDevice(NamedTuple):
+    """一条缓存记录"""
+    address: str
+    name: str
+    last_seen: float
+
+
+class DeviceCache:
+    """设备名称 -> 上次匹配到的蓝牙地址"""
+
+    def __init__(self, path: str = DEVICE_CACHE_FILE, max_age: float = 30 * 24 * 3600,
+                 max_entries: int = 32):
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.entries: Dict[str, CachedDevice] = {}
+        self.load()
+
+    def load(self):
+        """读取缓存文件，文件不存在或损坏时视为空缓存"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            entries = {key: CachedDevice(str(value["address"]), str(value.get("name", "")),
+                                         float(value.get("last_seen", 0)))
+                       for key, value in raw.items()}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            entries = {}
+        self.entries = entries
+        self._evict()
+
+    def save(self):
+        """写入缓存文件（先写临时文件再替换），写入失败时忽略"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({key: entry._asdict() for key, entry in self.entries.items()},
+                          f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _evict(self, now: Optional[float] = None) -> bool:
+        """淘汰过期和超出数量的记录，返回是否有记录被删除"""
+        now = time.time() if now is None else now
+        before = len(self.entries)
+        fresh = sorted(((key, entry) for key, entry in self.entries.items()
+                        if now - entry.last_seen <= self.max_age),
+                       key=lambda item: item[1].last_seen, reverse=True)
+        self.entries = dict(fresh[:self.max_entries])
+        return len(self.entries) != before
+
+    def get(self, target_name: str) -> Optional[CachedDevice]:
+        """查找 target_name 上次匹配到的设备"""
+        return self.entries.get(target_name)
+
+    def remember(self, target_name: str, address: str, name: str):
+        """记录连接成功的设备并保存"""
+        self.entries[target_name] = CachedDevice(address, name or "", time.time())
+        self._evict()
+        self.save()
+
+    def forget(self, target_name: str):
+        """删除 target_name 的记录（缓存地址已不可用）并保存"""
+        if self.entries.pop(target_name, None) is not None:
+            self.save()
@@ -0,0 +1,715 @@
+# -*- coding: utf-8 -*-
+"""
+心率引擎 - 不依赖 PyQt5 的核心逻辑
+
+数据流：数据源 (BLE / Pulsoid / 模拟) -> 换算 (心率 -> 浮点百分比) -> 输出 (OSC / rate.txt / 监听者)
+全部运行在同一个 asyncio 事件循环中。GUI 和命令行都只是引擎的监听者：
+    - GUI:   HeartRateWorker 在 QThread 中运行引擎，把回调转换为 Qt 信号
+    - 命令行: VRC_HR_Tool_SinkStar012.py 直接在主线程运行引擎
+
+数据源需要实现 `async def run(self, engine)`，收到心率时调用 engine.submit()。
+"""
+
+import asyncio
+import configparser
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, NamedTuple, Tuple
+
+from latency import LatencyTracer
+from obs_writer import RateFileWriter
+from pipeline import Pipeline, format_sink_stats
+from osc_output import IntBundleSender, OscBundleSender, OscFanout, OscTarget
+from osc_policy import ALL_PARTS, FLOAT, OscSendPolicy
+
+CONFIG_SECTION = 'DATABASE'
+DEVICE_SECTION_PREFIX = 'DEVICE:'
+OSC_TARGET_SECTION_PREFIX = 'OSC_TARGET:'
+
+# 运行中修改后需要重新连接数据源的配置项
+SOURCE_FIELDS = ('data_source', 'device_name', 'primary_policy', 'primary_stale_after', 'pulsoid_widget_id',
+                 'pulsoid_rpc_url', 'replay_file', 'replay_speed')
+# 只在开始监测时生效的配置项，运行中修改不会应用
+RESTART_FIELDS = ('capture_file', 'session_dir', 'latency_tracing', 'metrics_port')
+# 主数据源选择策略，与 ble_source.PrimarySelector.POLICIES 相同（读取配置时不导入 ble_source）
+PRIMARY_POLICIES = ('priority', 'sticky')
+# 只影响界面显示、不影响发送内容的配置项，运行中修改时不替换输出（hr_min 只用于进度条范围）
+DISPLAY_FIELDS = ('hr_min',)
+
+
+@dataclass
+class DeviceConfig:
+    """
+    单个 BLE 设备的 OSC 地址映射，对应 config.ini 的 [DEVICE:<设备名>] 段
+
+    多设备同时监测时，每个设备的心率额外发送到这里配置的地址；
+    未配置的地址留空表示不发送。
+    """
+    name: str
+    osc_int: str = ''
+    osc_float: str = ''
+    osc_bool: str = ''
+
+
+@dataclass
+class EngineConfig:
+    """引擎配置，对应 config.ini 的 [DATABASE] 段"""
+    osc_ip: str = '127.0.0.1'
+    osc_port: int = 9000
+    osc_int: str = '/avatar/parameters/HR'
+    osc_float: str = '/avatar/parameters/HRF'
+    osc_bool: str = '/avatar/parameters/isHRActive'
+    # 滑动窗口统计的附加地址（int，见 hr_stats.py），留空不发送
+    osc_hr_min: str = ''
+    osc_hr_max: str = ''
+    osc_hr_avg: str = ''
+    osc_hrv: str = ''                       # RMSSD（毫秒）
+    stats_window: float = 60.0              # 最低 / 最高 / 平均心率的窗口（秒）
+    hrv_window: float = 60.0                # RMSSD 的窗口（秒）
+    hr_min: int = 1
+    hr_max: int = 250
+    osc_keepalive: float = 5.0              # 只在值变化时发送，每隔这么多秒完整重发一次；0 为每个样本都完整发送
+    osc_max_rate: float = 20.0              # 每个发送目标组每秒最多发送的 OSC 消息数，0 为不限
+    osc_output_rate: float = 0.0            # float 参数插值输出频率（Hz，见 output_scheduler.py），0 为关闭
+    device_name: str = ''
+    obs_mode: int = 0
+    data_source: str = 'ble'
+    pulsoid_widget_id: str = ''
+    pulsoid_rpc_url: str = ''               # 留空使用 Stromno 官方 RPC 地址，测试时可指向本地替身服务
+    primary_policy: str = 'priority'        # 多设备时主数据源的选择策略: priority / sticky
+    primary_stale_after: float = 5.0        # 主数据源超过这么多秒没有数据时由其他设备接替（断开时立即接替）
+    capture_file: str = ''                  # 录制原始数据的文件（见 capture.py），留空不录制
+    replay_file: str = ''                   # data_source = replay 时回放的录制文件
+    replay_speed: float = 1.0               # 回放倍速，0 表示不限速
+    session_dir: str = ''                   # 会话记录目录（见 session_log.py），留空不记录
+    latency_tracing: int = 0                # 1 为开启延迟追踪（见 latency.py）
+    stale_timeout: float = 10.0             # 超过这么多秒没有心率数据时发送 isHRActive=False（见 stale_watchdog.py），0 为关闭
+    metrics_port: int = 0                   # Prometheus 指标端口（见 metrics_server.py），0 为关闭
+    devices: List[DeviceConfig] = field(default_factory=list)
+    extra_osc_targets: List[OscTarget] = field(default_factory=list)
+    # 读取配置时发现、已按默认值处理的问题，由引擎在状态中提示（不参与配置比较）
+    warnings: List[str] = field(default_factory=list, compare=False, repr=False)
+
+    @property
+    def osc_targets(self) -> List[OscTarget]:
+        """全部 OSC 目标：[DATABASE] 中的主目标 + [OSC_TARGET:<名称>] 段"""
+        main = OscTarget('main', self.osc_ip, self.osc_port, self.osc_int, self.osc_float, self.osc_bool)
+        return [main] + self.extra_osc_targets
+
+    @property
+    def stats_addresses(self):
+        """统计值参数名 -> 附加 OSC 地址"""
+        return {'min': self.osc_hr_min, 'max': self.osc_hr_max,
+                'mean': self.osc_hr_avg, 'rmssd': self.osc_hrv}
+
+    @property
+    def device_names(self) -> List[str]:
+        """device_name 中以逗号分隔的设备名称列表（按优先级排列）"""
+        return [name.strip() for name in self.device_name.split(',') if name.strip()]
+
+    @classmethod
+    def from_parser(cls, config: configparser.ConfigParser) -> "EngineConfig":
+        """从 ConfigParser 读取配置，缺失的项使用默认值"""
+        defaults = cls()
+        get = lambda key: config.get(CONFIG_SECTION, key, fallback=getattr(defaults, key))
+        getint = lambda key: config.getint(CONFIG_SECTION, key, fallback=getattr(defaults, key))
+        getfloat = lambda key: config.getfloat(CONFIG_SECTION, key, fallback=getattr(defaults, key))
+        warnings = []
+        primary_policy = get('primary_policy').strip().lower()
+        if primary_policy not in PRIMARY_POLICIES:
+            warnings.append(f"未知的主数据源策略: {primary_policy}，可选: {', '.join(PRIMARY_POLICIES)}，"
+                            f"已使用默认的 {defaults.primary_policy}")
+            primary_policy = defaults.primary_policy
+        return cls(
+            osc_ip=get('osc_ip'),
+            osc_port=getint('osc_port'),
+            osc_int=get('osc_int'),
+            osc_float=get('osc_float'),
+            osc_bool=get('osc_bool'),
+            osc_hr_min=get('osc_hr_min'),
+            osc_hr_max=get('osc_hr_max'),
+            osc_hr_avg=get('osc_hr_avg'),
+            osc_hrv=get('osc_hrv'),
+            stats_window=getfloat('stats_window'),
+            hrv_window=getfloat('hrv_window'),
+            hr_min=getint('hr_min'),
+            hr_max=getint('hr_max'),
+            osc_keepalive=getfloat('osc_keepalive'),
+            osc_max_rate=getfloat('osc_max_rate'),
+            osc_output_rate=getfloat('osc_output_rate'),
+            device_name=get('device_name'),
+            obs_mode=getint('obs_mode'),
+            data_source=get('data_source'),
+            pulsoid_widget_id=get('pulsoid_widget_id'),
+            pulsoid_rpc_url=get('pulsoid_rpc_url'),
+            primary_policy=primary_policy,
+            primary_stale_after=getfloat('primary_stale_after'),
+            capture_file=get('capture_file'),
+            replay_file=get('replay_file'),
+            replay_speed=getfloat('replay_speed'),
+            session_dir=get('session_dir'),
+            latency_tracing=getint('latency_tracing'),
+            stale_timeout=getfloat('stale_timeout'),
+            metrics_port=getint('metrics_port'),
+            devices=[
+                DeviceConfig(
+                    name=section[len(DEVICE_SECTION_PREFIX):].strip(),
+                    osc_int=config.get(section, 'osc_int', fallback=''),
+                    osc_float=config.get(section, 'osc_float', fallback=''),
+                    osc_bool=config.get(section, 'osc_bool', fallback=''),
+                )
+                for section in config.sections() if section.startswith(DEVICE_SECTION_PREFIX)
+            ],
+            extra_osc_targets=[
+                # 未填写的地址沿用 [DATABASE] 中的地址，填写为空则不发送
+                OscTarget(
+                    name=section[len(OSC_TARGET_SECTION_PREFIX):].strip(),
+                    ip=config.get(section, 'osc_ip', fallback=get('osc_ip')),
+                    port=config.getint(section, 'osc_port', fallback=getint('osc_port')),
+                    int_address=config.get(section, 'osc_int', fallback=get('osc_int')),
+                    float_address=config.get(section, 'osc_float', fallback=get('osc_float')),
+                    bool_address=config.get(section, 'osc_bool', fallback=get('osc_bool')),
+                )
+                for section in config.sections() if section.startswith(OSC_TARGET_SECTION_PREFIX)
+            ],
+            warnings=warnings,
+        )
+
+
+def load_config(path: str = 'config.ini') -> EngineConfig:
+    """读取配置文件"""
+    config = configparser.ConfigParser()
+    config.read(path, encoding='utf-8')
+    return EngineConfig.from_parser(config)
+
+
+class Sample(NamedTuple):
+    """一个心率样本"""
+    heart_rate: int
+    percent: float                      # 发送到 osc_float 的 0.0-1.0 浮点值
+    timestamp: float                    # 收到样本时的 time.monotonic()
+    source: str                         # 数据源名称
+    rr_intervals: Tuple[int, ...] = ()  # RR 间期，单位 1/1024 秒（仅 BLE）
+    device: str = ''                    # 多设备时的设备名称
+    received: float = 0.0               # 收到原始数据时的 time.perf_counter()（仅开启延迟追踪时）
+    primary: bool = True                # 是否为主数据源
+
+
+def format_sample_status(sample: Sample, obs_mode: int = 0) -> str:
+    """生成实时心率状态文本"""
+    prefix = "Pulsoid 实时心率" if sample.source == 'pulsoid' else "实时心率"
+    text = f"{prefix} -> 心率整数值: {sample.heart_rate}; 心率浮点值: {sample.percent:.2f}"
+    if obs_mode == 1:
+        text += ", 正在输出 txt."
+    return text
+
+
+class EngineListener:
+    """引擎事件监听者，默认不做任何处理；回调均在引擎的事件循环线程中调用"""
+
+    def on_status(self, message: str):
+        pass
+
+    def on_connection(self, connected: bool):
+        pass
+
+    def on_device(self, info: str):
+        pass
+
+    def on_sample(self, sample: Sample):
+        pass
+
+    def on_stale(self, stale: bool):
+        """主数据源心率中断 / 恢复（连接可能仍然正常）"""
+        pass
+
+
+def create_source(config: EngineConfig):
+    """根据 data_source 创建数据源"""
+    # 按需导入，只加载所选数据源的依赖
+    if config.data_source == 'pulsoid':
+        from pulsoid_worker import PulsoidSource, WidgetUrlResolver
+        return PulsoidSource(config.pulsoid_widget_id, WidgetUrlResolver(config.pulsoid_rpc_url))
+    if config.data_source == 'simulate':
+        from simulated_source import SimulatedSource
+        return SimulatedSource()
+    if config.data_source == 'replay':
+        from capture import ReplaySource
+        return ReplaySource(config.replay_file, config.replay_speed)
+
+    from ble_source import BleSource
+    from device_cache import DeviceCache
+    return BleSource(config.device_names, primary_policy=config.primary_policy,
+                     primary_stale_after=config.primary_stale_after, device_cache=DeviceCache())
+
+
+class HeartRateEngine:
+    """心率引擎：在一个事件循环中运行数据源并分发样本"""
+
+    def __init__(self, config: EngineConfig, listener: EngineListener = None, source=None):
+        self.config = config
+        self.listener = listener or EngineListener()
+        self.source = source if source is not None else create_source(config)
+
+        self.running = False
+        self.osc_client = None
+        self.device_osc = {}
+        self.scheduler = None
+        self.capture = None
+        # 可能阻塞的输出端在管道中各自排队（见 pipeline.py）
+        self.pipeline = Pipeline()
+        self.rate_writer = None
+        self.recorder = None
+        # 滑动窗口统计，配置了附加地址或指标端点时创建
+        self.statistics = None
+        self.stats_publisher = None
+        self.watchdog = None
+        # 延迟追踪，未开启时为 None
+        self.tracer = LatencyTracer() if config.latency_tracing else None
+        self.metrics = None
+
+        # 运行统计（供指标端点读取）
+        self.samples_received = 0
+        self.samples_sent = 0
+        self.last_heart_rate = 0
+        self.last_sample_time = 0.0
+        self.last_device = ''
+        self.connected = False
+        self.stale = False
+
+        self._loop = None
+        self._stop_event = None
+        self._stop_requested = False
+        self._source_task = None
+        self._source_restart = None
+        self._reconfigure_lock = None
+        self._config_watcher = None
+        self._config_loader = None
+
+    # ---- 供数据源调用 ----
+
+    def status(self, message: str):
+        """报告状态消息"""
+        self.listener.on_status(message)
+
+    def set_connected(self, connected: bool):
+        """报告连接状态"""
+        self.connected = connected
+        self.listener.on_connection(connected)
+
+    def device_found(self, info: str):
+        """报告找到的设备"""
+        self.listener.on_device(info)
+
+    def submit(self, heart_rate: int, rr_intervals: Tuple[int, ...] = (),
+               device: str = '', primary: bool = True, received: float = 0.0):
+        """
+        提交一个心率样本（必须在引擎事件循环线程中调用）
+
+        Args:
+            heart_rate: 心率
+            rr_intervals: RR 间期，单位 1/1024 秒
+            device: 设备名称，配置了 [DEVICE:<设备名>] 时额外发送到该设备的地址
+            primary: 是否为主数据源；非主数据源的样本只发送到设备自己的地址
+            received: 收到原始数据时的 time.perf_counter()，开启延迟追踪时由数据源传入
+        """
+        tracer = self.tracer
+        if tracer and received:
+            tracer.record('decode', received)
+        sample = Sample(
+            heart_rate,
+            min(heart_rate / self.config.hr_max, 1.0),
+            time.monotonic(),
+            self.source.name,
+            rr_intervals,
+            device,
+            received,
+            primary,
+        )
+        self.samples_received += 1
+        watchdog = self.watchdog
+        device_client = self.device_osc.get(device)
+        if device_client:
+            if watchdog:
+                watchdog.feed(device)
+            device_client.send(sample.heart_rate, sample.percent)
+        if not primary:
+            self.pipeline.publish(sample)
+            return
+
+        if watchdog:
+            watchdog.feed('')
+        self.samples_sent += 1
+        self.last_heart_rate = sample.heart_rate
+        self.last_sample_time = sample.timestamp
+        self.last_device = device
+
+        self.osc_client.send(sample.heart_rate, sample.percent)
+        if self.scheduler:
+            self.scheduler.update(sample.percent)
+        if self.statistics:
+            self.statistics.update(sample.heart_rate, rr_intervals, sample.timestamp, device)
+            if self.stats_publisher:
+                self.stats_publisher.publish(sample.timestamp)
+        if tracer and received:
+            tracer.record('osc', received)
+        self.pipeline.publish(sample)
+        self.listener.on_sample(sample)
+
+    def _on_stale(self, name: str, stale: bool):
+        """看门狗回调：name 为空表示主输出，否则为配置了单独地址的设备"""
+        timeout = self.config.stale_timeout
+        if name:
+            device_client = self.device_osc.get(name)
+            if device_client is None:
+                return  # 该设备的单独地址已在运行中被删除
+            if stale:
+                device_client.send_active(False)
+                self.status(f"设备 {name} 超过 {timeout:g} 秒没有心率数据，已发送 isHRActive=False")
+            else:
+                self.status(f"设备 {name} 心率数据已恢复")
+            return
+
+        self.stale = stale
+        source = self.last_device or self.source.name
+        if stale:
+            # 发送 False 后发送策略会重置，恢复后的第一个样本完整发送（包括 isHRActive=True）
+            self.osc_client.send_active(False)
+            self.status(f"{source} 超过 {timeout:g} 秒没有心率数据，已发送 isHRActive=False")
+        else:
+            self.status(f"{source} 心率数据已恢复")
+        self.listener.on_stale(stale)
+
+    # ---- 输出 ----
+
+    def _open_outputs(self, config: EngineConfig) -> "_Outputs":
+        """按配置创建全部 OSC 输出（尚未替换到引擎中，运行中修改配置时在线程池中调用）"""
+        policy = lambda: OscSendPolicy(config.osc_keepalive, config.osc_max_rate)
+        scheduler = None
+        if config.osc_output_rate > 0:
+            from output_scheduler import OutputScheduler
+            osc_client = OscFanout(config.osc_targets, policy(), ALL_PARTS & ~FLOAT)
+            # 插值消息与样本共用 osc_max_rate，超过上限的频率没有意义
+            rate = config.osc_output_rate
+            if config.osc_max_rate > 0:
+                rate = min(rate, config.osc_max_rate)
+            scheduler = OutputScheduler(osc_client, rate, self._loop)
+        else:
+            osc_client = OscFanout(config.osc_targets, policy())
+        device_osc = {
+            device.name: OscBundleSender(config.osc_ip, config.osc_port,
+                                         device.osc_int, device.osc_float, device.osc_bool, policy())
+            for device in config.devices
+        }
+
+        # 窗口长度不变时沿用原来的统计，保留已有的窗口数据
+        statistics = None
+        stats_publisher = None
+        stats_addresses = {key: address for key, address in config.stats_addresses.items() if address}
+        if stats_addresses or config.metrics_port:
+            from hr_stats import HrStatistics, StatsPublisher
+            statistics = self.statistics
+            if (statistics is None or statistics.heart_rate.seconds != config.stats_window
+                    or statistics.hrv.seconds != config.hrv_window):
+                statistics = HrStatistics(config.stats_window, config.hrv_window)
+            if stats_addresses:
+                sender = IntBundleSender(config.osc_ip, config.osc_port, stats_addresses)
+                stats_publisher = StatsPublisher(statistics, sender, keepalive=config.osc_keepalive)
+        return _Outputs(osc_client, scheduler, device_osc, statistics, stats_publisher)
+
+    def _apply_outputs(self, config: EngineConfig, outputs: "_Outputs"):
+        """
+        替换输出并关闭旧的输出
+
+        新输出在调用前已全部创建好，这里的赋值在事件循环的一次回调中完成，
+        不会有样本发送到一半新一半旧的输出。不再使用的目标会收到 isHRActive=False。
+        """
+        old_osc, old_scheduler, old_devices = self.osc_client, self.scheduler, self.device_osc
+        old_publisher = self.stats_publisher
+        self.osc_client, self.scheduler, self.device_osc, self.statistics, self.stats_publisher = outputs
+        self.config = config
+
+        if config.obs_mode == 1 and self.rate_writer is None:
+            self.rate_writer = self.pipeline.add(RateFileWriter(tracer=self.tracer))
+        elif config.obs_mode != 1 and self.rate_writer is not None:
+            # 在事件循环中不等待写文件线程，剩余的项由它处理完后自行退出
+            self.pipeline.remove(self.rate_writer, timeout=0)
+            self.rate_writer = None
+
+        if config.stale_timeout > 0:
+            if self.watchdog is None:
+                from stale_watchdog import StalenessWatchdog
+                self.watchdog = StalenessWatchdog(config.stale_timeout, self._on_stale)
+            else:
+                # 已排队的截止时间立即按新的超时时间重新安排
+                self.watchdog.timeout = config.stale_timeout
+        elif self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+            if self.stale:
+                self.stale = False
+                self.listener.on_stale(False)
+
+        if old_scheduler:
+            old_scheduler.stop()
+        if old_publisher:
+            old_publisher.sender.close()
+        if old_osc is not None:
+            # 替换前新输出还没有发送过，直接累加旧输出的计数
+            self.osc_client.carry_stats(old_osc)
+            old_clients = [old_osc] + list(old_devices.values())
+            new_clients = [self.osc_client] + list(self.device_osc.values())
+            in_use = {(t.ip, t.port, t.bool_address) for client in new_clients for t in client.targets}
+            removed = [t for client in old_clients for t in client.targets
+                       if (t.ip, t.port, t.bool_address) not in in_use]
+            if removed:
+                retired = OscFanout(removed)
+                retired.send_active(False)
+                retired.close()
+            for client in old_clients:
+                client.close()
+
+    def _close_outputs(self):
+        """停止时发送 isHRActive=False 并关闭全部输出"""
+        if self.watchdog:
+            self.watchdog.stop()
+            self.watchdog = None
+        if self.scheduler:
+            self.scheduler.stop()
+            self.status(f"插值输出: {self.scheduler.summary()}")
+            self.scheduler = None
+        self.osc_client.send_active(False)
+        self.osc_client.close()
+        self.status(f"OSC 发送: {self.osc_client.policy.summary()}")
+        if len(self.osc_client.targets) > 1:
+            for name, stats in self.osc_client.stats.items():
+                self.status(f"OSC 目标 {name}: 已发送 {stats.sent} 个数据包，失败 {stats.errors} 次")
+        if self.stats_publisher:
+            self.stats_publisher.sender.close()
+            self.stats_publisher = None
+        for device_client in self.device_osc.values():
+            device_client.send_active(False)
+            device_client.close()
+        self.device_osc = {}
+
+    # ---- 运行中修改配置 ----
+
+    def watch_config(self, path: str, loader: Callable[[], EngineConfig] = None):
+        """
+        运行期间监视配置文件，修改后自动应用（在 run() 之前调用）
+
+        Args:
+            path: 配置文件路径
+            loader: 读取配置的函数，默认 load_config(path)；命令行参数覆盖配置项时传入
+        """
+        from config_watcher import ConfigWatcher
+        self._config_watcher = ConfigWatcher(path)
+        self._config_loader = loader or (lambda: load_config(path))
+
+    def reload(self, config: EngineConfig, saved: bool = False):
+        """
+        在运行中应用新配置（可在任意线程调用）
+
+        Args:
+            config: 新配置
+            saved: 调用方已把这份配置写入被监视的配置文件，监视器不再为这次保存重复应用
+        """
+        loop = self._loop
+        if self.running and loop is not None and not loop.is_closed():
+            future = asyncio.run_coroutine_threadsafe(self._reload(config, saved), loop)
+            future.add_done_callback(self._reload_done)
+
+    def _reload_done(self, future):
+        """在状态中报告 reload() 应用配置时的异常（否则会被丢弃）"""
+        if not future.cancelled() and future.exception() is not None:
+            self.status(f"应用配置失败: {future.exception()}")
+
+    async def _reload(self, config: EngineConfig, saved: bool):
+        if saved and self._config_watcher is not None:
+            self._config_watcher.acknowledge()
+        await self.reconfigure(config)
+
+    async def reconfigure(self, config: EngineConfig):
+        """
+        在运行中应用新配置（在引擎事件循环中调用）
+
+        OSC 目标和地址、心率范围、OBS 模式等输出配置直接替换；只有 SOURCE_FIELDS 中的
+        数据源配置变化时才重新连接数据源；RESTART_FIELDS 中的配置在下次开始监测时生效。
+        新的数据源和输出先全部创建好再替换，无法创建的部分（例如无法解析的 OSC 地址、
+        未知的主数据源策略）保留当前的数据源或输出，并在状态中提示。
+        """
+        async with self._reconfigure_lock:
+            if not self.running:
+                return
+            for message in config.warnings:
+                self.status(message)
+            old = self.config
+            pending = [name for name in RESTART_FIELDS if getattr(config, name) != getattr(old, name)]
+            config = replace(config, **{name: getattr(old, name) for name in RESTART_FIELDS})
+
+            source = None
+            if any(getattr(config, name) != getattr(old, name) for name in SOURCE_FIELDS):
+                try:
+                    source = create_source(config)
+                except (OSError, ValueError) as e:
+                    self.status(f"数据源配置有误，继续使用当前数据源: {e}")
+                    config = replace(config, **{name: getattr(old, name) for name in SOURCE_FIELDS})
+
+            outputs = None
+            if replace(config, **{name: getattr(old, name) for name in SOURCE_FIELDS + DISPLAY_FIELDS}) != old:
+                try:
+                    # 创建输出时要解析 OSC 目标的主机名（getaddrinfo 会阻塞），不在事件循环中执行
+                    outputs = await self._loop.run_in_executor(None, self._open_outputs, config)
+                except (OSError, ValueError) as e:
+                    self.status(f"输出配置有误，继续使用当前输出: {e}")
+                    config = replace(old, **{name: getattr(config, name) for name in SOURCE_FIELDS})
+                if not self.running:
+                    # 等待期间引擎已停止，旧输出已经关闭
+                    if outputs is not None:
+                        _close_unused(outputs)
+                    return
+
+            if outputs is not None:
+                self._apply_outputs(config, outputs)
+                self.status(f"已应用新的输出配置，正在向 OSC 地址 {config.osc_ip}:{config.osc_port} 发送心率")
+            else:
+                self.config = config
+            if source is not None:
+                self._source_restart = asyncio.ensure_future(self._replace_source(source))
+                try:
+                    await self._source_restart
+                finally:
+                    self._source_restart = None
+            if pending:
+                self.status(f"以下配置需要重新开始监测后生效: {', '.join(pending)}")
+
+    async def _replace_source(self, source):
+        """停止当前数据源（断开连接）后启动按新配置创建的数据源"""
+        self.status("数据源配置已修改，正在重新连接...")
+        old_task = self._source_task
+        old_task.cancel()
+        await asyncio.gather(old_task, return_exceptions=True)
+        self.set_connected(False)
+        self.source = source
+        self._source_task = asyncio.create_task(self.source.run(self))
+
+    async def _watch_config(self):
+        async def changed():
+            try:
+                config = self._config_loader()
+            except (configparser.Error, ValueError) as e:
+                self.status(f"配置文件有误，未应用: {e}")
+                return
+            try:
+                await self.reconfigure(config)
+            except (OSError, ValueError) as e:
+                # 不能让监视任务退出，之后修改的配置仍要应用
+                self.status(f"配置未能应用: {e}")
+
+        await self._config_watcher.watch(changed)
+
+    # ---- 生命周期 ----
+
+    def stop(self):
+        """请求停止引擎（可在任意线程调用）"""
+        self._stop_requested = True
+        self.running = False
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def run(self):
+        """运行引擎直到数据源结束或调用 stop()"""
+        self._stop_event = asyncio.Event()
+        self._reconfigure_lock = asyncio.Lock()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_requested:
+            return
+
+        config = self.config
+        for message in config.warnings:
+            self.status(message)
+        self._apply_outputs(config, self._open_outputs(config))
+        if config.metrics_port:
+            from metrics_server import MetricsServer
+            self.metrics = MetricsServer(self, config.metrics_port)
+            try:
+                await self.metrics.start()
+                self.status(f"指标端点: http://{self.metrics.host}:{self.metrics.port}/metrics")
+            except OSError as e:
+                self.status(f"指标端点启动失败: {e}")
+                self.metrics = None
+        if config.session_dir:
+            from session_log import SessionRecorder, session_path
+            try:
+                self.recorder = self.pipeline.add(SessionRecorder(session_path(config.session_dir)))
+                self.status(f"正在记录心率到 {self.recorder.path}")
+            except OSError as e:
+                self.status(f"无法创建心率记录文件: {e}")
+        if config.capture_file:
+            from capture import CaptureWriter
+            self.capture = CaptureWriter(config.capture_file)
+            self.status(f"正在录制原始数据到 {config.capture_file}")
+
+        self.running = True
+        self._source_task = asyncio.create_task(self.source.run(self))
+        stop_task = asyncio.create_task(self._stop_event.wait())
+        watch_task = asyncio.create_task(self._watch_config()) if self._config_watcher else None
+        try:
+            while True:
+                source_task = self._source_task
+                await asyncio.wait({source_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                restart = self._source_restart
+                if stop_task.done() or restart is None:
+                    break
+                # 数据源因修改配置被替换，等待新的数据源启动后继续
+                await asyncio.wait({restart, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                if stop_task.done():
+                    break
+        finally:
+            self.running = False
+            tasks = [self._source_task, stop_task] + [t for t in (watch_task, self._source_restart) if t]
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            error = results[0]
+            if isinstance(error, Exception):
+                self.status(f"数据源运行异常: {error}")
+
+            if self.metrics:
+                await self.metrics.stop()
+                self.metrics = None
+            # 各输出端处理完队列中剩余的样本后停止
+            for stats in self.pipeline.stop():
+                self.status(f"输出队列 - {format_sink_stats(stats)}")
+            self.rate_writer = None
+            if self.recorder:
+                self.status(f"心率记录已保存: {self.recorder.path}（{self.recorder.records} 条）")
+                self.recorder = None
+            if self.capture:
+                self.capture.close()
+                self.status(f"已录制 {self.capture.records} 条原始数据")
+                self.capture = None
+            self._close_outputs()
+            if self.tracer:
+                for line in self.tracer.summary_lines():
+                    self.status(f"延迟 - {line}")
+            self.status("心率监测已停止")
+
+
+def _close_unused(outputs: "_Outputs"):
+    """关闭创建后没有使用的一组输出"""
+    outputs.osc_client.close()
+    for device_client in outputs.device_osc.values():
+        device_client.close()
+    if outputs.stats_publisher:
+        outputs.stats_publisher.sender.close()
+
+
+class _Outputs(NamedTuple):
+    """一组 OSC 输出，运行中修改配置时整体替换"""
+    osc_client: OscFanout
+    scheduler: object
+    device_osc: dict
+    statistics: object
+    stats_publisher: object
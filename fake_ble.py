@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+模拟的 bleak 后端 - 不需要蓝牙适配器，可以同时模拟几十个心率设备
+
+用法:
+    backend = FakeBleBackend(count=32, interval=0.1)
+    source = BleSource(["Fake HR 01", "Fake HR 02"],
+                       scanner=backend.scanner, client_factory=backend.client)
+
+FakeBleBackend.scanner 的用法与 BleakScanner 类相同（detection_callback + start/stop，以及 discover），
+FakeBleBackend.client 的调用方式与 BleakClient 相同。设备在扫描期间每 adv_interval 秒广播一次，
+连接后按 interval 发送标准 0x2A37 通知（UINT8 心率 + 1 个 RR 间期）。drop() 可以模拟设备断开一段时间。
+"""
+
+import asyncio
+import math
+import random
+import struct
+from typing import Dict, List, NamedTuple, Optional
+
+
+class FakeDevice(NamedTuple):
+    """扫描结果，字段与 bleak.backends.device.BLEDevice 常用字段一致"""
+    name: str
+    address: str
+
+
+class FakePeripheral:
+    """一个模拟的心率设备"""
+
+    def __init__(self, name: str, address: str, base: int):
+        self.name = name
+        self.address = address
+        self.base = base
+        self.offline_until = 0.0
+        self.silent_until = 0.0     # 保持连接但不发送通知，直到该时间
+        self.clients: List["FakeBleakClient"] = []
+
+    def packet(self, n: int) -> bytes:
+        """第 n 个通知数据包"""
+        hr = self.base + round(10 * math.sin(n / 7))
+        rr = round(60 * 1024 / hr)
+        return bytes([0x10, hr]) + struct.pack("<H", rr)
+
+
+class FakeAdvertisement(NamedTuple):
+    """广播数据，字段与 bleak 的 AdvertisementData 常用字段一致"""
+    local_name: str
+    rssi: int = -60
+
+
+class FakeScanner:
+    """与 BleakScanner 实例相同的 start()/stop() 接口，扫描期间每个设备按 adv_interval 广播"""
+
+    def __init__(self, backend: "FakeBleBackend", detection_callback=None, **kwargs):
+        self.backend = backend
+        self.detection_callback = detection_callback
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self.backend.scans_started += 1
+        loop = asyncio.get_running_loop()
+        for peripheral in self.backend.peripherals.values():
+            # 每个设备的广播相位随机
+            phase = self.backend.random.uniform(0, self.backend.adv_interval)
+            self._tasks.append(loop.create_task(self._advertise(peripheral, phase)))
+
+    async def _advertise(self, peripheral: FakePeripheral, phase: float):
+        await asyncio.sleep(phase)
+        loop = asyncio.get_running_loop()
+        while True:
+            if peripheral.offline_until <= loop.time() and not peripheral.clients:
+                self.detection_callback(FakeDevice(peripheral.name, peripheral.address),
+                                        FakeAdvertisement(peripheral.name))
+            await asyncio.sleep(self.backend.adv_interval)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+class FakeScannerFactory:
+    """替代 BleakScanner 类：调用时创建扫描器实例，discover() 模拟旧的整轮扫描"""
+
+    def __init__(self, backend: "FakeBleBackend"):
+        self.backend = backend
+        self.discover_calls = 0
+
+    def __call__(self, detection_callback=None, **kwargs) -> FakeScanner:
+        return FakeScanner(self.backend, detection_callback, **kwargs)
+
+    async def discover(self, timeout: float = 5.0, **kwargs):
+        """与 BleakScanner.discover 相同：扫描满 timeout 秒后返回期间发现的全部设备"""
+        self.discover_calls += 1
+        await asyncio.sleep(timeout)
+        now = asyncio.get_running_loop().time()
+        return [FakeDevice(p.name, p.address) for p in self.backend.peripherals.values()
+                if p.offline_until <= now and not p.clients]
+
+
+class FakeBleakClient:
+    """与 BleakClient 相同的常用接口"""
+
+    def __init__(self, backend: "FakeBleBackend", address, disconnected_callback=None, **kwargs):
+        self.backend = backend
+        self.address = getattr(address, 'address', address)
+        self.disconnected_callback = disconnected_callback
+        self._connected = False
+        self._notify_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self, **kwargs):
+        await asyncio.sleep(self.backend.connect_time)
+        peripheral = self.backend.peripherals.get(self.address)
+        if peripheral is None or peripheral.offline_until > asyncio.get_running_loop().time():
+            raise ConnectionError(f"设备 {self.address} 不可用")
+        peripheral.clients.append(self)
+        self._connected = True
+        return True
+
+    async def disconnect(self):
+        self._drop(notify=False)
+        return True
+
+    async def start_notify(self, char_uuid, callback, **kwargs):
+        peripheral = self.backend.peripherals[self.address]
+        self._notify_task = asyncio.create_task(self._notify_loop(peripheral, callback))
+
+    async def _notify_loop(self, peripheral: FakePeripheral, callback):
+        n = 0
+        loop = asyncio.get_running_loop()
+        while self._connected:
+            if peripheral.silent_until <= loop.time():
+                callback(None, bytearray(peripheral.packet(n)))
+                self.backend.notifications += 1
+            n += 1
+            await asyncio.sleep(self.backend.interval)
+
+    def _drop(self, notify: bool):
+        if not self._connected:
+            return
+        self._connected = False
+        if self._notify_task:
+            self._notify_task.cancel()
+        peripheral = self.backend.peripherals.get(self.address)
+        if peripheral and self in peripheral.clients:
+            peripheral.clients.remove(self)
+        if notify and self.disconnected_callback:
+            self.disconnected_callback(self)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+
+class FakeBleBackend:
+    """模拟的蓝牙环境"""
+
+    def __init__(self, count: int = 24, interval: float = 1.0, name_prefix: str = "Fake HR",
+                 adv_interval: float = 0.1, connect_time: float = 0.01, seed: int = 0):
+        self.interval = interval
+        self.adv_interval = adv_interval
+        self.connect_time = connect_time
+        self.random = random.Random(seed)
+        self.notifications = 0
+        self.scans_started = 0
+        self.peripherals: Dict[str, FakePeripheral] = {}
+        for i in range(count):
+            address = f"00:00:00:00:{i // 256:02X}:{i % 256:02X}"
+            self.peripherals[address] = FakePeripheral(f"{name_prefix} {i + 1:02d}", address, 60 + i % 60)
+        self.scanner = FakeScannerFactory(self)
+
+    @property
+    def device_names(self) -> List[str]:
+        return [p.name for p in self.peripherals.values()]
+
+    def client(self, address, disconnected_callback=None, **kwargs) -> FakeBleakClient:
+        """BleakClient 的替代工厂"""
+        return FakeBleakClient(self, address, disconnected_callback, **kwargs)
+
+    def drop(self, name: str, down_for: float = 0.0):
+        """断开名为 name 的设备，并让它在 down_for 秒内不可连接、不可扫描"""
+        for peripheral in self.peripherals.values():
+            if peripheral.name == name:
+                peripheral.offline_until = asyncio.get_running_loop().time() + down_for
+                for client in list(peripheral.clients):
+                    client._drop(notify=True)
+
+    def freeze(self, name: str, duration: float):
+        """让名为 name 的设备保持连接，但在 duration 秒内不发送通知（手环卡住）"""
+        for peripheral in self.peripherals.values():
+            if peripheral.name == name:
+                peripheral.silent_until = asyncio.get_running_loop().time() + duration
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+实时心率曲线 - 固定容量的 NumPy 环形缓冲区 + LTTB 降采样（需要安装 numpy）
+
+HeartRateHistory 预先分配 capacity 个点（默认 65536，1 Hz 约 18 小时），满后覆盖最早的点，
+运行再久内存也不会增长。
+
+绘制前用 LTTB（Largest-Triangle-Three-Buckets）把数据降到不超过每个像素列一个点，
+无论缓冲区中有一分钟还是十二小时的数据，实际绘制的折线点数都只与控件宽度有关。
+降采样是增量的（IncrementalLttb）：桶边界按样本序号固定，已经确定的桶的选择缓存起来，
+新样本到来时只重新计算最后的一两个桶，每帧的开销同样与数据时长无关。
+
+HeartRateChart 只在数据或尺寸变化时重新降采样；由 GUI 的 update_ui 定时器调用 refresh()，
+有新数据时才请求重绘，每个刷新周期最多重绘一次。
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # 心率曲线为可选功能，没有 numpy 时界面不显示曲线
+    np = None
+
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QWidget
+
+DEFAULT_CAPACITY = 65536
+
+# 纵轴范围在数据最低 / 最高值之外留出的余量，以及刻度间隔
+Y_MARGIN = 5
+Y_STEPS = (5, 10, 20, 50)
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("心率曲线需要安装 numpy: pip install numpy")
+
+
+class HeartRateHistory:
+    """固定容量的 (时间, 心率) 环形缓冲区，样本按加入顺序编号（序号）"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        _require_numpy()
+        self.capacity = capacity
+        self.t = np.zeros(capacity, np.float64)
+        self.hr = np.zeros(capacity, np.float64)
+        self.total = 0          # 清空以来加入的样本数，即下一个样本的序号
+        self.version = 0        # 每次修改加 1，用于判断缓存是否过期
+        self.generation = 0     # 每次清空加 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def oldest(self) -> int:
+        """缓冲区中最早的样本的序号"""
+        return self.total - self._size
+
+    def append(self, t: float, heart_rate: float):
+        """加入一个点（t 单调不减），缓冲区已满时覆盖最早的点"""
+        i = self.total % self.capacity
+        self.t[i] = t
+        self.hr[i] = heart_rate
+        self.total += 1
+        if self._size < self.capacity:
+            self._size += 1
+        self.version += 1
+
+    def clear(self):
+        self.total = 0
+        self._size = 0
+        self.version += 1
+        self.generation += 1
+
+    def slice(self, start: int, stop: int):
+        """序号 start 到 stop（不含）的 (t, hr)，不跨越缓冲区末尾时为视图"""
+        i, j = start % self.capacity, stop % self.capacity
+        if i < j or stop == start:
+            return self.t[i:j], self.hr[i:j]
+        index = np.arange(start, stop) % self.capacity
+        return self.t[index], self.hr[index]
+
+    def take(self, seqs):
+        """按序号取出若干个点的 (t, hr)"""
+        index = np.asarray(seqs) % self.capacity
+        return self.t[index], self.hr[index]
+
+    def arrays(self):
+        """按时间顺序排列的全部 (t, hr)"""
+        return self.slice(self.oldest, self.total)
+
+
+class IncrementalLttb:
+    """
+    增量 LTTB 降采样
+
+    桶大小取 2 的幂，使缓冲区中的桶数不超过目标点数；桶的边界固定在序号 k * 桶大小 上，
+    不随缓冲区覆盖而移动。每个桶以上一个桶选中的点和下一个桶的平均点为顶点，
+    选出与二者构成的三角形面积最大的点。下一个桶已写满的桶不会再变化，
+    其选择和桶内最低 / 最高心率缓存起来，之后每帧只计算最后一两个桶。
+    数据量增长到桶数超过目标点数时桶大小翻倍、全部重算一次。
+
+    缓冲区覆盖最早的桶之后，后面的桶沿用覆盖前算出的选择，与对当前数据从头计算相比
+    少数点可能不同（顶点不同），两者都是有效的 LTTB 结果。
+    """
+
+    def __init__(self, history: HeartRateHistory):
+        self.history = history
+        self.bucket_size = 0
+        self.computed = 0       # 统计：计算过的桶数
+        self._generation = None
+        self._cache = {}        # 桶号 -> (选中的序号, 桶内最低, 桶内最高)
+
+    def points(self, target: int):
+        """返回 (t, hr, 最低心率, 最高心率)，点数不超过 target + 2"""
+        history = self.history
+        n = len(history)
+        if n <= max(target, 3):
+            t, hr = history.arrays()
+            return t, hr, hr.min(), hr.max()
+
+        size = 1
+        while -(-n // size) > target:
+            size *= 2
+        cache = self._cache
+        if size != self.bucket_size or history.generation != self._generation:
+            self.bucket_size = size
+            self._generation = history.generation
+            cache.clear()
+
+        oldest, total = history.oldest, history.total
+        first = oldest // size              # 最早的桶，可能已被部分覆盖，只保留首点
+        last = (total - 1) // size          # 最新的桶，可能未写满，只保留末点
+        if len(cache) > 2 * target:
+            for key in [key for key in cache if key <= first]:
+                del cache[key]
+
+        _, head = history.slice(oldest, (first + 1) * size)
+        _, tail = history.slice(last * size, total)
+        low = min(float(head.min()), float(tail.min()))
+        high = max(float(head.max()), float(tail.max()))
+        selected = [oldest]
+        seq = oldest
+        capacity, t_all, hr_all = history.capacity, history.t, history.hr
+        for bucket in range(first + 1, last):
+            entry = cache.get(bucket)
+            if entry is None:
+                anchor_t, anchor_hr = t_all[seq % capacity], hr_all[seq % capacity]
+                start = bucket * size
+                bt, bhr = history.slice(start, start + size)
+                nt, nhr = history.slice(start + size, min(start + 2 * size, total))
+                area = np.abs((anchor_t - nt.mean()) * (bhr - anchor_hr) - (anchor_t - bt) * (nhr.mean() - anchor_hr))
+                entry = (start + int(area.argmax()), float(bhr.min()), float(bhr.max()))
+                self.computed += 1
+                if start + 2 * size <= total:
+                    cache[bucket] = entry
+            seq, bucket_low, bucket_high = entry
+            selected.append(seq)
+            if bucket_low < low:
+                low = bucket_low
+            if bucket_high > high:
+                high = bucket_high
+        selected.append(total - 1)
+        t, hr = history.take(selected)
+        return t, hr, low, high
+
+
+def _polyline(x, y) -> QPolygonF:
+    """由坐标数组直接填充 QPolygonF 的内存，不逐点创建 QPointF"""
+    polygon = QPolygonF(len(x))
+    pointer = polygon.data()
+    pointer.setsize(len(x) * 16)
+    buffer = np.frombuffer(pointer, np.float64)
+    buffer[0::2] = x
+    buffer[1::2] = y
+    return polygon
+
+
+def _format_span(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 3600:
+        return f"{seconds // 60}:{seconds % 60:02d}"
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class HeartRateChart(QWidget):
+    """心率历史曲线（横轴为本次监测开始至今）"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.history = HeartRateHistory(capacity)
+        self.downsampler = IncrementalLttb(self.history)
+        self.setMinimumHeight(140)
+        self.color = QColor("#e74c3c")
+        self._painted_version = -1
+        self._cache_key = None
+        self._cache = None      # (折线, 纵轴下限, 纵轴上限, 时间跨度)
+
+    def add(self, t: float, heart_rate: float):
+        """加入一个样本（不重绘，由 refresh() 统一请求）"""
+        self.history.append(t, heart_rate)
+
+    def clear(self):
+        self.history.clear()
+        self.update()
+
+    def set_color(self, color: str):
+        """折线颜色（数据中断时变灰）"""
+        self.color = QColor(color)
+        self.update()
+
+    def refresh(self):
+        """在 GUI 刷新定时器中调用：有新数据时请求重绘"""
+        if self.history.version != self._painted_version:
+            self.update()
+
+    def _plot_rect(self) -> QRectF:
+        return QRectF(self.rect()).adjusted(34, 6, -8, -18)
+
+    def _layout(self, plot: QRectF):
+        """降采样并换算为像素坐标，数据和尺寸不变时直接返回缓存"""
+        key = (self.history.version, plot.width(), plot.height())
+        if key == self._cache_key:
+            return self._cache
+        t, hr, low, high = self.downsampler.points(max(3, int(plot.width())))
+        low = math.floor((low - Y_MARGIN) / 5) * 5
+        high = math.ceil((high + Y_MARGIN) / 5) * 5
+        start, span = t[0], max(t[-1] - t[0], 1e-9)
+        x = plot.left() + (t - start) * (plot.width() / span)
+        y = plot.bottom() - (hr - low) * (plot.height() / (high - low))
+        self._cache = (_polyline(x, y), low, high, t[-1] - start)
+        self._cache_key = key
+        return self._cache
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#ffffff"))
+        plot = self._plot_rect()
+        history = self.history
+        self._painted_version = history.version
+        grid = QColor("#e0e0e0")
+        text = QColor("#7f8c8d")
+
+        if len(history) < 2 or plot.width() < 3 or plot.height() < 3:
+            painter.setPen(text)
+            painter.drawText(self.rect(), Qt.AlignCenter, "暂无心率数据")
+            return
+
+        polyline, low, high, span = self._layout(plot)
+        scale = plot.height() / (high - low)
+        step = next((s for s in Y_STEPS if s * scale >= 18), Y_STEPS[-1])
+        value = math.ceil(low / step) * step
+        while value <= high:
+            y = plot.bottom() - (value - low) * scale
+            painter.setPen(grid)
+            painter.drawLine(int(plot.left()), int(y), int(plot.right()), int(y))
+            painter.setPen(text)
+            painter.drawText(QRectF(0, y - 8, plot.left() - 4, 16), Qt.AlignRight | Qt.AlignVCenter, str(value))
+            value += step
+
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 2, plot.width(), 16),
+                         Qt.AlignLeft | Qt.AlignTop, f"-{_format_span(span)}")
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 2, plot.width(), 16),
+                         Qt.AlignRight | Qt.AlignTop, "现在")
+
+        # 1 像素宽的 cosmetic 画笔、不开抗锯齿：每个像素列一个点时长时间数据的折线很密，
+        # 抗锯齿的绘制开销会随起伏成倍增加
+        painter.setPen(QPen(self.color, 0))
+        painter.drawPolyline(polyline)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+蓝牙 GATT 心率测量值 (Heart Rate Measurement, 0x2A37) 解码
+
+数据格式（小端序）:
+    - Flags (1 字节)
+        bit0: 心率格式，0 = UINT8，1 = UINT16
+        bit1: 传感器接触状态（检测到接触）
+        bit2: 是否支持传感器接触检测
+        bit3: 是否包含能量消耗字段 (UINT16, 单位 kJ)
+        bit4: 是否包含 RR 间期 (若干个 UINT16, 单位 1/1024 秒)
+    - 心率值 (UINT8 或 UINT16)
+    - 能量消耗 (可选)
+    - RR 间期列表 (可选)
+
+decode_heart_rate_measurement 用于实时通知的逐包解码；
+decode_batch 使用 NumPy 对录制的大量数据包做向量化批量解码（需要安装 numpy）。
+"""
+
+import struct
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 批量解码为可选功能，实时解码不依赖 numpy
+    np = None
+
+FLAG_HR_UINT16 = 0x01
+FLAG_CONTACT_DETECTED = 0x02
+FLAG_CONTACT_SUPPORTED = 0x04
+FLAG_ENERGY_EXPENDED = 0x08
+FLAG_RR_INTERVALS = 0x10
+
+# RR 间期的单位为 1/1024 秒
+RR_UNITS_PER_SECOND = 1024
+
+
+class HeartRateMeasurement(NamedTuple):
+    """一条心率测量值"""
+    heart_rate: int
+    sensor_contact: Optional[bool]      # 设备不支持接触检测时为 None
+    energy_expended: Optional[int]      # 单位 kJ，未包含时为 None
+    rr_intervals: Tuple[int, ...]       # 单位 1/1024 秒
+
+    @property
+    def rr_intervals_ms(self) -> Tuple[float, ...]:
+        """RR 间期（毫秒）"""
+        return tuple(rr * 1000.0 / RR_UNITS_PER_SECOND for rr in self.rr_intervals)
+
+
+def decode_heart_rate_measurement(data) -> HeartRateMeasurement:
+    """
+    解码一个 0x2A37 通知数据包
+
+    直接在原始缓冲区上用 struct.unpack_from 读取，不做切片复制。
+
+    Args:
+        data: bytes / bytearray / memoryview
+
+    Returns:
+        HeartRateMeasurement
+
+    Raises:
+        ValueError: 数据包长度与 Flags 声明的字段不符
+    """
+    length = len(data)
+    if length < 2:
+        raise ValueError(f"心率数据包过短: {length} 字节")
+
+    flags = data[0]
+    if flags & FLAG_HR_UINT16:
+        if length < 3:
+            raise ValueError(f"UINT16 心率数据包过短: {length} 字节")
+        heart_rate = data[1] | (data[2] << 8)
+        offset = 3
+    else:
+        heart_rate = data[1]
+        offset = 2
+
+    sensor_contact = None
+    if flags & FLAG_CONTACT_SUPPORTED:
+        sensor_contact = bool(flags & FLAG_CONTACT_DETECTED)
+
+    energy_expended = None
+    if flags & FLAG_ENERGY_EXPENDED:
+        if length < offset + 2:
+            raise ValueError(f"能量消耗字段缺失: {length} 字节")
+        energy_expended = data[offset] | (data[offset + 1] << 8)
+        offset += 2
+
+    rr_intervals = ()
+    if flags & FLAG_RR_INTERVALS:
+        count = (length - offset) // 2
+        if count:
+            rr_intervals = struct.unpack_from(f"<{count}H", data, offset)
+
+    return HeartRateMeasurement(heart_rate, sensor_contact, energy_expended, rr_intervals)
+
+
+class BatchMeasurements(NamedTuple):
+    """批量解码结果，每个数组的第 i 项对应第 i 个数据包"""
+    heart_rate: "np.ndarray"        # uint16
+    sensor_contact: "np.ndarray"    # int8: -1 不支持, 0 未接触, 1 已接触
+    energy_expended: "np.ndarray"   # int32, 未包含时为 -1
+    rr_values: "np.ndarray"         # uint16, 所有数据包的 RR 间期顺序拼接
+    rr_offsets: "np.ndarray"        # int64, 长度 n+1, 第 i 包的 RR 为 rr_values[rr_offsets[i]:rr_offsets[i+1]]
+    valid: "np.ndarray"             # bool, 数据包长度是否满足 Flags 声明
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("批量解码需要安装 numpy: pip install numpy")
+
+
+def pack_packets(packets: Sequence[bytes]):
+    """
+    将数据包列表拼接为批量解码所需的 (buffer, offsets, lengths)
+
+    Args:
+        packets: 原始通知数据包列表
+
+    Returns:
+        (bytes, offsets 数组, lengths 数组)
+    """
+    _require_numpy()
+    lengths = np.fromiter((len(p) for p in packets), dtype=np.int64, count=len(packets))
+    offsets = np.zeros(len(packets), dtype=np.int64)
+    if len(packets) > 1:
+        np.cumsum(lengths[:-1], out=offsets[1:])
+    return b"".join(packets), offsets, lengths
+
+
+def decode_batch(buffer, offsets, lengths) -> BatchMeasurements:
+    """
+    向量化解码大量 0x2A37 数据包
+
+    Args:
+        buffer: 所有数据包拼接后的缓冲区（bytes 或 uint8 数组，不会被复制）
+        offsets: 每个数据包在 buffer 中的起始位置
+        lengths: 每个数据包的长度
+
+    Returns:
+        BatchMeasurements
+    """
+    _require_numpy()
+    buf = np.frombuffer(buffer, dtype=np.uint8) if not isinstance(buffer, np.ndarray) else buffer
+    off = np.asarray(offsets, dtype=np.int64)
+    ln = np.asarray(lengths, dtype=np.int64)
+    n = len(off)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return BatchMeasurements(empty.astype(np.uint16), empty.astype(np.int8),
+                                 empty.astype(np.int32), empty.astype(np.uint16),
+                                 np.zeros(1, dtype=np.int64), empty.astype(bool))
+
+    if len(buf) == 0:
+        buf = np.zeros(1, dtype=np.uint8)
+    last = len(buf) - 1
+
+    def byte_at(pos):
+        # 截断的数据包可能越界，先钳位再由 valid 掩码标记
+        return buf[np.minimum(pos, last)].astype(np.int64)
+
+    flags = byte_at(off)
+    is_u16 = flags & FLAG_HR_UINT16
+    has_energy = (flags & FLAG_ENERGY_EXPENDED) >> 3
+    has_rr = (flags & FLAG_RR_INTERVALS) != 0
+
+    valid = ln >= 2 + is_u16 + 2 * has_energy
+
+    low = byte_at(off + 1)
+    heart_rate = np.where(is_u16 != 0, low | (byte_at(off + 2) << 8), low)
+    heart_rate = np.where(valid, heart_rate, 0).astype(np.uint16)
+
+    sensor_contact = np.where((flags & FLAG_CONTACT_SUPPORTED != 0) & valid,
+                              (flags & FLAG_CONTACT_DETECTED) >> 1, -1).astype(np.int8)
+
+    energy_pos = off + 2 + is_u16
+    energy = np.where((has_energy != 0) & valid,
+                      byte_at(energy_pos) | (byte_at(energy_pos + 1) << 8), -1).astype(np.int32)
+
+    rr_pos = energy_pos + 2 * has_energy
+    rr_count = np.where(has_rr & valid, np.maximum(off + ln - rr_pos, 0) // 2, 0)
+    rr_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(rr_count, out=rr_offsets[1:])
+
+    total = int(rr_offsets[-1])
+    if total:
+        packet_index = np.repeat(np.arange(n), rr_count)
+        within = np.arange(total, dtype=np.int64) - rr_offsets[packet_index]
+        pos = rr_pos[packet_index] + 2 * within
+        rr_values = (buf[pos].astype(np.uint16) | (buf[pos + 1].astype(np.uint16) << 8))
+    else:
+        rr_values = np.zeros(0, dtype=np.uint16)
+
+    return BatchMeasurements(heart_rate, sensor_contact, energy, rr_values, rr_offsets, valid)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+滑动窗口心率统计 - 最近 N 秒的最低 / 最高 / 平均心率，以及基于 RR 间期的 RMSSD 心率变异性
+
+每次更新的开销与窗口长度无关（均摊 O(1)）:
+    - 最低 / 最高：单调队列，新值入队时从队尾弹出不可能再成为最值的元素，
+      队首即为窗口内的最值；每个元素最多入队、出队各一次
+    - 平均：窗口内数值的累加和，入窗口时加、出窗口时减（整数运算，不会累积误差）
+    - RMSSD：相邻 RR 间期之差的平方，同样用累加和维护窗口内的均值，
+      RMSSD = sqrt(mean((RR[i] - RR[i-1])²))
+
+RR 间期超出 MIN_RR-MAX_RR（心率约 30-240）的视为伪迹，丢弃并断开差分链；
+主数据源切换到另一个设备时同样断开，不计算跨设备的差值。
+
+StatsPublisher 把统计值作为附加的 OSC int 参数发送（osc_hr_min / osc_hr_max / osc_hr_avg / osc_hrv），
+最多每秒一次，只发送变化的值，并按 keepalive 间隔完整重发。
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+# 合理的 RR 间期范围，单位 1/1024 秒（250 ms - 2000 ms）
+MIN_RR = 256
+MAX_RR = 2048
+
+RR_UNITS_PER_SECOND = 1024
+
+# StatsPublisher 的参数名，对应 config.ini 中的地址
+STAT_KEYS = ('min', 'max', 'mean', 'rmssd')
+
+
+class RollingWindow:
+    """最近 seconds 秒内数值的最低 / 最高 / 平均"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.total = 0
+        self._items = deque()   # (时间, 值)
+        self._mins = deque()    # (序号, 值)，值单调递增
+        self._maxs = deque()    # (序号, 值)，值单调递减
+        self._seq = 0           # 下一个入队元素的序号
+        self._head = 0          # 窗口内最早元素的序号
+
+    def push(self, value: int, now: float):
+        """加入一个值（now 单调不减）"""
+        seq = self._seq
+        mins = self._mins
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((seq, value))
+        maxs = self._maxs
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((seq, value))
+        self._items.append((now, value))
+        self.total += value
+        self._seq = seq + 1
+        self.evict(now)
+
+    def evict(self, now: float):
+        """移除超出窗口的值"""
+        limit = now - self.seconds
+        items = self._items
+        while items and items[0][0] <= limit:
+            self.total -= items.popleft()[1]
+            self._head += 1
+        head = self._head
+        while self._mins and self._mins[0][0] < head:
+            self._mins.popleft()
+        while self._maxs and self._maxs[0][0] < head:
+            self._maxs.popleft()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def min(self) -> Optional[int]:
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self) -> Optional[int]:
+        return self._maxs[0][1] if self._maxs else None
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / len(self._items) if self._items else None
+
+
+class RollingRmssd:
+    """最近 seconds 秒内 RR 间期的 RMSSD"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.artifacts = 0
+        self._diffs = deque()   # (时间, 相邻 RR 之差的平方)
+        self._sum = 0
+        self._last_rr: Optional[int] = None
+
+    def push(self, rr: int, now: float):
+        """加入一个 RR 间期（单位 1/1024 秒）"""
+        if not MIN_RR <= rr <= MAX_RR:
+            self.artifacts += 1
+            self._last_rr = None
+            return
+        last = self._last_rr
+        if last is not None:
+            square = (rr - last) * (rr - last)
+            self._diffs.append((now, square))
+            self._sum += square
+        self._last_rr = rr
+
+    def break_chain(self):
+        """下一个 RR 间期不与之前的计算差值"""
+        self._last_rr = None
+
+    def evict(self, now: float):
+        limit = now - self.seconds
+        diffs = self._diffs
+        while diffs and diffs[0][0] <= limit:
+            self._sum -= diffs.popleft()[1]
+
+    @property
+    def value(self) -> Optional[float]:
+        """RMSSD（毫秒），窗口内没有差值时为 None"""
+        if not self._diffs:
+            return None
+        return math.sqrt(self._sum / len(self._diffs)) * 1000 / RR_UNITS_PER_SECOND
+
+
+class HrStatistics:
+    """主数据源心率的滑动窗口统计"""
+
+    def __init__(self, window: float = 60.0, hrv_window: float = 60.0):
+        self.heart_rate = RollingWindow(window)
+        self.hrv = RollingRmssd(hrv_window)
+        self.updates = 0
+        self._device = None
+
+    def update(self, heart_rate: int, rr_intervals, now: float, device: str = ''):
+        """加入一个样本，now 为 time.monotonic()"""
+        self.updates += 1
+        self.heart_rate.push(heart_rate, now)
+        hrv = self.hrv
+        if device != self._device:
+            hrv.break_chain()
+            self._device = device
+        for rr in rr_intervals:
+            hrv.push(rr, now)
+        hrv.evict(now)
+
+    def values(self) -> Dict[str, int]:
+        """当前的统计值（取整），尚无数据的项不包含在内"""
+        window = self.heart_rate
+        result = {}
+        if len(window):
+            result['min'] = window.min
+            result['max'] = window.max
+            result['mean'] = round(window.mean)
+        rmssd = self.hrv.value
+        if rmssd is not None:
+            result['rmssd'] = round(rmssd)
+        return result
+
+
+class StatsPublisher:
+    """把统计值发送到附加的 OSC 地址"""
+
+    def __init__(self, statistics: HrStatistics, sender, interval: float = 1.0, keepalive: float = 5.0):
+        """
+        Args:
+            statistics: HrStatistics
+            sender: osc_output.IntBundleSender
+            interval: 两次发送的最小间隔（秒）
+            keepalive: 完整重发全部统计值的间隔（秒），0 表示每次都完整发送
+        """
+        self.statistics = statistics
+        self.sender = sender
+        self.interval = interval
+        self.keepalive = keepalive
+        self.sent = 0
+        self._last_values: Dict[str, int] = {}
+        self._last_send: Optional[float] = None
+        self._last_full: Optional[float] = None
+
+    def publish(self, now: float):
+        """在每个样本之后调用，按间隔发送变化的统计值"""
+        if self._last_send is not None and now - self._last_send < self.interval:
+            return
+        values = self.statistics.values()
+        full = self.keepalive <= 0 or self._last_full is None or now - self._last_full >= self.keepalive
+        if not full:
+            values = {key: value for key, value in values.items() if self._last_values.get(key) != value}
+        self._last_send = now
+        if full:
+            self._last_full = now
+        if not values:
+            return
+        self._last_values.update(values)
+        self.sender.send(values)
+        self.sent += 1
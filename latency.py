@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+延迟追踪 - 统计从收到原始数据到各处理阶段完成的耗时
+
+每个样本在数据源回调入口记录 time.perf_counter()（Windows 上 time.monotonic() 的精度只有约 15 ms，
+不足以测量微秒级的阶段），之后在各阶段完成时计算与它的差值：
+
+    decode  解码完成，提交到引擎
+    osc     OSC 数据包发出
+    obs     rate.txt 写入完成（写入线程中，包含合并和限速的等待）
+    ui      界面读取到样本并更新显示（GUI 线程中）
+
+每个阶段一个对数分桶直方图，内存固定，不保存原始样本。
+每个阶段只在一个线程中记录，读取统计时不加锁（读到的可能是略旧的值）。
+未开启时引擎的 tracer 为 None，各处只多一次判断。
+"""
+
+import math
+import time
+from typing import Dict, List
+
+STAGES = ('decode', 'osc', 'obs', 'ui')
+STAGE_LABELS = {
+    'decode': "解码",
+    'osc': "OSC 发送",
+    'obs': "OBS 写入",
+    'ui': "界面显示",
+}
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图
+
+    从 min_value 开始每个 2 倍区间再等分为 SUB 个桶，相对误差不超过 1/SUB；
+    默认覆盖 1 微秒到约 67 秒，共 209 个计数。
+    """
+
+    SUB = 8
+
+    def __init__(self, min_value: float = 1e-6, octaves: int = 26):
+        self.min_value = min_value
+        self.counts = [0] * (octaves * self.SUB + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """记录一个延迟（秒）"""
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+        x = seconds / self.min_value
+        if x < 1:
+            index = 0
+        else:
+            mantissa, exponent = math.frexp(x)   # x = mantissa * 2**exponent, mantissa ∈ [0.5, 1)
+            index = 1 + (exponent - 1) * self.SUB + int((mantissa * 2 - 1) * self.SUB)
+        counts = self.counts
+        counts[min(index, len(counts) - 1)] += 1
+
+    def _upper_bound(self, index: int) -> float:
+        if index == 0:
+            return self.min_value
+        octave, sub = divmod(index - 1, self.SUB)
+        return self.min_value * 2 ** octave * (1 + (sub + 1) / self.SUB)
+
+    def percentile(self, p: float) -> float:
+        """第 p 百分位的延迟（秒，取所在桶的上界，不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                if index == len(self.counts) - 1:
+                    return self.max     # 超出范围的值都记在最后一个桶
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.max = 0.0
+
+
+class LatencyTracer:
+    """各阶段的延迟直方图"""
+
+    def __init__(self):
+        self.stages: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in STAGES}
+
+    def record(self, stage: str, received: float):
+        """记录阶段 stage 完成，received 为收到原始数据时的 time.perf_counter()"""
+        self.stages[stage].record(time.perf_counter() - received)
+
+    def summary_lines(self) -> List[str]:
+        """每个有数据的阶段一行：p50 / p99 / 最大值（毫秒）"""
+        lines = []
+        for stage, hist in self.stages.items():
+            if hist.count:
+                lines.append(f"{STAGE_LABELS[stage]}: p50 {hist.percentile(50) * 1000:.3f} ms, "
+                             f"p99 {hist.percentile(99) * 1000:.3f} ms, "
+                             f"最大 {hist.max * 1000:.3f} ms（{hist.count} 个样本）")
+        return lines
+
+    def reset(self):
+        for hist in self.stages.values():
+            hist.reset()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+最新值槽 - 工作线程发布、GUI 定时器读取
+
+工作线程每个样本只做一次属性赋值（在 CPython 中是原子的），不经过 Qt 事件队列；
+GUI 的 update_ui 定时器每次只读取最新的一条。数据再密集，每个刷新周期也最多重绘一次，
+GUI 卡顿时也不会在事件队列中积压信号。
+"""
+
+import time
+from typing import Any, NamedTuple, Optional
+
+
+class SlotValue(NamedTuple):
+    """槽中的一条记录"""
+    seq: int            # 发布序号，从 1 开始递增
+    timestamp: float    # 发布时的 time.monotonic()
+    value: Any
+
+
+class LatestValueSlot:
+    """单写者、多读者的最新值槽（无锁）"""
+
+    def __init__(self):
+        self._seq = 0
+        self._latest: Optional[SlotValue] = None
+
+    def publish(self, value):
+        """发布新值（仅由一个写线程调用）"""
+        self._seq += 1
+        # 整条记录一次性替换，读者不会看到序号与值不匹配的中间状态
+        self._latest = SlotValue(self._seq, time.monotonic(), value)
+
+    def read(self) -> Optional[SlotValue]:
+        """读取最新值，尚未发布时返回 None"""
+        return self._latest
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+本地监控端点 - 以 Prometheus 文本格式暴露引擎运行指标，供无人值守的推流机监控
+
+在引擎的事件循环中用 asyncio.start_server 提供服务，每次抓取只是一个协程，不创建线程。
+默认只监听 127.0.0.1；在 config.ini 的 [DATABASE] 段设置 metrics_port 开启（0 为关闭）:
+
+    curl http://127.0.0.1:9101/metrics
+
+同时运行一个事件循环延迟探测任务：每 LAG_INTERVAL 秒安排一次定时回调，
+实际触发时间比预期晚多少即为事件循环延迟（回调被阻塞的程度）。
+"""
+
+import asyncio
+import math
+import time
+from typing import List
+
+LAG_INTERVAL = 0.5
+
+# 读取请求头的超时（秒）和长度上限
+_REQUEST_TIMEOUT = 5.0
+_MAX_HEADER_BYTES = 8192
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Exposition:
+    """按 Prometheus 文本格式拼接指标"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples):
+        """samples: [(标签字典, 值), ...]"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            value_text = "NaN" if value is None or (isinstance(value, float) and math.isnan(value)) else repr(value)
+            self.lines.append(f"{name}{{{label_text}}} {value_text}" if label_text else f"{name} {value_text}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """Prometheus 指标端点"""
+
+    def __init__(self, engine, port: int, host: str = "127.0.0.1"):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.scrapes = 0
+        self.loop_lag = 0.0
+        self.loop_lag_max = 0.0
+        self._server = None
+        self._lag_task = None
+
+    async def start(self):
+        """开始监听；端口被占用等错误由调用方处理"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._lag_task = asyncio.create_task(self._measure_lag())
+
+    async def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            self.loop_lag = lag
+            if lag > self.loop_lag_max:
+                self.loop_lag_max = lag
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), _REQUEST_TIMEOUT)
+            if len(head) > _MAX_HEADER_BYTES:
+                raise ValueError("请求头过长")
+            method, path, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+            if method != "GET":
+                status, body, content_type = "405 Method Not Allowed", "method not allowed\n", "text/plain"
+            elif path.split("?", 1)[0] != "/metrics":
+                status, body, content_type = "404 Not Found", "not found, try /metrics\n", "text/plain"
+            else:
+                self.scrapes += 1
+                status, body, content_type = "200 OK", self.render(), "text/plain; version=0.0.4"
+            data = body.encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}; charset=utf-8\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def render(self) -> str:
+        """生成当前的全部指标"""
+        engine = self.engine
+        source = engine.source.name
+        src = {'source': source}
+        out = _Exposition()
+
+        out.metric("hr_samples_received_total", "counter", "收到的心率样本数（含非主数据源设备）",
+                   [(src, engine.samples_received)])
+        out.metric("hr_samples_sent_total", "counter", "发送到主 OSC 目标的心率样本数",
+                   [(src, engine.samples_sent)])
+        out.metric("hr_current_bpm", "gauge", "主数据源的最新心率",
+                   [(src, engine.last_heart_rate if engine.samples_sent else None)])
+        since = time.monotonic() - engine.last_sample_time if engine.samples_sent else None
+        out.metric("hr_seconds_since_last_sample", "gauge", "距离主数据源上一个样本的秒数",
+                   [(src, since)])
+        out.metric("hr_source_connected", "gauge", "数据源是否已连接",
+                   [(src, int(engine.connected))])
+        out.metric("hr_source_stale", "gauge", "连接正常但心率数据中断（超过 stale_timeout 秒没有样本）",
+                   [(src, int(engine.stale))])
+
+        sessions = getattr(engine.source, 'sessions', {})
+        out.metric("hr_source_reconnects_total", "counter", "重连尝试次数",
+                   [({'source': source, 'device': name}, session.reconnects)
+                    for name, session in sessions.items()])
+        out.metric("hr_source_outages_total", "counter", "已恢复的断开次数",
+                   [({'source': source, 'device': name}, len(session.outages))
+                    for name, session in sessions.items()])
+
+        if engine.osc_client is not None:
+            stats = engine.osc_client.stats.items()
+            out.metric("hr_osc_packets_sent_total", "counter", "发送的 OSC 数据包数",
+                       [({'target': name}, s.sent) for name, s in stats])
+            out.metric("hr_osc_send_errors_total", "counter", "OSC 发送失败次数",
+                       [({'target': name}, s.errors) for name, s in stats])
+
+        policy = engine.osc_client.policy if engine.osc_client is not None else None
+        if policy is not None:
+            out.metric("hr_osc_messages_sent_total", "counter", "发送的 OSC 消息数（主目标组）",
+                       [({}, policy.sent)])
+            out.metric("hr_osc_messages_suppressed_total", "counter", "被发送策略省略的 OSC 消息数",
+                       [({'reason': 'unchanged'}, policy.unchanged),
+                        ({'reason': 'rate_limit'}, policy.rate_limited)])
+
+        statistics = engine.statistics
+        if statistics is not None:
+            window = statistics.heart_rate
+            out.metric("hr_window_bpm", "gauge", f"最近 {window.seconds:g} 秒的心率统计",
+                       [({'stat': 'min'}, window.min), ({'stat': 'max'}, window.max),
+                        ({'stat': 'mean'}, window.mean)])
+            out.metric("hr_hrv_rmssd_ms", "gauge", f"最近 {statistics.hrv.seconds:g} 秒 RR 间期的 RMSSD",
+                       [({}, statistics.hrv.value)])
+
+        writer = engine.rate_writer
+        if writer is not None:
+            out.metric("hr_obs_writes_total", "counter", "rate.txt 写入次数", [({}, writer.writes)])
+            out.metric("hr_obs_write_errors_total", "counter", "rate.txt 写入失败次数", [({}, writer.errors)])
+            out.metric("hr_obs_writes_skipped_total", "counter", "值未变化而跳过的 rate.txt 写入次数",
+                       [({}, writer.skipped)])
+
+        sinks = engine.pipeline.stats()
+        if sinks:
+            out.metric("hr_sink_queue_depth", "gauge", "输出端队列中等待处理的样本数",
+                       [({'sink': s.name}, s.depth) for s in sinks])
+            out.metric("hr_sink_queue_max_depth", "gauge", "启动以来输出端队列的最大长度",
+                       [({'sink': s.name}, s.max_depth) for s in sinks])
+            out.metric("hr_sink_delivered_total", "counter", "输出端已处理的样本数",
+                       [({'sink': s.name}, s.delivered) for s in sinks])
+            out.metric("hr_sink_dropped_total", "counter", "输出端队列已满而丢弃的样本数",
+                       [({'sink': s.name}, s.dropped) for s in sinks])
+
+        out.metric("hr_event_loop_lag_seconds", "gauge", "最近一次测得的事件循环延迟", [({}, self.loop_lag)])
+        out.metric("hr_event_loop_lag_max_seconds", "gauge", "启动以来最大的事件循环延迟",
+                   [({}, self.loop_lag_max)])
+        out.metric("hr_metrics_scrapes_total", "counter", "本端点被抓取的次数", [({}, self.scrapes)])
+        return out.text()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+OBS rate.txt 写入器 - 在独立线程中写文件，不阻塞心率回调
+
+引擎只调用 put() 提交最新样本（见 pipeline.py，溢出策略 KEEP_LATEST）；写入线程负责:
+    - 合并：只写最新值，中间值直接丢弃（计入丢弃数）
+    - 去重：值未变化时跳过写入
+    - 限速：两次写入之间至少间隔 min_interval 秒
+    - 原子替换：先写临时文件再 os.replace，OBS 不会读到被截断的文件
+"""
+
+import os
+
+from pipeline import KEEP_LATEST, SinkQueue
+
+
+class RateFileWriter(SinkQueue):
+    """rate.txt 后台写入线程（只保留最新样本的输出端队列）"""
+
+    def __init__(self, path: str = "rate.txt", min_interval: float = 0.2, tracer=None):
+        super().__init__("obs", overflow=KEEP_LATEST, min_interval=min_interval)
+        self.path = path
+        self.tracer = tracer    # LatencyTracer，记录 obs 阶段的延迟
+        self._last_written = None
+
+        # 统计信息（errors 继承自 SinkQueue）
+        self.writes = 0
+        self.skipped = 0
+
+    def handle(self, sample):
+        """写入一个样本的心率（engine.Sample）"""
+        if self._write(sample.heart_rate) and self.tracer and sample.received:
+            self.tracer.record('obs', sample.received)
+
+    def _write(self, value) -> bool:
+        """写入文件，返回是否实际写入"""
+        if value == self._last_written:
+            self.skipped += 1
+            return False
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(f"{value}")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # OBS 恰好打开文件时 Windows 上替换可能失败，保留旧值，等待下一个样本
+            self.errors += 1
+            return False
+
+        self._last_written = value
+        self.writes += 1
+        return True
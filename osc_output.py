@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+OSC 输出引擎 - 预编码地址头，每个样本只发送一个 OSC bundle 数据报
+
+python-osc 的 SimpleUDPClient.send_message 每次都会重新编码地址字符串和类型标签，
+并且每个参数都是一次独立的 sendto 系统调用。心率参数的地址在运行期间不会改变，
+因此这里在初始化时把 int/float/bool 三条消息一次性编码进一个 bundle 模板，
+每个样本只改写其中的数值字节，然后用一次 sendto 发出。
+
+传入 OscSendPolicy（见 osc_policy.py）时只发送值发生变化的参数，bundle 中只包含这些参数。
+
+同一个心率可以同时发给多个目标（VRChat、本地 overlay、另一台电脑）：
+地址相同的目标共用一个模板，每个样本只编码一次，再通过同一个非阻塞套接字依次发出。
+某个目标不可达只会记入它自己的错误计数，不会阻塞其他目标。
+"""
+
+import socket
+import struct
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from osc_policy import ALL_PARTS, BOOL, FLOAT, INT, OscSendPolicy
+
+# OSC bundle 头部："#bundle\0" + 64 位时间标签（1 表示立即执行）
+_BUNDLE_HEADER = b"#bundle\x00" + struct.pack(">Q", 1)
+
+
+def _osc_string(value: str) -> bytes:
+    """编码 OSC 字符串（以 \\0 结尾并补齐到 4 字节边界）"""
+    data = value.encode("utf-8") + b"\x00"
+    return data + b"\x00" * (-len(data) % 4)
+
+
+def encode_message(address: str, type_tag: str, payload: bytes = b"") -> bytes:
+    """
+    编码一条完整的 OSC 消息
+
+    Args:
+        address: OSC 地址，例如 /avatar/parameters/HR
+        type_tag: 类型标签（不含逗号），例如 "i"、"f"、"T"
+        payload: 已编码的参数字节
+
+    Returns:
+        OSC 消息字节
+    """
+    return _osc_string(address) + _osc_string("," + type_tag) + payload
+
+
+class BundleTemplate:
+    """
+    预编码的心率 bundle
+
+    bundle 布局在构造时固定，每个样本只通过 struct.pack_into 改写
+    int 值、float 值和 bool 的类型标签（T/F）这三处字节。
+    地址为空字符串的参数不发送。
+    """
+
+    def __init__(self, int_address: str, float_address: str, bool_address: str):
+        template = bytearray(_BUNDLE_HEADER)
+        self._bool_tag_offset = None
+        self._int_offset = None
+        self._float_offset = None
+        # 每个参数元素（长度前缀 + 消息）在模板中的范围，用于只发送部分参数
+        self._ranges: List[Tuple[int, int, int]] = []
+
+        # bool 放在最前面，与原先 bool -> int -> float 的发送顺序一致
+        if bool_address:
+            start = len(template)
+            bool_msg = encode_message(bool_address, "T")
+            template += struct.pack(">i", len(bool_msg))
+            self._bool_tag_offset = len(template) + len(_osc_string(bool_address)) + 1
+            template += bool_msg
+            self._ranges.append((BOOL, start, len(template)))
+        if int_address:
+            start = len(template)
+            int_msg = encode_message(int_address, "i", b"\x00" * 4)
+            template += struct.pack(">i", len(int_msg))
+            template += int_msg
+            self._int_offset = len(template) - 4
+            self._ranges.append((INT, start, len(template)))
+        if float_address:
+            start = len(template)
+            float_msg = encode_message(float_address, "f", b"\x00" * 4)
+            template += struct.pack(">i", len(float_msg))
+            template += float_msg
+            self._float_offset = len(template) - 4
+            self._ranges.append((FLOAT, start, len(template)))
+        self.bundle = template
+        self.empty = len(template) == len(_BUNDLE_HEADER)
+        self.parts = 0
+        for part, _, _ in self._ranges:
+            self.parts |= part
+
+        # 单独的 float 消息（由 OutputScheduler 插值发送），同样预先编码
+        self.float_msg = bytearray(encode_message(float_address, "f", b"\x00" * 4)) if float_address else None
+
+        # 单独的 bool 消息（停止时发送 False），同样预先编码
+        self.active_msgs = {}
+        if bool_address:
+            self.active_msgs = {
+                True: encode_message(bool_address, "T"),
+                False: encode_message(bool_address, "F"),
+            }
+
+    def pack(self, heart_rate: int, percent_f: float, active: bool = True,
+             parts: int = ALL_PARTS) -> Optional[bytes]:
+        """
+        把样本写入模板并返回
+
+        发送全部参数时返回模板本身（下次 pack 前有效），只发送部分参数时返回新拼接的 bundle，
+        parts 中没有本模板配置了地址的参数时返回 None。
+        """
+        buf = self.bundle
+        if self._bool_tag_offset is not None:
+            buf[self._bool_tag_offset] = 0x54 if active else 0x46  # 'T' / 'F'
+        if self._int_offset is not None:
+            struct.pack_into(">i", buf, self._int_offset, heart_rate)
+        if self._float_offset is not None:
+            struct.pack_into(">f", buf, self._float_offset, percent_f)
+        parts &= self.parts
+        if parts == self.parts:
+            return buf
+        if not parts:
+            return None
+        return _BUNDLE_HEADER + b"".join(buf[start:end] for part, start, end in self._ranges if parts & part)
+
+    def pack_float(self, percent_f: float) -> bytearray:
+        """把 float 值写入单独的 float 消息并返回（没有 float 地址时不应调用）"""
+        msg = self.float_msg
+        struct.pack_into(">f", msg, len(msg) - 4, percent_f)
+        return msg
+
+
+def _udp_socket(family) -> socket.socket:
+    """创建非阻塞的 UDP 发送套接字"""
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    # 所有目标共用发送缓冲区，调大一些，避免某个目标的数据包积压时其他目标因缓冲区满而丢包
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+    if sys.platform == 'win32' and hasattr(socket, 'SIO_UDP_CONNRESET'):
+        # Windows 上目标端口不可达的 ICMP 会让后续 sendto 报错，关闭该行为
+        sock.ioctl(socket.SIO_UDP_CONNRESET, False)
+    return sock
+
+
+class OscTarget(NamedTuple):
+    """一个 OSC 发送目标"""
+    name: str
+    ip: str
+    port: int
+    int_address: str
+    float_address: str
+    bool_address: str
+
+    @property
+    def addresses(self) -> Tuple[str, str, str]:
+        return self.int_address, self.float_address, self.bool_address
+
+
+class TargetStats:
+    """单个目标的发送统计"""
+
+    __slots__ = ('sent', 'errors', 'bytes', 'last_error')
+
+    def __init__(self):
+        self.sent = 0
+        self.errors = 0
+        self.bytes = 0
+        self.last_error = ''
+
+    def add(self, other: "TargetStats"):
+        """累加另一份统计（最后的错误以较新的为准）"""
+        self.sent += other.sent
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.last_error = self.last_error or other.last_error
+
+    def __repr__(self):
+        return f"TargetStats(sent={self.sent}, errors={self.errors}, bytes={self.bytes})"
+
+
+class OscFanout:
+    """把每个心率样本发送到多个 OSC 目标"""
+
+    def __init__(self, targets: List[OscTarget], policy: OscSendPolicy = None, parts: int = ALL_PARTS):
+        """
+        Args:
+            targets: 发送目标
+            policy: 发送策略，为 None 时每个样本都发送全部参数
+            parts: 随样本发送的参数，float 交给 OutputScheduler 插值发送时不包含 FLOAT
+        """
+        self.targets = list(targets)
+        self.policy = policy
+        self.stats: Dict[str, TargetStats] = {}
+        self._sockets: Dict[int, socket.socket] = {}
+
+        # 地址组合相同的目标共用一个模板
+        templates: Dict[Tuple[str, str, str], BundleTemplate] = {}
+        groups: Dict[Tuple[str, str, str], list] = {}
+        for target in self.targets:
+            family, _, _, _, sockaddr = socket.getaddrinfo(target.ip, target.port, type=socket.SOCK_DGRAM)[0]
+            stats = self.stats.setdefault(target.name, TargetStats())
+            if target.addresses not in templates:
+                templates[target.addresses] = BundleTemplate(*target.addresses)
+                groups[target.addresses] = []
+            groups[target.addresses].append((self._socket(family), sockaddr, stats))
+
+        # [(模板, [(套接字, 地址, 统计), ...]), ...]
+        self._groups = [(templates[key], routes) for key, routes in groups.items()
+                        if not templates[key].empty]
+        configured = 0
+        for template, _ in self._groups:
+            configured |= template.parts
+        self.parts = configured & parts
+        # float 交给 OutputScheduler 时，保活完整重发仍带上最近一次插值发出的值
+        self.keepalive_parts = configured & ~parts & FLOAT
+        self.last_float: Optional[float] = None
+        if policy is not None:
+            policy.parts = self.parts
+            policy.keepalive_parts = self.keepalive_parts
+
+    def _socket(self, family) -> socket.socket:
+        """每个地址族只创建一个非阻塞套接字"""
+        sock = self._sockets.get(family)
+        if sock is None:
+            sock = self._sockets[family] = _udp_socket(family)
+        return sock
+
+    @staticmethod
+    def _send_all(data, routes):
+        for sock, addr, stats in routes:
+            try:
+                sock.sendto(data, addr)
+            except OSError as e:
+                # 缓冲区满、网络不可达等错误只影响当前目标
+                stats.errors += 1
+                stats.last_error = str(e)
+            else:
+                stats.sent += 1
+                stats.bytes += len(data)
+
+    def send(self, heart_rate: int, percent_f: float, active: bool = True):
+        """发送一个心率样本，每个目标最多一次 sendto"""
+        parts = self.parts
+        if self.policy is not None:
+            parts = self.policy.select(heart_rate, percent_f, time.monotonic())
+            if not parts:
+                return
+            if parts & self.keepalive_parts and self.last_float is not None:
+                percent_f = self.last_float
+        for template, routes in self._groups:
+            data = template.pack(heart_rate, percent_f, active, parts)
+            if data is not None:
+                self._send_all(data, routes)
+
+    def send_float(self, percent_f: float) -> bool:
+        """
+        仅发送 float 参数（单条消息，不经过 bundle），返回是否发出
+
+        与样本共用发送策略的速率上限（OscSendPolicy.allow），超出时不发送。
+        """
+        if self.policy is not None and not self.policy.allow(1, time.monotonic()):
+            return False
+        self.last_float = percent_f
+        for template, routes in self._groups:
+            if template.float_msg is not None:
+                self._send_all(template.pack_float(percent_f), routes)
+        return True
+
+    def send_active(self, active: bool):
+        """仅发送 bool 状态参数（不受发送策略限制）"""
+        if self.policy is not None and not active:
+            self.policy.deactivate()
+        for template, routes in self._groups:
+            if template.active_msgs:
+                self._send_all(template.active_msgs[bool(active)], routes)
+
+    def carry_stats(self, previous: "OscFanout"):
+        """
+        沿用被替换的旧输出的统计（运行中重新加载配置时调用）
+
+        同名目标的发送计数和发送策略的计数在新输出上继续累加，指标端点的计数器不会因重新加载归零。
+        """
+        for name, stats in self.stats.items():
+            old = previous.stats.get(name)
+            if old is not None:
+                stats.add(old)
+        if self.policy is not None and previous.policy is not None:
+            self.policy.carry_stats(previous.policy)
+
+    def close(self):
+        """关闭套接字"""
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets.clear()
+
+
+class OscBundleSender(OscFanout):
+    """只有一个目标的 OscFanout"""
+
+    def __init__(self, ip: str, port: int, int_address: str, float_address: str, bool_address: str,
+                 policy: OscSendPolicy = None):
+        super().__init__([OscTarget('default', ip, port, int_address, float_address, bool_address)], policy)
+        self.ip = ip
+        self.port = port
+
+
+class IntBundleSender:
+    """
+    把若干个 int 参数打包为一个 bundle 发送到一个目标（用于统计值等附加参数）
+
+    与 BundleTemplate 相同，bundle 在构造时预先编码，每次只改写数值字节；
+    只发送部分参数时拼接对应的元素。
+    """
+
+    def __init__(self, ip: str, port: int, addresses: Dict[str, str]):
+        """
+        Args:
+            ip: 目标 IP
+            port: 目标端口
+            addresses: 参数名 -> OSC 地址，地址为空的参数不发送
+        """
+        family, _, _, _, self._addr = socket.getaddrinfo(ip, port, type=socket.SOCK_DGRAM)[0]
+        self._sock = _udp_socket(family)
+        self.stats = TargetStats()
+
+        template = bytearray(_BUNDLE_HEADER)
+        # 参数名 -> (元素起点, 元素终点)，数值位于元素的最后 4 个字节
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        for key, address in addresses.items():
+            if address:
+                msg = encode_message(address, "i", b"\x00" * 4)
+                start = len(template)
+                template += struct.pack(">i", len(msg)) + msg
+                self._ranges[key] = (start, len(template))
+        self._bundle = template
+        self.keys = list(self._ranges)
+
+    def send(self, values: Dict[str, int]):
+        """发送 values 中已配置地址的参数（一次 sendto）"""
+        buf = self._bundle
+        parts = []
+        for key, value in values.items():
+            span = self._ranges.get(key)
+            if span is not None:
+                struct.pack_into(">i", buf, span[1] - 4, value)
+                parts.append(span)
+        if not parts:
+            return
+        if len(parts) == len(self._ranges):
+            data = buf
+        else:
+            data = _BUNDLE_HEADER + b"".join(buf[start:end] for start, end in sorted(parts))
+        OscFanout._send_all(data, [(self._sock, self._addr, self.stats)])
+
+    def close(self):
+        self._sock.close()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+OSC 发送策略 - 只在参数值变化时发送，减少无意义的 UDP 流量和模型参数抖动
+
+原先每个样本都会重新发送 isHRActive=True 以及 int/float 两个值，即使它们没有变化。
+OscSendPolicy 对每个样本决定实际需要发送哪些参数：
+    - int:   心率变化时发送
+    - float: 量化后的值变化时发送（默认 127 级，与 VRChat 网络同步 float 参数的精度一致）
+    - bool:  只在状态切换时发送（开始时 True，停止时 False）
+    - 保活:  距上次完整发送超过 keepalive 秒时重发全部参数，
+             保证切换模型 / 重进世界后参数能恢复；keepalive 为 0 时每个样本都完整发送（旧行为）
+    - 限速:  令牌桶限制每秒最多发送 max_rate 条消息（0 为不限），超出的样本整体丢弃，
+             未发出的变化会在下一个样本时继续比较并补发；插值输出的 float 消息（allow()）
+             也从同一个令牌桶扣除，并为样本留出一次完整发送的余量
+
+参数用位掩码表示，一条消息即 bundle 中的一个参数。
+"""
+
+from typing import Optional
+
+BOOL = 1
+INT = 2
+FLOAT = 4
+ALL_PARTS = BOOL | INT | FLOAT
+
+FLOAT_STEPS = 127
+
+
+def _count(parts: int) -> int:
+    return bin(parts).count("1")
+
+
+class OscSendPolicy:
+    """决定每个样本需要发送的参数，并统计被省略的消息数（时间均为 time.monotonic()）"""
+
+    def __init__(self, keepalive: float = 5.0, max_rate: float = 20.0,
+                 float_steps: int = FLOAT_STEPS, parts: int = ALL_PARTS):
+        """
+        Args:
+            keepalive: 完整重发全部参数的间隔（秒），0 表示每个样本都完整发送
+            max_rate: 每秒最多发送的消息数，0 表示不限
+            float_steps: float 参数的量化级数
+            parts: 实际配置了地址的参数（由 OscFanout 设置）
+        """
+        self.keepalive = keepalive
+        self.max_rate = max_rate
+        self.float_steps = float_steps
+        self.parts = parts
+        # 平时由其他路径发送、只在保活完整重发时随样本一起发送的参数（插值输出的 float，由 OscFanout 设置）
+        self.keepalive_parts = 0
+
+        # 统计（单位均为消息数，保活为次数）
+        self.samples = 0
+        self.sent = 0
+        self.unchanged = 0          # 值未变化而省略
+        self.rate_limited = 0       # 超出速率上限而丢弃
+        self.keepalives = 0
+
+        self._active = False
+        self._heart_rate: Optional[int] = None
+        self._level: Optional[int] = None
+        self._last_full: Optional[float] = None
+        self._tokens = float(max_rate)
+        self._refilled: Optional[float] = None
+
+    def _take(self, count: int, now: float, reserve: float = 0) -> bool:
+        """从令牌桶取出 count 个令牌（桶容量为 1 秒的配额），取出后至少还要剩下 reserve 个"""
+        if self.max_rate <= 0:
+            return True
+        if self._refilled is not None:
+            self._tokens = min(float(self.max_rate), self._tokens + (now - self._refilled) * self.max_rate)
+        self._refilled = now
+        if self._tokens < count + reserve:
+            return False
+        self._tokens -= count
+        return True
+
+    def select(self, heart_rate: int, percent: float, now: float) -> int:
+        """返回这个样本需要发送的参数掩码，0 表示不发送"""
+        self.samples += 1
+        level = round(percent * self.float_steps)
+        full = (self.keepalive <= 0 or self._last_full is None
+                or now - self._last_full >= self.keepalive)
+        if full:
+            parts = self.parts | self.keepalive_parts
+        else:
+            parts = 0
+            if not self._active:
+                parts |= BOOL
+            if heart_rate != self._heart_rate:
+                parts |= INT
+            if level != self._level:
+                parts |= FLOAT
+            parts &= self.parts
+            self.unchanged += _count(self.parts) - _count(parts)
+        if not parts:
+            return 0
+
+        count = _count(parts)
+        if not self._take(count, now):
+            self.rate_limited += count
+            return 0
+
+        # 只记录实际发出的值，被丢弃的变化下次仍会被判定为变化
+        if parts & BOOL:
+            self._active = True
+        if parts & INT:
+            self._heart_rate = heart_rate
+        if parts & FLOAT:
+            self._level = level
+        if full:
+            if self._last_full is not None:
+                self.keepalives += 1
+            self._last_full = now
+        self.sent += count
+        return parts
+
+    def allow(self, count: int, now: float) -> bool:
+        """
+        样本以外的发送（插值输出的 float）是否可以发出 count 条消息，可以时计入已发送
+
+        与样本共用令牌桶，osc_max_rate 对两者合计生效；桶中为样本的一次完整发送留出余量，
+        插值消息不会让心率和 bool 参数因限速被丢弃。
+        """
+        reserve = min(_count(self.parts | self.keepalive_parts), max(self.max_rate - count, 0))
+        if not self._take(count, now, reserve):
+            self.rate_limited += count
+            return False
+        self.sent += count
+        return True
+
+    def deactivate(self):
+        """停止时发送 isHRActive=False（不受速率限制），之后的第一个样本重新完整发送"""
+        self._active = False
+        self._last_full = None
+        if self.parts & BOOL:
+            self.sent += 1
+
+    def carry_stats(self, previous: "OscSendPolicy"):
+        """累加被替换的旧策略的统计（运行中重新加载配置时调用，计数不归零）"""
+        self.samples += previous.samples
+        self.sent += previous.sent
+        self.unchanged += previous.unchanged
+        self.rate_limited += previous.rate_limited
+        self.keepalives += previous.keepalives
+
+    def summary(self) -> str:
+        """发送统计摘要"""
+        return (f"收到 {self.samples} 个样本，发送 {self.sent} 条消息，"
+                f"值未变化省略 {self.unchanged} 条，超出速率上限丢弃 {self.rate_limited} 条，保活 {self.keepalives} 次")
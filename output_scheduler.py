@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+插值输出调度器 - 在两个真实样本之间以固定频率发送平滑变化的 float 参数
+
+BLE 手环大约每秒通知一次，osc_float 因此按秒跳变，由心率驱动的模型效果会显得卡顿。
+开启后（osc_output_rate > 0）主目标的 float 参数不再随样本发送，而是由调度器负责：
+    - 收到新样本时，从当前输出值开始线性过渡到新值，过渡时长为最近样本间隔的平滑估计
+      （即比原先晚一个样本间隔到达新值，换取连续的变化）
+    - 过渡期间按 rate 频率发送，值不变时不发送；过渡结束后停止计时，心率不变时没有任何开销
+int 和 bool 参数仍按 osc_policy.py 的策略随样本发送。float 消息同样受 osc_max_rate 限制
+（与样本共用令牌桶），被限速的值在下一个时间点重试，过渡结束时的最终值发出后才停止计时；
+保活完整重发时最近一次发出的 float 值随 bundle 一起重发。
+
+计时使用事件循环上的单个 loop.call_at 定时器，时间点按 start + n * period 的网格计算，
+不累积回调本身的延迟；回调来迟超过一个周期时跳过错过的时间点，不会补发。
+"""
+
+import asyncio
+from typing import Optional
+
+# 样本间隔估计：指数平滑系数和上下限（秒）
+_INTERVAL_ALPHA = 0.3
+_INTERVAL_MAX = 3.0
+
+
+class OutputScheduler:
+    """float 参数的插值输出（必须在引擎事件循环线程中使用）"""
+
+    def __init__(self, fanout, rate: float, loop: asyncio.AbstractEventLoop = None):
+        """
+        Args:
+            fanout: OscFanout，通过 send_float() 发送
+            rate: 发送频率（Hz）
+            loop: 事件循环，默认当前运行的事件循环
+        """
+        self.fanout = fanout
+        self.rate = rate
+        self.period = 1.0 / rate
+        self._loop = loop or asyncio.get_running_loop()
+
+        # 统计
+        self.ticks = 0
+        self.sent = 0
+        self.max_late = 0.0         # 定时回调最大的延迟（秒）
+        self.skipped = 0            # 回调来迟而跳过的时间点
+        self.rate_limited = 0       # 超出 osc_max_rate 而未发送的消息
+
+        self.interval = 1.0         # 样本间隔估计
+        self._last_update: Optional[float] = None
+        self._from = 0.0
+        self._to = 0.0
+        self._ramp_start = 0.0
+        self._ramp_end = 0.0
+        self._last_value: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._next = 0.0
+
+    def value(self, now: float) -> float:
+        """now 时刻的输出值"""
+        if now >= self._ramp_end:
+            return self._to
+        progress = (now - self._ramp_start) / (self._ramp_end - self._ramp_start)
+        return self._from + (self._to - self._from) * progress
+
+    def update(self, value: float):
+        """收到一个新的 float 值（真实样本）"""
+        now = self._loop.time()
+        if self._last_update is None:
+            # 第一个样本直接输出
+            self._from = self._to = value
+            self._ramp_start = self._ramp_end = now
+        else:
+            gap = min(now - self._last_update, _INTERVAL_MAX)
+            self.interval += _INTERVAL_ALPHA * (gap - self.interval)
+            self._from = self.value(now)
+            self._to = value
+            self._ramp_start = now
+            self._ramp_end = now + max(self.interval, self.period)
+        self._last_update = now
+        if self._handle is None:
+            self._next = now
+            self._tick()
+
+    def _send(self, value: float):
+        if value == self._last_value:
+            return
+        if self.fanout.send_float(value):
+            self._last_value = value
+            self.sent += 1
+        else:
+            self.rate_limited += 1
+
+    def _tick(self):
+        now = self._loop.time()
+        late = now - self._next
+        if late > self.max_late:
+            self.max_late = late
+        self.ticks += 1
+        self._send(self.value(now))
+
+        if now >= self._ramp_end and self._last_value == self._to:
+            self._handle = None
+            return
+        # 按网格计算下一个时间点，来迟超过一个周期时跳过错过的点
+        self._next += self.period
+        if self._next <= now:
+            missed = int((now - self._next) / self.period) + 1
+            self.skipped += missed
+            self._next += missed * self.period
+        self._handle = self._loop.call_at(self._next, self._tick)
+
+    def stop(self):
+        """取消定时器"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def summary(self) -> str:
+        """统计摘要"""
+        return (f"{self.rate:g} Hz，定时回调 {self.ticks} 次，发送 {self.sent} 条，超出速率上限 {self.rate_limited} 条，"
+                f"跳过 {self.skipped} 个时间点，最大延迟 {self.max_late * 1000:.1f} ms")
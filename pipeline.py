@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+样本分发管道 - 数据源 -> 引擎 -> 各个输出端
+
+每个可能阻塞的输出端（rate.txt 写入、会话记录）是一个 SinkQueue：有界队列 + 独立的工作线程。
+引擎事件循环中的 put() 只做一次入队（加锁后追加到 deque），从不等待输出端，
+磁盘卡顿等情况只会让该输出端的队列变长、按溢出策略丢弃，不会拖慢数据源和其他输出端。
+
+溢出策略（队列已满时）:
+    - DROP_OLDEST: 丢弃最早的一项，保留最新的 maxsize 项（会话记录）
+    - DROP_NEWEST: 丢弃新到的一项
+    - KEEP_LATEST: 只保留最新的一项（队列长度固定为 1，rate.txt 这类只关心当前值的输出端）
+
+OSC 发送和界面刷新不经过队列，在事件循环中直接执行:
+    - OSC 使用非阻塞 UDP 套接字，sendto 不会等待，缓冲区满时立即失败并计入目标的错误数；
+      它也是延迟最敏感的一步，多一次线程切换只会增加延迟
+    - 界面通过 latest_value.LatestValueSlot 读取，本身就是只保留最新值的无锁槽
+
+每个输出端的队列长度、最大长度、已处理数、丢弃数和错误数由 Pipeline.stats() 汇总，
+显示在停止时的状态信息和指标端点中。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List, NamedTuple
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+KEEP_LATEST = 'keep_latest'
+
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, KEEP_LATEST)
+
+
+class SinkStats(NamedTuple):
+    """一个输出端的队列统计"""
+    name: str
+    depth: int          # 当前排队数
+    max_depth: int      # 启动以来的最大排队数
+    delivered: int      # 已交给输出端处理的项数
+    dropped: int        # 因队列已满丢弃的项数
+    errors: int         # 处理时出现的异常数
+
+
+class SinkQueue:
+    """
+    有界队列 + 工作线程，子类实现 handle() 或 handle_batch()
+
+    put() 可在任意线程调用且不阻塞；工作线程每次取出队列中的全部项，交给 handle_batch()。
+    设置 min_interval 时两批之间至少间隔这么多秒，期间到达的项留在队列中（按溢出策略合并），
+    适合限速写文件或按间隔批量写入；队列过半时不再等待间隔。
+    """
+
+    # 为 False 时 Pipeline 也会分发非主数据源设备的样本
+    primary_only = True
+
+    def __init__(self, name: str, maxsize: int = 256, overflow: str = DROP_OLDEST, min_interval: float = 0.0):
+        """
+        Args:
+            name: 输出端名称，用于统计
+            maxsize: 队列最大长度，KEEP_LATEST 时固定为 1
+            overflow: 溢出策略，DROP_OLDEST / DROP_NEWEST / KEEP_LATEST
+            min_interval: 两批之间的最小间隔（秒），0 为不限
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略: {overflow}")
+        self.name = name
+        self.maxsize = 1 if overflow == KEEP_LATEST else max(1, maxsize)
+        self.overflow = overflow
+        self.min_interval = min_interval
+        # 队列达到这个长度时不再等待 min_interval（KEEP_LATEST 的队列长度为 1，总是限速）
+        self._flush_depth = max(1, self.maxsize // 2) if overflow != KEEP_LATEST else 2
+
+        # 统计信息
+        self.max_depth = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._running = False
+        self._thread = None
+        self._last_batch = 0.0
+
+    def start(self):
+        """启动工作线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"Sink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, item) -> bool:
+        """加入一项（不阻塞），返回是否入队"""
+        with self._cond:
+            queue = self._queue
+            depth = len(queue)
+            if depth >= self.maxsize:
+                self.dropped += 1
+                if self.overflow == DROP_NEWEST:
+                    return False
+                queue.popleft()
+                depth -= 1
+            queue.append(item)
+            if depth >= self.max_depth:
+                self.max_depth = depth + 1
+            if not depth or depth + 1 == self._flush_depth:
+                # 工作线程只在队列为空时等待新数据；限速等待中的线程只在队列过半时唤醒
+                self._cond.notify()
+        return True
+
+    def stop(self, timeout: float = 2.0):
+        """停止工作线程，队列中剩余的项在退出前处理（不受 min_interval 限制）"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+            if thread.is_alive():
+                return
+            self._thread = None
+        # 未启动过工作线程时在当前线程处理剩余项
+        with self._cond:
+            items = list(self._queue)
+            self._queue.clear()
+        if items:
+            self._deliver(items)
+
+    def stats(self) -> SinkStats:
+        return SinkStats(self.name, len(self._queue), self.max_depth, self.delivered, self.dropped, self.errors)
+
+    def handle(self, item):
+        """处理一项（在工作线程中调用）"""
+        raise NotImplementedError
+
+    def handle_batch(self, items: list):
+        """处理一批（在工作线程中调用），默认逐项调用 handle()"""
+        for item in items:
+            self.handle(item)
+
+    def _deliver(self, items: list):
+        try:
+            self.handle_batch(items)
+        except Exception:
+            # 输出端自身的错误不能让工作线程退出，否则队列会一直积压到丢弃
+            self.errors += 1
+        self.delivered += len(items)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+
+                # 限速：未到间隔时等待，期间到达的项按溢出策略留在队列中；
+                # 队列过半（例如不限速回放）时立即处理，避免丢弃
+                delay = self._last_batch + self.min_interval - time.monotonic()
+                if delay > 0 and self._running and len(self._queue) < self._flush_depth:
+                    self._cond.wait(delay)
+                    continue
+
+                items = list(self._queue)
+                self._queue.clear()
+                running = self._running
+
+            self._last_batch = time.monotonic()
+            self._deliver(items)
+            if not running:
+                return
+
+
+class Pipeline:
+    """把引擎的样本分发到各个 SinkQueue"""
+
+    def __init__(self):
+        self.sinks: List[SinkQueue] = []
+
+    def add(self, sink: SinkQueue) -> SinkQueue:
+        """加入并启动一个输出端"""
+        sink.start()
+        self.sinks = self.sinks + [sink]
+        return sink
+
+    def remove(self, sink: SinkQueue, timeout: float = 2.0):
+        """
+        移除并停止一个输出端
+
+        Args:
+            sink: 要移除的输出端
+            timeout: 等待剩余的项处理完的最长秒数；为 0 时不等待，工作线程处理完后自行退出
+        """
+        # 整体替换列表，publish() 遍历中的旧列表不受影响
+        self.sinks = [s for s in self.sinks if s is not sink]
+        sink.stop(timeout)
+
+    def publish(self, sample):
+        """分发一个样本（engine.Sample）；非主数据源的样本只交给 primary_only 为 False 的输出端"""
+        primary = sample.primary
+        for sink in self.sinks:
+            if primary or not sink.primary_only:
+                sink.put(sample)
+
+    def stop(self) -> List[SinkStats]:
+        """停止并移除全部输出端，返回处理完剩余项后的统计"""
+        sinks, self.sinks = self.sinks, []
+        for sink in sinks:
+            sink.stop()
+        return [sink.stats() for sink in sinks]
+
+    def stats(self) -> List[SinkStats]:
+        return [sink.stats() for sink in self.sinks]
+
+
+def format_sink_stats(stats: SinkStats) -> str:
+    """一个输出端的统计文本"""
+    return (f"{stats.name}: 已处理 {stats.delivered}，丢弃 {stats.dropped}，"
+            f"最大排队 {stats.max_depth}，错误 {stats.errors}")
@@ -1,31 +1,66 @@
 # -*- coding: utf-8 -*-
 """
-Pulsoid Worker - 通过 WebSocket 从 Pulsoid/Stromno 获取心率数据
+Pulsoid 数据源 - 通过 WebSocket 从 Pulsoid/Stromno 获取心率数据
 
-该模块提供与 HeartRateWorker 相同的信号接口，便于在 GUI 中无缝切换数据源。
+PulsoidSource 与 BleSource 一样运行在引擎的 asyncio 事件循环中，不依赖 PyQt5。
+Widget 对应的 WebSocket 地址缓存在 pulsoid_cache.json 中，启动和重连时不必每次调用 Stromno RPC。
+地址失效时重新解析：WebSocket 握手被拒绝（4xx）、缓存的地址无法连接（连接被拒绝、DNS 失败、握手超时等），
+或者刚解析的地址连续 RESOLVE_AFTER_FAILURES 次无法连接。
+连接关闭后立即重连，之后的失败按带抖动的指数退避重试（见 reconnect.py）。
+
+WebSocket 使用 websockets 库的 asyncio 客户端，与 BLE 数据源共用引擎的事件循环，不需要额外的线程；
+连接存活由 ping/pong 心跳检测，停止时取消任务即可关闭连接。
+阻塞的 RPC 请求在不被等待的守护线程中执行（见 _run_detached），停止时不必等它超时。
 """
 
+import asyncio
 import json
+import os
+import threading
 import time
-import requests
-import websocket
-from pythonosc.udp_client import SimpleUDPClient
-from PyQt5.QtCore import QThread, pyqtSignal
+
+from reconnect import Backoff, SessionMetrics, format_outage
+
+# requests / websockets 仅在使用 Pulsoid 时才需要，在用到时再导入
+
+# WebSocket 握手超时、心跳间隔、心跳超时和关闭超时（秒）
+OPEN_TIMEOUT = 10.0
+PING_INTERVAL = 10.0
+PING_TIMEOUT = 10.0
+CLOSE_TIMEOUT = 1.0
+
+# Stromno RPC 请求超时（秒）
+RPC_TIMEOUT = 5.0
+
+STROMNO_RPC_URL = 'https://api.stromno.com/v1/api/public/rpc'
+
+# WebSocket 地址缓存文件及有效期（秒）
+URL_CACHE_FILE = "pulsoid_cache.json"
+URL_CACHE_TTL = 24 * 3600
+
+# 刚从 RPC 解析的地址连续这么多次无法连接时重新解析（缓存的地址第一次无法连接就重新解析）
+RESOLVE_AFTER_FAILURES = 3
 
 
-def get_websocket_url(widget_id: str) -> str:
+def get_websocket_url(widget_id: str, rpc_url: str = STROMNO_RPC_URL, session=None) -> str:
     """
     调用 Stromno API 获取 WebSocket URL
     
     Args:
         widget_id: Pulsoid Widget ID
+        rpc_url: RPC 地址，测试时可指向本地替身服务
+        session: requests.Session，传入时复用其连接池
         
     Returns:
         WebSocket URL，失败返回空字符串
     """
+    if session is None:
+        import requests
+        session = requests
+    
     try:
-        response = requests.post(
-            'https://api.stromno.com/v1/api/public/rpc',
+        response = session.post(
+            rpc_url,
             headers={'Content-Type': 'application/json'},
             json={
                 'id': str(int(time.time() * 1000)),
@@ -33,7 +68,7 @@ def get_websocket_url(widget_id: str) -> str:
                 'method': 'getWidget',
                 'params': {'widgetId': widget_id}
             },
-            timeout=10
+            timeout=RPC_TIMEOUT
         )
         
         if response.status_code != 200:
@@ -49,137 +84,273 @@ def get_websocket_url(widget_id: str) -> str:
         return ''
 
 
-class PulsoidWorker(QThread):
-    """Pulsoid 心率数据获取工作线程"""
+async def _run_detached(func, *args):
+    """
+    在单独的守护线程中执行阻塞调用并等待结果
+
+    与 asyncio.to_thread 不同，线程不属于事件循环的默认线程池：任务被取消时立即返回，
+    asyncio.run() 退出时也不会等待仍在进行的调用，其结果直接丢弃。
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(result, error):
+        if future.done():
+            return  # 等待的任务已被取消
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        result = error = None
+        try:
+            result = func(*args)
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(deliver, result, error)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+    threading.Thread(target=target, name="PulsoidRpc", daemon=True).start()
+    return await future
+
+
+class WidgetUrlResolver:
+    """
+    Widget ID -> WebSocket 地址，带磁盘缓存
     
-    # 与 HeartRateWorker 相同的信号接口
-    status_update = pyqtSignal(str)
-    heart_rate_update = pyqtSignal(int, float)
-    connection_status = pyqtSignal(bool)
-    device_found = pyqtSignal(str)
+    缓存未过期时直接使用，不访问 RPC；地址无法使用时由调用方 invalidate() 后重新解析。
+    from_cache 表示上一次 resolve() 返回的是否为缓存的地址。
+    RPC 请求通过同一个 requests.Session 发出，重新解析时复用已建立的 HTTPS 连接。
+    resolve() 是阻塞调用，在事件循环中应通过 _run_detached 调用；调用 close() 时如果
+    RPC 请求仍在其他线程中进行，由该线程在请求返回后关闭连接池（Session 不能在请求中途从其他线程关闭）。
+    """
     
-    def __init__(self, config):
-        super().__init__()
-        self.config = config
-        self.running = False
-        self.ws = None
-        
-        # 从配置中读取参数
-        self.osc_ip = config.get('DATABASE', 'osc_ip')
-        self.osc_port = config.getint('DATABASE', 'osc_port')
-        self.osc_int = config.get('DATABASE', 'osc_int')
-        self.osc_float = config.get('DATABASE', 'osc_float')
-        self.osc_bool = config.get('DATABASE', 'osc_bool')
-        self.hr_min = config.getint('DATABASE', 'hr_min')
-        self.hr_max = config.getint('DATABASE', 'hr_max')
-        self.widget_id = config.get('DATABASE', 'pulsoid_widget_id', fallback='')
-        self.obs_mode = config.getint('DATABASE', 'obs_mode')
-        
-        # 初始化 OSC 客户端
-        self.osc_client = SimpleUDPClient(self.osc_ip, self.osc_port)
+    def __init__(self, rpc_url: str = STROMNO_RPC_URL, cache_path: str = URL_CACHE_FILE,
+                 ttl: float = URL_CACHE_TTL):
+        self.rpc_url = rpc_url or STROMNO_RPC_URL
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._session = None
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._close_pending = False
+        self.rpc_calls = 0
+        self.from_cache = False
+    
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self, cache: dict):
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+    
+    def cached(self, widget_id: str) -> str:
+        """未过期的缓存地址，没有时返回空字符串"""
+        entry = self._load().get(widget_id)
+        try:
+            if time.time() - float(entry['resolved_at']) <= self.ttl:
+                return str(entry['url'])
+        except (TypeError, KeyError, ValueError):
+            pass
+        return ''
+    
+    def resolve(self, widget_id: str) -> str:
+        """返回 WebSocket 地址：优先使用缓存，否则调用 RPC 并写入缓存；失败返回空字符串"""
+        url = self.cached(widget_id)
+        self.from_cache = bool(url)
+        if url:
+            return url
         
-        # 心率超时检测
-        self.last_heartrate_time = 0
-        self.timeout_seconds = 10
-    
-    def stop(self):
-        """停止工作线程"""
-        self.running = False
-        if self.ws:
-            try:
-                self.ws.close()
-            except:
-                pass
-    
-    def send_osc(self, heart_rate: int) -> str:
-        """发送 OSC 数据"""
-        percent_f = min(heart_rate / self.hr_max, 1.0)
-        self.osc_client.send_message(self.osc_bool, True)
-        self.osc_client.send_message(self.osc_int, heart_rate)
-        self.osc_client.send_message(self.osc_float, percent_f)
-        return f"心率整数值: {heart_rate}; 心率浮点值: {percent_f:.2f}"
-    
-    def on_message(self, ws, message: str):
-        """处理 WebSocket 消息"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            session = self._session
+            self._in_use += 1
+        self.rpc_calls += 1
+        try:
+            url = get_websocket_url(widget_id, self.rpc_url, session)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if self._close_pending and not self._in_use:
+                    self._close_session()
+        if url:
+            cache = self._load()
+            cache[widget_id] = {'url': url, 'resolved_at': time.time()}
+            self._save(cache)
+        return url
+    
+    def invalidate(self, widget_id: str):
+        """删除 widget_id 的缓存地址（地址无法使用时调用）"""
+        cache = self._load()
+        if cache.pop(widget_id, None) is not None:
+            self._save(cache)
+    
+    def close(self):
+        """关闭 HTTP 连接池；RPC 请求进行中时推迟到请求返回后关闭"""
+        with self._lock:
+            if self._in_use:
+                self._close_pending = True
+            else:
+                self._close_session()
+    
+    def _close_session(self):
+        """（持有 _lock 时调用）"""
+        self._close_pending = False
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class PulsoidSource:
+    """Pulsoid 心率数据源"""
+    
+    name = 'pulsoid'
+    
+    def __init__(self, widget_id: str, resolver: WidgetUrlResolver = None):
+        self.widget_id = widget_id
+        self.resolver = resolver or WidgetUrlResolver()
+        self.engine = None
+        self.ws = None
+        self._rejected = False
+        self._opened = False
+
+        self.backoff = Backoff()
+        self.session = SessionMetrics()
+    
+    @property
+    def sessions(self):
+        """与 BleSource.sessions 相同的断开统计接口"""
+        return {'pulsoid': self.session}
+    
+    def handle_message(self, message: str):
+        """处理一条 WebSocket 消息"""
+        received = time.perf_counter() if self.engine.tracer else 0.0
+        if self.engine.capture:
+            self.engine.capture.record_ws(message)
         try:
             data = json.loads(message)
             heart_rate = data.get('data', {}).get('heartRate', 0)
             
             if heart_rate > 0:
-                self.last_heartrate_time = time.time()
-                vrc_status = self.send_osc(heart_rate)
-                
-                # 发送信号更新 UI
-                percent_f = min(heart_rate / self.hr_max, 1.0)
-                self.heart_rate_update.emit(heart_rate, percent_f)
-                
-                status_text = f"Pulsoid 实时心率 -> {vrc_status}"
-                if self.obs_mode == 1:
-                    status_text += ", 正在输出 txt."
-                    with open("rate.txt", "w", encoding="utf-8") as f:
-                        f.write(f"{heart_rate}")
-                
-                self.status_update.emit(status_text)
+                outage = self.session.sample(time.monotonic())
+                if outage:
+                    self.engine.status(format_outage("Pulsoid", outage))
+                self.backoff.reset()
+                self.engine.submit(heart_rate, received=received)
         except Exception as e:
-            self.status_update.emit(f"解析心率数据失败: {e}")
-    
-    def on_error(self, ws, error):
-        """处理 WebSocket 错误"""
-        self.status_update.emit(f"WebSocket 错误: {error}")
-        self.connection_status.emit(False)
-    
-    def on_close(self, ws, close_status_code, close_msg):
-        """处理 WebSocket 关闭"""
-        self.status_update.emit("WebSocket 连接已关闭")
-        self.connection_status.emit(False)
-    
-    def on_open(self, ws):
-        """处理 WebSocket 打开"""
-        self.status_update.emit("Pulsoid WebSocket 连接成功！正在监听心率...")
-        self.device_found.emit(f"Pulsoid (Widget: {self.widget_id[:8]}...)")
-        self.connection_status.emit(True)
-    
-    def run(self):
-        """线程运行函数"""
-        self.running = True
+            self.engine.status(f"解析心率数据失败: {e}")
+    
+    def handle_open(self):
+        """WebSocket 已连接"""
+        self.session.connected(time.monotonic())
+        self.engine.status("Pulsoid WebSocket 连接成功！正在监听心率...")
+        self.engine.device_found(f"Pulsoid (Widget: {self.widget_id[:8]}...)")
+        self.engine.set_connected(True)
+    
+    async def run(self, engine):
+        """获取 WebSocket 地址并保持连接，断开后自动重连"""
+        self.engine = engine
         
         if not self.widget_id:
-            self.status_update.emit("错误：未配置 Pulsoid Widget ID")
-            self.connection_status.emit(False)
-            return
-        
-        self.status_update.emit(f"正在获取 Pulsoid WebSocket 地址...")
-        
-        ws_url = get_websocket_url(self.widget_id)
-        if not ws_url:
-            self.status_update.emit("错误：无法获取 WebSocket URL，请检查 Widget ID 是否正确")
-            self.connection_status.emit(False)
+            engine.status("错误：未配置 Pulsoid Widget ID")
+            engine.set_connected(False)
             return
         
-        self.status_update.emit(f"正在连接 Pulsoid WebSocket...")
-        
-        while self.running:
-            try:
-                self.ws = websocket.WebSocketApp(
-                    ws_url,
-                    on_open=self.on_open,
-                    on_message=self.on_message,
-                    on_error=self.on_error,
-                    on_close=self.on_close
-                )
+        ws_url = ''
+        from_cache = False
+        failures = 0            # 当前地址连续无法连接的次数
+        try:
+            while engine.running:
+                if not ws_url:
+                    engine.status("正在获取 Pulsoid WebSocket 地址...")
+                    ws_url = await _run_detached(self.resolver.resolve, self.widget_id)
+                    if not ws_url:
+                        # RPC 暂时不可用时不放弃，按退避间隔重试
+                        delay = max(self.backoff.next_delay(), 1.0)
+                        engine.status(f"错误：无法获取 WebSocket URL，请检查 Widget ID 是否正确（{delay:.1f}秒后重试）")
+                        engine.set_connected(False)
+                        await asyncio.sleep(delay)
+                        continue
+                    from_cache = self.resolver.from_cache
+                    failures = 0
+                    engine.status("正在连接 Pulsoid WebSocket...")
                 
-                # 运行 WebSocket（阻塞）
-                self.ws.run_forever()
+                self._rejected = False
+                self._opened = False
+                await self._connect_once(ws_url)
+                failures = 0 if self._opened else failures + 1
+                if self._rejected:
+                    reason = "WebSocket 地址已失效"
+                elif failures and from_cache:
+                    # 缓存的地址可能早已失效（连接被拒绝、域名无法解析等不会返回 4xx）
+                    reason = "缓存的 WebSocket 地址无法连接"
+                elif failures >= RESOLVE_AFTER_FAILURES:
+                    reason = f"WebSocket 地址连续 {failures} 次无法连接"
+                else:
+                    reason = ''
+                if reason:
+                    # 删除缓存，下次循环重新调用 RPC
+                    engine.status(f"{reason}，将重新获取")
+                    await asyncio.to_thread(self.resolver.invalidate, self.widget_id)
+                    ws_url = ''
                 
-                if self.running:
-                    self.status_update.emit("连接断开，5秒后重试...")
-                    time.sleep(5)
-                    
-            except Exception as e:
-                self.status_update.emit(f"连接异常: {e}")
-                if self.running:
-                    time.sleep(5)
+                delay = self.backoff.next_delay()
+                if engine.running:
+                    engine.status(f"连接断开，{delay:.1f}秒后重试..." if delay else "连接断开，正在重新连接...")
+                    await asyncio.sleep(delay)
+        finally:
+            self.resolver.close()
+            summary = self.session.summary()
+            if summary:
+                engine.status(f"Pulsoid 本次会话：{summary}")
+    
+    async def _connect_once(self, ws_url: str):
+        """
+        建立一次 WebSocket 连接并接收消息，直到连接关闭
         
-        # 线程结束时发送断开信号
-        self.osc_client.send_message(self.osc_bool, False)
-        self.status_update.emit("Pulsoid 心率监测已停止")
+        引擎停止时任务被取消，async with 退出时发送关闭帧并最多等待 CLOSE_TIMEOUT 秒，
+        不需要另外关闭套接字。
+        """
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed, InvalidStatus
+        
+        engine = self.engine
+        self.session.attempt()
+        try:
+            async with connect(ws_url, open_timeout=OPEN_TIMEOUT, ping_interval=PING_INTERVAL,
+                               ping_timeout=PING_TIMEOUT, close_timeout=CLOSE_TIMEOUT) as ws:
+                self.ws = ws
+                self._opened = True
+                self.handle_open()
+                async for message in ws:
+                    self.handle_message(message)
+            engine.status("WebSocket 连接已关闭")
+        except InvalidStatus as e:
+            # 握手返回 4xx 说明地址已失效，需要重新解析
+            status_code = e.response.status_code
+            self._rejected = 400 <= status_code < 500
+            engine.status(f"WebSocket 连接被拒绝: HTTP {status_code}")
+        except ConnectionClosed as e:
+            # 包括心跳超时（ping_timeout 内没有收到 pong）
+            engine.status(f"WebSocket 连接异常断开: {e}")
+        except Exception as e:
+            engine.status(f"连接异常: {e}")
+        finally:
+            self.ws = None
+        engine.set_connected(False)
+        self.session.disconnected(time.monotonic())
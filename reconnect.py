@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+重连策略与连接会话统计，BLE 和 Pulsoid 数据源共用
+
+Backoff: 断开后第一次立即重连，之后的失败按指数退避并加入随机抖动，
+         避免多个设备（或多台电脑）在同一时刻一起重试；收到心率样本后重置。
+
+SessionMetrics: 记录每次断开的影响
+    - 心率中断时长：断开前最后一个样本到恢复后第一个样本
+    - 重连尝试次数
+    - 恢复用时：检测到断开到重新连接成功
+"""
+
+import random
+from typing import List, NamedTuple, Optional
+
+
+class Backoff:
+    """带抖动的指数退避"""
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30.0, factor: float = 2.0,
+                 jitter: float = 0.5, rng: Optional[random.Random] = None):
+        """
+        Args:
+            initial: 第二次重试前的等待时间（秒）
+            maximum: 等待时间上限（秒）
+            factor: 每次失败后等待时间的倍数
+            jitter: 随机缩短的最大比例，0.5 表示实际等待时间在 [50%, 100%] 之间
+            rng: 随机数生成器，默认 random 模块
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self._random = (rng or random).random
+        self.failures = 0
+
+    def next_delay(self) -> float:
+        """返回下一次重连前应等待的秒数"""
+        n = self.failures
+        self.failures += 1
+        if n == 0:
+            return 0.0
+        delay = min(self.maximum, self.initial * self.factor ** (n - 1))
+        return delay * (1 - self.jitter * self._random())
+
+    def reset(self):
+        """连接恢复正常后重置"""
+        self.failures = 0
+
+
+class Outage(NamedTuple):
+    """一次断开的统计"""
+    gap: float              # 心率中断时长（秒）
+    attempts: int           # 重连尝试次数
+    time_to_recover: float  # 检测到断开到重新连接成功（秒）
+
+
+class SessionMetrics:
+    """一个连接会话中所有断开的统计（时间均为 time.monotonic()）"""
+
+    def __init__(self):
+        self.outages: List[Outage] = []
+        self.reconnects = 0         # 重连尝试总次数
+        self._ever_connected = False
+        self._last_sample: Optional[float] = None
+        self._down_since: Optional[float] = None
+        self._recovered_at: Optional[float] = None
+        self._attempts = 0
+
+    @property
+    def down(self) -> bool:
+        """是否处于断开后尚未恢复的状态"""
+        return self._down_since is not None
+
+    def disconnected(self, now: float):
+        """检测到断开（首次连接成功之前的失败不计入）"""
+        if not self._ever_connected:
+            return
+        if self._down_since is None:
+            self._down_since = now
+            self._attempts = 0
+        # 重连成功后还没收到样本就再次断开，仍算同一次中断
+        self._recovered_at = None
+
+    def attempt(self):
+        """开始一次重连尝试"""
+        if self._down_since is not None:
+            self._attempts += 1
+            self.reconnects += 1
+
+    def connected(self, now: float):
+        """连接成功"""
+        self._ever_connected = True
+        if self._down_since is not None and self._recovered_at is None:
+            self._recovered_at = now
+
+    def sample(self, now: float) -> Optional[Outage]:
+        """收到一个样本；如果这是断开恢复后的第一个样本，返回这次断开的统计"""
+        outage = None
+        if self._recovered_at is not None:
+            gap_start = self._last_sample if self._last_sample is not None else self._down_since
+            outage = Outage(now - gap_start, self._attempts, self._recovered_at - self._down_since)
+            self.outages.append(outage)
+            self._down_since = None
+            self._recovered_at = None
+            self._attempts = 0
+        self._last_sample = now
+        return outage
+
+    def summary(self) -> str:
+        """会话统计摘要，没有发生断开时返回空字符串"""
+        if not self.outages:
+            return ''
+        gaps = [o.gap for o in self.outages]
+        recover = sum(o.time_to_recover for o in self.outages) / len(self.outages)
+        attempts = sum(o.attempts for o in self.outages)
+        return (f"断开 {len(self.outages)} 次，心率累计中断 {sum(gaps):.1f} 秒（最长 {max(gaps):.1f} 秒），"
+                f"平均恢复用时 {recover:.1f} 秒，共重连 {attempts} 次")
+
+
+def format_outage(name: str, outage: Outage) -> str:
+    """单次断开恢复后的状态消息"""
+    return (f"{name} 已恢复：心率中断 {outage.gap:.1f} 秒，重连 {outage.attempts} 次，"
+            f"断开到重新连接 {outage.time_to_recover:.1f} 秒")
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+心率会话记录 - 把每次监测的全部样本写入紧凑的二进制文件，供直播后分析
+
+文件格式（小端序）:
+    - 文件头，固定 HEADER_SIZE 字节:
+        魔数 b"HRSESS\\0\\0"、版本 (UINT16)、记录长度 (UINT16)、文件头长度 (UINT32)、
+        开始时间 (FLOAT64, Unix 时间戳)，之后是 UTF-8 JSON 的数据源名称表，其余补 0
+    - 记录，每条固定 RECORD_SIZE = 20 字节，只追加:
+        t        FLOAT64  相对开始时间的秒数（单调时钟）
+        hr       UINT16   心率
+        source   UINT8    数据源编号，即名称表中的下标（多设备时每个设备一个）
+        flags    UINT8    bit0-2: RR 间期个数，bit7: 主数据源
+        rr[4]    UINT16   RR 间期，单位 1/1024 秒，超过 4 个时只保存前 4 个
+
+10 小时 1 Hz 的会话约 700 KB。出现新的数据源时只原地改写文件头中的名称表。
+
+SessionRecorder 是引擎样本管道（pipeline.py）的一个输出端：事件循环中每个样本只入队，
+由后台线程每 flush_interval 秒打包并写入一次文件，文件读写不会阻塞回调；
+写入长时间卡住时队列最多保留 MAX_PENDING 个样本，丢弃最早的。
+写入失败（磁盘已满等）时文件截断回这一批之前，不会留下不完整的记录让之后的记录错位。
+
+SessionLog 用 numpy.memmap 映射文件（需要安装 numpy），统计直接在数组上向量化计算；
+文件末尾因异常退出而不完整的记录会被忽略。命令行用法:
+
+    python session_log.py sessions/20240101-200000.hrs [--csv 输出.csv] [--hr-max 190]
+"""
+
+import csv
+import json
+import os
+import struct
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:  # 只有读取分析需要 numpy，记录不依赖
+    np = None
+
+from pipeline import DROP_OLDEST, SinkQueue
+
+MAGIC = b"HRSESS\x00\x00"
+VERSION = 1
+HEADER_SIZE = 4096
+MAX_RR = 4
+MAX_SOURCES = 255           # 编号 255 保留给超出名称表的数据源
+SESSION_SUFFIX = ".hrs"
+
+FLAG_PRIMARY = 0x80
+RR_COUNT_MASK = 0x07
+
+_HEADER = struct.Struct("<8sHHId")
+_RECORD = struct.Struct("<dHBB4H")
+RECORD_SIZE = _RECORD.size
+_NO_RR = (0,) * MAX_RR
+
+# 尚未写入文件的最大样本数（1 Hz、4 个设备时约 4 小时）
+MAX_PENDING = 65536
+
+# 心率区间默认按最高心率的 50/60/70/80/90% 划分
+DEFAULT_ZONES = (0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def session_path(directory: str, started: datetime = None) -> str:
+    """会话文件路径：<目录>/<开始时间>.hrs"""
+    started = started or datetime.now()
+    return os.path.join(directory, started.strftime("%Y%m%d-%H%M%S") + SESSION_SUFFIX)
+
+
+def _pack_header(started: float, names: List[str]) -> bytes:
+    table = json.dumps({'sources': names}, ensure_ascii=False).encode("utf-8")
+    header = _HEADER.pack(MAGIC, VERSION, RECORD_SIZE, HEADER_SIZE, started) + table
+    if len(header) > HEADER_SIZE:
+        raise ValueError("数据源名称表超出文件头长度")
+    return header + b"\x00" * (HEADER_SIZE - len(header))
+
+
+class _Entry(NamedTuple):
+    """record() 提交的一条记录，字段与 engine.Sample 中用到的一致"""
+    timestamp: float
+    heart_rate: int
+    rr_intervals: tuple
+    device: str
+    source: str
+    primary: bool
+
+
+class SessionRecorder(SinkQueue):
+    """会话记录写入器（引擎样本管道的输出端，put / record 在引擎事件循环线程中调用）"""
+
+    primary_only = False
+
+    def __init__(self, path: str, flush_interval: float = 1.0, clock=time.monotonic,
+                 maxsize: int = MAX_PENDING):
+        """
+        Args:
+            path: 会话文件路径，所在目录不存在时自动创建
+            flush_interval: 写入文件的间隔（秒）
+            clock: 单调时钟，默认 time.monotonic，与 engine.Sample.timestamp 一致（生成测试数据时可替换）
+            maxsize: 尚未写入的最大样本数，文件写入长时间卡住时丢弃最早的样本
+        """
+        super().__init__("recorder", maxsize, DROP_OLDEST, flush_interval)
+        self.path = path
+        self.started = time.time()
+        self._clock = clock
+        self._start = clock()
+
+        # 统计信息（已写入文件的记录数，errors 继承自 SinkQueue）
+        self.records = 0
+
+        self._ids = {}
+        self._names: List[str] = []
+        self._header_dirty = False
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 每批记录已在内存中打包好，不经过缓冲直接写入，写入失败时能准确截断
+        self._file = open(path, "wb", buffering=0)
+        self._write(_pack_header(self.started, self._names))
+
+    def _source_id(self, source: str) -> int:
+        source_id = self._ids.get(source)
+        if source_id is None:
+            if len(self._names) >= MAX_SOURCES:
+                return MAX_SOURCES
+            source_id = self._ids[source] = len(self._names)
+            self._names.append(source)
+            self._header_dirty = True
+        return source_id
+
+    def record(self, heart_rate: int, rr_intervals=(), source: str = '', primary: bool = True):
+        """记录一个样本（只加入队列，由写入线程打包写入）"""
+        self.put(_Entry(self._clock(), heart_rate, rr_intervals, source, '', primary))
+
+    def stop(self, timeout: float = 2.0):
+        """停止写入线程，写出队列中剩余的记录并关闭文件"""
+        super().stop(timeout)
+        if self._thread is None and not self._file.closed:
+            self._file.close()
+
+    close = stop
+
+    def _write(self, data):
+        """写入全部数据（无缓冲的文件可能只写入一部分）"""
+        view = memoryview(data)
+        while view:
+            view = view[self._file.write(view):]
+
+    def handle_batch(self, items: list):
+        """打包一批样本并追加到文件（在写入线程中调用）"""
+        pack = _RECORD.pack
+        start = self._start
+        data = bytearray()
+        for item in items:
+            rr = tuple(item.rr_intervals[:MAX_RR])
+            flags = len(rr) | (FLAG_PRIMARY if item.primary else 0)
+            data += pack(item.timestamp - start, min(item.heart_rate, 0xFFFF),
+                         self._source_id(item.device or item.source), flags, *(rr + _NO_RR[len(rr):]))
+        header = _pack_header(self.started, self._names) if self._header_dirty else None
+        file = self._file
+        end = file.seek(0, os.SEEK_END)
+        try:
+            if header:
+                file.seek(0)
+                self._write(header)
+                file.seek(end)
+            self._write(data)
+        except OSError:
+            # 磁盘已满等错误：丢弃这一批，不影响心率发送；截断写了一半的记录，
+            # 文件头仍标记为需要改写，下一批成功时再写入
+            self.errors += 1
+            try:
+                file.truncate(end)
+                file.seek(end)
+            except OSError:
+                pass
+            return
+        self._header_dirty = False
+        self.records += len(items)
+
+
+class SessionStats(NamedTuple):
+    """一段会话的统计"""
+    samples: int
+    duration: float     # 秒
+    minimum: int
+    maximum: int
+    mean: float
+
+
+class SessionLog:
+    """只读打开会话文件，各字段以 NumPy 数组提供"""
+
+    def __init__(self, path: str):
+        """
+        Raises:
+            RuntimeError: 没有安装 numpy
+            ValueError: 文件格式不正确
+        """
+        if np is None:
+            raise RuntimeError("读取会话记录需要安装 numpy: pip install numpy")
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(HEADER_SIZE)
+        if len(head) < _HEADER.size:
+            raise ValueError(f"{path} 不是心率会话文件")
+        magic, version, record_size, header_size, started = _HEADER.unpack_from(head)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是心率会话文件")
+        if version > VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"不支持的会话文件版本: {version}")
+        table = head[_HEADER.size:header_size].split(b"\x00", 1)[0]
+        self.sources: List[str] = json.loads(table.decode("utf-8") or "{}").get('sources', [])
+        self.started = started
+
+        count = max(0, (os.path.getsize(path) - header_size) // record_size)
+        dtype = np.dtype([('t', '<f8'), ('hr', '<u2'), ('source', 'u1'), ('flags', 'u1'),
+                          ('rr', '<u2', (MAX_RR,))])
+        if count:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=header_size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def t(self):
+        return self.records['t']
+
+    @property
+    def heart_rate(self):
+        return self.records['hr']
+
+    @property
+    def source(self):
+        return self.records['source']
+
+    @property
+    def primary(self):
+        return (self.records['flags'] & FLAG_PRIMARY) != 0
+
+    @property
+    def rr_count(self):
+        return self.records['flags'] & RR_COUNT_MASK
+
+    @property
+    def rr(self):
+        """RR 间期，形状 (N, 4)，单位 1/1024 秒，每行只有前 rr_count 个有效"""
+        return self.records['rr']
+
+    def select(self, source: Optional[str] = None):
+        """
+        选择一个数据源的记录
+
+        Args:
+            source: 数据源名称，为 None 时选择主数据源的样本（即发送到 VRChat 的心率）
+        """
+        if source is None:
+            return self.records[self.primary]
+        if source not in self.sources:
+            raise ValueError(f"会话中没有数据源: {source}")
+        return self.records[self.source == self.sources.index(source)]
+
+    def stats(self, source: Optional[str] = None) -> SessionStats:
+        """最低 / 最高 / 平均心率和时长"""
+        records = self.select(source)
+        if not len(records):
+            return SessionStats(0, 0.0, 0, 0, 0.0)
+        hr = records['hr']
+        t = records['t']
+        return SessionStats(len(records), float(t[-1] - t[0]), int(hr.min()), int(hr.max()),
+                            float(hr.mean(dtype=np.float64)))
+
+    def zone_time(self, bounds, source: Optional[str] = None, max_gap: float = 5.0):
+        """
+        各心率区间的累计时间（秒）
+
+        每个样本的时长为到下一个样本的间隔，超过 max_gap 的间隔（断开）只计 max_gap。
+
+        Args:
+            bounds: 区间边界（心率，升序），n 个边界得到 n + 1 个区间
+        """
+        records = self.select(source)
+        if len(records) < 2:
+            return np.zeros(len(bounds) + 1)
+        durations = np.minimum(np.diff(records['t']), max_gap)
+        zones = np.digitize(records['hr'][:-1], bounds)
+        return np.bincount(zones, weights=durations, minlength=len(bounds) + 1)
+
+    def export_csv(self, path: str):
+        """导出全部记录为 CSV（UTF-8 BOM，Excel 可直接打开）"""
+        names = self.sources + ['其他'] * (MAX_SOURCES + 1 - len(self.sources))
+        records = self.records
+        flags = records['flags']
+        # 先整体转换为 Python 列表，逐行访问 NumPy 标量很慢
+        columns = zip(records['t'].tolist(), records['source'].tolist(),
+                      ((flags & FLAG_PRIMARY) != 0).tolist(), records['hr'].tolist(),
+                      (flags & RR_COUNT_MASK).tolist(), (records['rr'] * (1000.0 / 1024)).tolist())
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'elapsed_s', 'source', 'primary', 'heart_rate', 'rr_ms'])
+            for t, source, primary, hr, count, rr in columns:
+                writer.writerow([
+                    datetime.fromtimestamp(self.started + t).isoformat(timespec='milliseconds'),
+                    f"{t:.3f}", names[source], int(primary), hr,
+                    " ".join(f"{x:.1f}" for x in rr[:count]),
+                ])
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="心率会话记录统计")
+    parser.add_argument("path", help="会话文件 (.hrs)")
+    parser.add_argument("--csv", help="导出 CSV 到该文件")
+    parser.add_argument("--hr-max", type=int, default=190, help="用于划分心率区间的最高心率（默认 190）")
+    args = parser.parse_args()
+
+    log = SessionLog(args.path)
+    print(f"开始时间: {datetime.fromtimestamp(log.started):%Y-%m-%d %H:%M:%S}，共 {len(log)} 条记录")
+    for name in [None] + log.sources:
+        stats = log.stats(name)
+        if stats.samples:
+            print(f"{name or '主数据源'}: {stats.samples} 个样本，时长 {_format_duration(stats.duration)}，"
+                  f"最低 {stats.minimum}，最高 {stats.maximum}，平均 {stats.mean:.1f}")
+
+    bounds = [round(args.hr_max * p) for p in DEFAULT_ZONES]
+    edges = [0] + bounds + [None]
+    for i, seconds in enumerate(log.zone_time(bounds)):
+        upper = f"{edges[i + 1] - 1}" if edges[i + 1] else ""
+        print(f"  区间 {i}（{edges[i]}-{upper}）: {_format_duration(seconds)}")
+
+    if args.csv:
+        log.export_csv(args.csv)
+        print(f"已导出 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
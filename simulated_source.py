@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+模拟数据源 - 不需要手环或 Pulsoid 账号，按固定间隔生成平滑变化的心率
+
+用于在没有设备时检查 OSC 参数和 Avatar 动画，以及冷启动基准测试。
+"""
+
+import asyncio
+import math
+import time
+
+
+class SimulatedSource:
+    """模拟心率数据源"""
+
+    name = 'simulate'
+
+    def __init__(self, interval: float = 1.0, base: int = 75, amplitude: int = 15):
+        self.interval = interval
+        self.base = base
+        self.amplitude = amplitude
+
+    async def run(self, engine):
+        """立即发送第一个样本，之后每 interval 秒发送一个"""
+        engine.device_found("模拟数据源")
+        engine.set_connected(True)
+
+        n = 0
+        while engine.running:
+            received = time.perf_counter() if engine.tracer else 0.0
+            engine.submit(self.base + round(self.amplitude * math.sin(n / 10)), received=received)
+            n += 1
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+数据中断看门狗 - 连接仍在但超过 timeout 秒没有心率样本时，把数据源标记为中断
+
+手环停止通知而蓝牙连接没有断开时，VRChat 会一直显示冻结的心率且 isHRActive 仍为 True。
+看门狗为每个被监视的对象（主输出、配置了单独地址的设备）记录最后一个样本的时间，
+所有对象共用事件循环上的一个定时器，不轮询:
+    - feed() 只更新最后样本时间（字典赋值），不操作定时器
+    - 最小堆中每个对象最多一个截止时间，定时器总是安排在最早的截止时间
+    - 到期时如果期间收到过样本，按最后样本时间重新入堆；否则标记为中断并回调
+
+因此检测延迟不超过 timeout（加上事件循环的调度延迟），每个对象每 timeout 秒最多唤醒一次。
+运行中修改 timeout 时按新的超时时间重建堆并重新安排定时器，立即生效。
+"""
+
+import asyncio
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# 事件循环可能在截止时间之前最多一个时钟精度就执行定时回调（Windows 上约 15 ms）
+_CLOCK_RESOLUTION = time.get_clock_info('monotonic').resolution
+
+
+class StalenessWatchdog:
+    """数据中断检测（必须在事件循环线程中使用）"""
+
+    def __init__(self, timeout: float, on_change: Callable[[str, bool], None],
+                 loop: asyncio.AbstractEventLoop = None):
+        """
+        Args:
+            timeout: 超过这么多秒没有样本视为中断
+            on_change: 状态变化回调 on_change(名称, 是否中断)
+            loop: 事件循环，默认当前运行的事件循环
+        """
+        self._timeout = timeout
+        self._on_change = on_change
+        self._loop = loop or asyncio.get_running_loop()
+        self.wakeups = 0
+
+        self._last: Dict[str, float] = {}
+        self._stale: Set[str] = set()
+        self._heap: List[Tuple[float, str]] = []
+        self._queued: Set[str] = set()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._handle_when = 0.0
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, timeout: float):
+        """修改超时时间：已排队的截止时间按各自的最后样本时间重新计算"""
+        if timeout == self._timeout:
+            return
+        self._timeout = timeout
+        if not self._heap:
+            return
+        self._heap = [(self._last[name] + timeout, name) for _, name in self._heap]
+        heapq.heapify(self._heap)
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._arm()
+
+    @property
+    def stale(self) -> Set[str]:
+        """当前处于中断状态的名称"""
+        return set(self._stale)
+
+    def feed(self, name: str):
+        """收到 name 的一个样本"""
+        now = self._loop.time()
+        self._last[name] = now
+        if name in self._stale:
+            self._stale.discard(name)
+            self._on_change(name, False)
+        if name not in self._queued:
+            self._queued.add(name)
+            heapq.heappush(self._heap, (now + self._timeout, name))
+            self._arm()
+
+    def _arm(self):
+        when = self._heap[0][0]
+        if self._handle is not None:
+            if self._handle_when <= when:
+                return
+            self._handle.cancel()
+        self._handle = self._loop.call_at(when, self._expire)
+        self._handle_when = when
+
+    def _expire(self):
+        self._handle = None
+        self.wakeups += 1
+        now = self._loop.time() + _CLOCK_RESOLUTION
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, name = heapq.heappop(heap)
+            deadline = self._last[name] + self._timeout
+            if deadline > now:
+                # 期间收到过样本，按最后样本时间重新计时
+                heapq.heappush(heap, (deadline, name))
+                continue
+            self._queued.discard(name)
+            self._stale.add(name)
+            self._on_change(name, True)
+        if heap:
+            self._arm()
+
+    def stop(self):
+        """取消定时器"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
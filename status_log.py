@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+状态日志模型 - 固定行数的环形缓冲区
+
+日志条目先写入模型，再由 GUI 定时批量刷新到控件，避免每条信号都操作一次控件。
+带 key 的条目（例如每个样本一条的实时心率）若与上一条 key 相同，会原地覆盖上一条，
+长时间直播时日志不会被重复的心率行刷屏。
+"""
+
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class StatusLog:
+    """有上限的状态日志"""
+
+    def __init__(self, max_lines: int = 500):
+        self.max_lines = max_lines
+        self._entries = deque(maxlen=max_lines)  # 元素为 [key, text]
+        self._unflushed = 0         # 末尾尚未刷新到控件的条目数
+        self._tail_changed = False  # 已显示的最后一条是否被覆盖
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, message: str, key: Optional[str] = None):
+        """
+        追加一条日志
+
+        Args:
+            message: 日志文本
+            key: 可合并条目的类别，与上一条相同时覆盖上一条而不是新增一行
+        """
+        entries = self._entries
+        if key is not None and entries and entries[-1][0] == key:
+            entries[-1][1] = message
+            if self._unflushed == 0:
+                self._tail_changed = True
+            return
+
+        entries.append([key, message])
+        self._unflushed = min(self._unflushed + 1, self.max_lines)
+
+    def take_changes(self) -> Tuple[Optional[str], List[str]]:
+        """
+        取出自上次刷新以来的变化
+
+        Returns:
+            (需要替换控件最后一行的新文本或 None, 需要追加的新行列表)
+        """
+        replace_last = None
+        if self._tail_changed:
+            index = len(self._entries) - 1 - self._unflushed
+            if index >= 0:
+                replace_last = self._entries[index][1]
+            self._tail_changed = False
+
+        new_lines = []
+        if self._unflushed:
+            start = len(self._entries) - self._unflushed
+            new_lines = [self._entries[i][1] for i in range(start, len(self._entries))]
+            self._unflushed = 0
+
+        return replace_last, new_lines
+
+    def lines(self) -> List[str]:
+        """当前保留的全部日志行"""
+        return [text for _, text in self._entries]